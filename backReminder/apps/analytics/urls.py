@@ -7,8 +7,11 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from apps.core.replicas import replica_reads
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def analytics_dashboard(request):
     """Analytics dashboard endpoint with mock data"""
     period = request.GET.get('period', 'month')
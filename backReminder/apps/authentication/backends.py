@@ -0,0 +1,89 @@
+"""
+Authentication backends - JWT authentication with cached user resolution
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_PREFIX = 'auth:user'
+
+# Per-process backends: a save in one worker can't drop the copies cached by the others
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def user_cache_key(user_id) -> str:
+    return f'{USER_CACHE_PREFIX}:{user_id}'
+
+
+def user_cache_enabled() -> bool:
+    """Users are only cached in a cache shared by every worker, where invalidation reaches them all"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    return getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60) > 0 and backend not in PROCESS_LOCAL_CACHES
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user's cached entry so the next request reloads it"""
+    try:
+        cache.delete(user_cache_key(user_id))
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached user {user_id}: {e}")
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the user from the cache.
+
+    Users are cached for AUTH_USER_CACHE_TIMEOUT seconds under their id and
+    dropped on every save or delete. That only holds with a cache shared by
+    all workers, so with a per-process one (LocMemCache) users are read from
+    the database on every request. The token version (the password hash
+    claim simplejwt adds when CHECK_REVOKE_TOKEN is on) is checked against
+    the cached user, so tokens issued before a password change stop working
+    even on a cache hit. Tokens issued without the claim are still accepted.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cached = user_cache_enabled()
+        cache_key = user_cache_key(user_id)
+        user = None
+        if cached:
+            try:
+                user = cache.get(cache_key)
+            except Exception as e:
+                logger.warning(f"User cache unavailable: {e}")
+
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if cached:
+                try:
+                    cache.set(cache_key, user, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+                except Exception as e:
+                    logger.warning(f"User cache unavailable: {e}")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        token_version = validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+        if token_version is not None and token_version != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
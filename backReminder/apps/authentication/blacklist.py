@@ -0,0 +1,204 @@
+"""
+Token blacklist fast path and pruning
+
+Refresh tokens are checked against an in-memory Bloom filter of blacklisted
+JTIs before the blacklist table is queried. The filter has no false
+negatives for the rows it was built from, and it is kept current
+incrementally (by blacklisted_at, with an overlap for late commits).
+Tokens blacklisted since the last sync are also published in the shared
+cache. A "no" from both is
+trusted without touching the database, and a "maybe" is confirmed with
+one indexed query.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+logger = logging.getLogger(__name__)
+
+RECENT_CACHE_PREFIX = 'auth:blacklisted'
+
+DEFAULT_BLACKLIST_OPTIONS = {
+    'CAPACITY': 100000,
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 30,
+    'REBUILD_INTERVAL': 60 * 60,
+    'SYNC_OVERLAP': 60,
+}
+
+
+def blacklist_options() -> Dict[str, Any]:
+    return {**DEFAULT_BLACKLIST_OPTIONS, **getattr(settings, 'TOKEN_BLACKLIST_FILTER', {})}
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Sized for capacity items at the given false positive rate; the k bit
+    positions come from double hashing one blake2b digest.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for index in range(self.hash_count):
+            yield (first + index * second) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistFilter:
+    """
+    Process-wide negative lookup filter in front of BlacklistedToken.
+
+    The Bloom filter is synced with new blacklist rows every SYNC_INTERVAL
+    seconds and rebuilt from scratch every REBUILD_INTERVAL seconds, or
+    when it outgrows its capacity, so pruned tokens drop out of it.
+    Blacklists newer than the last sync are found through the cache keys
+    written by mark_recent().
+    """
+
+    def __init__(self, **options):
+        self.options = {**blacklist_options(), **{key.upper(): value for key, value in options.items()}}
+        self.bloom: Optional[BloomFilter] = None
+        self.synced_until: Optional[datetime] = None
+        self.synced_at = 0.0
+        self.built_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'checks': 0, 'bloom_negative': 0, 'db_checks': 0, 'syncs': 0, 'rebuilds': 0}
+
+    def rebuild(self):
+        """Build a fresh filter from every blacklisted token still stored"""
+        started = timezone.now()
+        total = BlacklistedToken.objects.count()
+        bloom = BloomFilter(max(self.options['CAPACITY'], total * 2), self.options['ERROR_RATE'])
+        bloom.update(BlacklistedToken.objects.values_list('token__jti', flat=True).iterator(chunk_size=5000))
+        self.bloom, self.synced_until = bloom, started
+        self.synced_at = self.built_at = time.monotonic()
+        self.stats['rebuilds'] += 1
+
+    def sync(self):
+        """
+        Add blacklist rows created since the last sync.
+
+        The window reaches SYNC_OVERLAP seconds back so rows stamped before
+        the last sync but committed after it are not missed.
+        """
+        started = timezone.now()
+        since = self.synced_until - timedelta(seconds=self.options['SYNC_OVERLAP'])
+        self.bloom.update(
+            BlacklistedToken.objects.filter(blacklisted_at__gte=since).values_list('token__jti', flat=True)
+        )
+        self.synced_until = started
+        self.synced_at = time.monotonic()
+        self.stats['syncs'] += 1
+
+    def _refresh(self):
+        now = time.monotonic()
+        if (self.bloom is not None and now - self.synced_at < self.options['SYNC_INTERVAL']
+                and now - self.built_at < self.options['REBUILD_INTERVAL']):
+            return
+        with self._lock:
+            now = time.monotonic()
+            if (self.bloom is None or now - self.built_at >= self.options['REBUILD_INTERVAL']
+                    or self.bloom.count >= self.bloom.capacity):
+                self.rebuild()
+            elif now - self.synced_at >= self.options['SYNC_INTERVAL']:
+                self.sync()
+
+    def might_be_blacklisted(self, jti: str) -> bool:
+        """False only when the token is certainly not blacklisted"""
+        self.stats['checks'] += 1
+        try:
+            self._refresh()
+            if jti in self.bloom:
+                return True
+            if cache.get(f'{RECENT_CACHE_PREFIX}:{jti}'):
+                return True
+        except Exception as e:
+            logger.warning(f"Blacklist filter unavailable, checking the database: {e}")
+            return True
+        self.stats['bloom_negative'] += 1
+        return False
+
+    def is_blacklisted(self, jti: str) -> bool:
+        if not self.might_be_blacklisted(jti):
+            return False
+        self.stats['db_checks'] += 1
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def add(self, jti: str):
+        """Record a blacklist made by this process without waiting for a sync"""
+        if self.bloom is not None:
+            with self._lock:
+                self.bloom.add(jti)
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def mark_recent(jti: str):
+    """
+    Publish a fresh blacklist to every process until their filters sync.
+
+    The key outlives two sync intervals so no process can miss it.
+    """
+    blacklist_filter.add(jti)
+    try:
+        cache.set(f'{RECENT_CACHE_PREFIX}:{jti}', 1, blacklist_options()['SYNC_INTERVAL'] * 2 + 60)
+    except Exception as e:
+        logger.warning(f"Could not publish blacklisted token {jti}: {e}")
+
+
+def prune_expired_tokens(chunk_size: int = 1000, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Delete expired outstanding tokens and their blacklist rows in chunks.
+
+    Each chunk is its own short transaction, so pruning a large backlog
+    never holds locks on the token tables for long.
+    """
+    now = now or timezone.now()
+    report = {'outstanding': 0, 'blacklisted': 0, 'chunks': 0}
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lt=now).order_by('expires_at').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            report['blacklisted'] += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            report['outstanding'] += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        report['chunks'] += 1
+        if len(ids) < chunk_size:
+            break
+    return report
@@ -0,0 +1,136 @@
+"""
+Google ID token verification with a cached signing key set
+
+Google rotates its OAuth2 signing certificates every few days and serves
+them with Cache-Control max-age. The verifier keeps the key set in memory
+for that long, fetches it through one pooled requests.Session, and verifies
+tokens locally, so a login only touches the network when the cache expires
+or a token is signed with a key id it has not seen yet.
+"""
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from django.conf import settings
+from google.auth import jwt as google_jwt
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+class GoogleTokenVerifier:
+    """
+    Verifies Google ID tokens against a cached certificate set.
+
+    The set is refreshed when its max-age (minus the Age header) runs out,
+    or early when a token names an unknown key id - at most once every
+    min_refresh_interval seconds so forged key ids can't force a fetch per
+    request. If a refresh fails the previous set keeps being used.
+    """
+
+    def __init__(
+        self,
+        certs_url: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        default_max_age: int = 300,
+        min_refresh_interval: int = 30,
+        timeout: float = 5.0,
+        clock_skew: int = 10,
+    ):
+        self.certs_url = certs_url or getattr(settings, 'GOOGLE_OAUTH_CERTS_URL', GOOGLE_CERTS_URL)
+        self.session = session or self._build_session()
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.clock_skew = clock_skew
+        self._certs: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=2)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _max_age(self, response: requests.Response) -> int:
+        """Seconds the response may be cached for, per its cache headers"""
+        match = MAX_AGE_PATTERN.search(response.headers.get('Cache-Control', ''))
+        max_age = int(match.group(1)) if match else self.default_max_age
+        try:
+            max_age -= int(response.headers.get('Age', 0))
+        except ValueError:
+            pass
+        return max(0, max_age)
+
+    def _fetch(self):
+        response = self.session.get(self.certs_url, timeout=self.timeout)
+        response.raise_for_status()
+        now = time.monotonic()
+        self._certs = response.json()
+        self._fetched_at = now
+        self._expires_at = now + self._max_age(response)
+        self.fetches += 1
+
+    def certs(self, force: bool = False) -> Dict[str, str]:
+        """Return the signing certificates, fetching them if needed"""
+        now = time.monotonic()
+        if self._certs and now < self._expires_at and not force:
+            return self._certs
+
+        with self._lock:
+            now = time.monotonic()
+            if force and self._certs and now - self._fetched_at < self.min_refresh_interval:
+                return self._certs
+            if not force and self._certs and now < self._expires_at:
+                return self._certs
+            try:
+                self._fetch()
+            except (requests.RequestException, ValueError) as e:
+                if not self._certs:
+                    raise
+                logger.warning(f"Could not refresh Google certificates, using cached set: {e}")
+            return self._certs
+
+    def verify(self, token: str, audience: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Verify an ID token's signature, expiry, audience and issuer.
+
+        Raises ValueError for invalid tokens, like id_token.verify_oauth2_token.
+        """
+        certs = self.certs()
+        key_id = google_jwt.decode_header(token).get('kid')
+        if key_id and key_id not in certs:
+            certs = self.certs(force=True)
+
+        idinfo = google_jwt.decode(
+            token, certs=certs, audience=audience, clock_skew_in_seconds=self.clock_skew
+        )
+        if idinfo.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS} but got '{idinfo.get('iss')}'")
+        return idinfo
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_google_verifier() -> GoogleTokenVerifier:
+    """Process-wide verifier so the key set and HTTP pool are shared"""
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = GoogleTokenVerifier()
+        return _verifier
@@ -0,0 +1,72 @@
+"""
+Management command to benchmark JWT user resolution with and without the cache
+"""
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.authentication.backends import CachedJWTAuthentication, invalidate_cached_user, user_cache_enabled
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare authenticated request resolution with JWTAuthentication and CachedJWTAuthentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Authenticated requests to resolve per backend'
+        )
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        if count <= 0:
+            raise CommandError('--requests must be positive')
+
+        if not user_cache_enabled():
+            self.stdout.write(self.style.WARNING(
+                '⚠️  The cache is per-process (or AUTH_USER_CACHE_TIMEOUT is 0): users are not cached'
+            ))
+
+        suffix = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(
+            email=f'auth-benchmark-{suffix}@example.com',
+            username=f'auth-benchmark-{suffix}',
+            password=uuid.uuid4().hex,
+        )
+        try:
+            request = RequestFactory().get(
+                '/api/users/me/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+            )
+            self.stdout.write(f'🔐 Resolving {count} authenticated requests per backend...')
+
+            results = {}
+            for label, backend in (('JWTAuthentication', JWTAuthentication()),
+                                   ('CachedJWTAuthentication', CachedJWTAuthentication())):
+                invalidate_cached_user(user.pk)
+                with CaptureQueriesContext(connection) as queries:
+                    start_time = time.perf_counter()
+                    for _request in range(count):
+                        backend.authenticate(request)
+                    elapsed = time.perf_counter() - start_time
+                results[label] = (elapsed, len(queries))
+                self.stdout.write(
+                    f'   {label}: {count / elapsed:,.0f} req/s, '
+                    f'{elapsed / count * 1e6:.1f} µs/req, {len(queries)} queries'
+                )
+
+            baseline, cached = results['JWTAuthentication'][0], results['CachedJWTAuthentication'][0]
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✅ Cached resolution is {baseline / cached:.1f}x faster '
+                    f'({results["JWTAuthentication"][1] - results["CachedJWTAuthentication"][1]} queries saved)'
+                )
+            )
+        finally:
+            user.delete()
@@ -0,0 +1,77 @@
+"""
+Management command to benchmark Google login token verification against a
+local stub key server, with and without the certificate cache
+"""
+import time
+import uuid
+
+import rsa
+from django.core.management.base import BaseCommand, CommandError
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+from google.auth.transport import requests as google_requests
+from google.oauth2 import id_token
+
+from apps.authentication.google_verifier import GoogleTokenVerifier
+from apps.authentication.stubs import StubCertServer
+
+
+class Command(BaseCommand):
+    help = 'Measure Google login token verification latency with and without the certificate cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=200,
+            help='Logins to verify per mode'
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=int,
+            default=50,
+            help='Simulated network latency of the key server'
+        )
+
+    def handle(self, *args, **options):
+        count = options['logins']
+        if count <= 0:
+            raise CommandError('--logins must be positive')
+
+        self.stdout.write('🔑 Generating signing key...')
+        public_key, private_key = rsa.newkeys(2048)
+        key_id = uuid.uuid4().hex
+        signer = crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), key_id=key_id)
+        audience = 'benchmark-client.apps.googleusercontent.com'
+        now = int(time.time())
+        token = google_jwt.encode(signer, {
+            'iss': 'https://accounts.google.com',
+            'aud': audience,
+            'sub': '1234567890',
+            'email': 'benchmark@example.com',
+            'iat': now,
+            'exp': now + 3600,
+        }).decode()
+
+        certs = {key_id: public_key.save_pkcs1().decode()}
+        with StubCertServer(certs, latency=options['latency_ms'] / 1000) as stub:
+            self.stdout.write(
+                f'🌐 Stub key server at {stub.url} ({options["latency_ms"]}ms latency), {count} logins per mode'
+            )
+
+            start_time = time.perf_counter()
+            for _login in range(count):
+                id_token.verify_token(token, google_requests.Request(), audience=audience, certs_url=stub.url)
+            uncached = (time.perf_counter() - start_time) / count
+            uncached_fetches = stub.requests_served
+
+            verifier = GoogleTokenVerifier(certs_url=stub.url)
+            start_time = time.perf_counter()
+            for _login in range(count):
+                verifier.verify(token, audience)
+            cached = (time.perf_counter() - start_time) / count
+            cached_fetches = stub.requests_served - uncached_fetches
+
+        self.stdout.write(f'   Uncached: {uncached * 1000:.2f} ms/login, {uncached_fetches} key fetches')
+        self.stdout.write(f'   Cached:   {cached * 1000:.2f} ms/login, {cached_fetches} key fetches')
+        self.stdout.write(self.style.SUCCESS(f'✅ Cached verification is {uncached / cached:.1f}x faster'))
@@ -0,0 +1,32 @@
+"""
+Management command to prune expired JWT outstanding and blacklisted tokens
+"""
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from apps.authentication.blacklist import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted tokens in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Tokens deleted per transaction'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🧹 Pruning expired tokens...')
+        report = prune_expired_tokens(chunk_size=options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Deleted {report["outstanding"]} outstanding and {report["blacklisted"]} '
+                f'blacklisted tokens in {report["chunks"]} chunks'
+            )
+        )
+        self.stdout.write(
+            f'   Remaining: {OutstandingToken.objects.count()} outstanding, '
+            f'{BlacklistedToken.objects.count()} blacklisted'
+        )
@@ -0,0 +1,23 @@
+# Indexes used by token pruning and the blacklist filter sync
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS token_blacklist_outstanding_expires_idx '
+                'ON token_blacklist_outstandingtoken (expires_at)',
+            reverse_sql='DROP INDEX IF EXISTS token_blacklist_outstanding_expires_idx',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS token_blacklist_blacklisted_at_idx '
+                'ON token_blacklist_blacklistedtoken (blacklisted_at)',
+            reverse_sql='DROP INDEX IF EXISTS token_blacklist_blacklisted_at_idx',
+        ),
+    ]
@@ -2,15 +2,17 @@
 Authentication serializers - JWT token management
 """
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from django.contrib.auth import authenticate
 from apps.users.models import User
+from .tokens import RefreshToken
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Custom JWT token serializer with additional user data
     """
+    token_class = RefreshToken
     
     def validate(self, attrs):
         """
@@ -42,6 +44,13 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that checks the blacklist through the in-memory filter
+    """
+    token_class = RefreshToken
+
+
 class LoginSerializer(serializers.Serializer):
     """
     Login serializer for email/password authentication
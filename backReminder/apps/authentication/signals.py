@@ -0,0 +1,15 @@
+"""
+Authentication signals - Keep the blacklist filter current
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .blacklist import mark_recent
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def publish_blacklisted_token(sender, instance, created, **kwargs):
+    """Every new blacklist row is visible to all processes before their next sync"""
+    if created:
+        mark_recent(instance.token.jti)
@@ -0,0 +1,51 @@
+"""
+Stub Google key server - Local stand-in for the OAuth2 certificate endpoint
+
+Used by the login benchmark and the verifier tests. certs, max_age and age
+are read on every request, so a test can rotate keys or age the response.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class StubCertServer:
+    """Serves a Google-style {key id: public key} document with cache headers"""
+
+    def __init__(self, certs: Dict[str, str], max_age: int = 3600, latency: float = 0.05, age: Optional[int] = None):
+        self.certs = certs
+        self.max_age = max_age
+        self.age = age
+        self.requests_served = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(latency)
+                stub.requests_served += 1
+                body = json.dumps(stub.certs).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', f'public, max-age={stub.max_age}, must-revalidate, no-transform')
+                if stub.age is not None:
+                    self.send_header('Age', str(stub.age))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/oauth2/v1/certs'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
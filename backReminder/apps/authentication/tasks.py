@@ -0,0 +1,33 @@
+"""
+Celery tasks for token maintenance
+"""
+from celery import shared_task
+import logging
+
+from .blacklist import prune_expired_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prune_expired_tokens_task(chunk_size=1000):
+    """
+    Delete expired outstanding and blacklisted tokens in chunks
+    """
+    try:
+        report = prune_expired_tokens(chunk_size=chunk_size)
+        logger.info(
+            f"Token pruning: {report['outstanding']} outstanding and "
+            f"{report['blacklisted']} blacklisted tokens deleted in {report['chunks']} chunks"
+        )
+        return {
+            'status': 'success',
+            **report
+        }
+
+    except Exception as exc:
+        logger.error(f"Token pruning task failed: {exc}")
+        return {
+            'status': 'error',
+            'error': str(exc)
+        }
@@ -0,0 +1,133 @@
+import tempfile
+import time
+import uuid
+from unittest import mock
+
+import rsa
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users.models import User
+
+from .backends import user_cache_enabled
+from .google_verifier import GoogleTokenVerifier
+from .stubs import StubCertServer
+
+AUDIENCE = 'test-client.apps.googleusercontent.com'
+
+
+def signing_key():
+    """(key id, PEM public key, signer) of a fresh RSA key"""
+    public_key, private_key = rsa.newkeys(1024)
+    key_id = uuid.uuid4().hex
+    signer = crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), key_id=key_id)
+    return key_id, public_key.save_pkcs1().decode(), signer
+
+
+def id_token(signer) -> str:
+    now = int(time.time())
+    return google_jwt.encode(signer, {
+        'iss': 'https://accounts.google.com',
+        'aud': AUDIENCE,
+        'sub': '1234567890',
+        'email': 'google@example.com',
+        'iat': now,
+        'exp': now + 3600,
+    }).decode()
+
+
+class GoogleTokenVerifierTests(SimpleTestCase):
+    """Key set caching, against a local stub key server"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key_id, cls.public_key, cls.signer = signing_key()
+        cls.rotated_key_id, cls.rotated_public_key, cls.rotated_signer = signing_key()
+
+    def setUp(self):
+        self.stub = StubCertServer({self.key_id: self.public_key}, max_age=600, latency=0)
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        self.now = 1000.0
+        clock = mock.patch('apps.authentication.google_verifier.time')
+        clock.start().monotonic.side_effect = lambda: self.now
+        self.addCleanup(clock.stop)
+        self.verifier = GoogleTokenVerifier(certs_url=self.stub.url, min_refresh_interval=30)
+
+    def test_cache_honors_max_age_minus_age(self):
+        """max-age=600 with Age: 500 leaves 100 seconds to the cached set"""
+        self.stub.age = 500
+        token = id_token(self.signer)
+
+        self.verifier.verify(token, AUDIENCE)
+        self.now += 99
+        self.verifier.verify(token, AUDIENCE)
+        self.assertEqual(self.stub.requests_served, 1)
+
+        self.now += 2
+        self.verifier.verify(token, AUDIENCE)
+        self.assertEqual(self.stub.requests_served, 2)
+
+    def test_unknown_key_id_refresh_is_rate_limited(self):
+        """Forged key ids force at most one fetch per min_refresh_interval"""
+        self.verifier.certs()
+        _key_id, _public_key, forged_signer = signing_key()
+        forged = id_token(forged_signer)
+        self.now += 31
+
+        for _attempt in range(5):
+            with self.assertRaises(ValueError):
+                self.verifier.verify(forged, AUDIENCE)
+        self.assertEqual(self.stub.requests_served, 2)
+
+        self.now += 31
+        with self.assertRaises(ValueError):
+            self.verifier.verify(forged, AUDIENCE)
+        self.assertEqual(self.stub.requests_served, 3)
+
+    def test_expired_cache_refetches_rotated_keys(self):
+        """Once max-age runs out the set is fetched again and rotated keys verify"""
+        self.verifier.verify(id_token(self.signer), AUDIENCE)
+        self.stub.certs = {self.rotated_key_id: self.rotated_public_key}
+
+        self.now += 601
+        idinfo = self.verifier.verify(id_token(self.rotated_signer), AUDIENCE)
+
+        self.assertEqual(idinfo['email'], 'google@example.com')
+        self.assertEqual(self.stub.requests_served, 2)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', email='cached@example.com', password='x')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_process_local_cache_reads_users_from_the_database(self):
+        """A deactivation by another worker (no signal in this process) is seen on the next request"""
+        self.assertFalse(user_cache_enabled())
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_shared_cache_drops_deactivated_user(self):
+        """With a shared cache the cached copy is dropped when the user is saved"""
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+        }):
+            self.assertTrue(user_cache_enabled())
+            self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+
+            self.user.is_active = False
+            self.user.save()
+
+            self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
@@ -0,0 +1,21 @@
+"""
+JWT token classes - Refresh tokens checked through the blacklist filter
+"""
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+from django.utils.translation import gettext_lazy as _
+
+from .blacklist import blacklist_filter
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    Refresh token whose blacklist check only queries the database when the
+    in-memory filter can't rule the token out
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklist_filter.is_blacklisted(jti):
+            raise TokenError(_("Token is blacklisted"))
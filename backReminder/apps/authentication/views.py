@@ -6,13 +6,13 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from django.contrib.auth import authenticate, login, logout
 from django.utils import timezone
 from django.conf import settings
 from apps.users.models import User
 from apps.users.serializers import UserRegistrationSerializer
+from .tokens import RefreshToken
 from .serializers import (
     CustomTokenObtainPairSerializer, LoginSerializer, LogoutSerializer,
     PasswordResetRequestSerializer, PasswordResetConfirmSerializer
@@ -211,8 +211,7 @@ def google_oauth_login(request):
     Endpoint para login con Google OAuth
     Recibe el token de Google y autentica al usuario
     """
-    from google.oauth2 import id_token
-    from google.auth.transport import requests
+    from .google_verifier import get_google_verifier
     
     token = request.data.get('credential')
     
@@ -223,12 +222,8 @@ def google_oauth_login(request):
         )
     
     try:
-        # Verificar token de Google
-        idinfo = id_token.verify_oauth2_token(
-            token, 
-            requests.Request(), 
-            settings.GOOGLE_OAUTH_CLIENT_ID
-        )
+        # Verificar token de Google (certificados en caché, verificación local)
+        idinfo = get_google_verifier().verify(token, settings.GOOGLE_OAUTH_CLIENT_ID)
         
         # Validar issuer
         if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
@@ -0,0 +1,94 @@
+"""
+Write buffers - Coalesce hot-path writes into periodic bulk writes
+"""
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    """
+    Thread-safe, per-process buffer of pending writes.
+
+    Entries are keyed so repeated writes to the same row coalesce into one.
+    The buffer is flushed by a daemon thread every flush_interval seconds,
+    inline once it holds max_size entries, and at interpreter exit.
+    Subclasses implement write() to persist a drained batch.
+    """
+
+    def __init__(self, flush_interval: float = 15.0, max_size: int = 1000):
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._pending: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
+    def merge(self, current: Any, value: Any) -> Any:
+        """Combine a new value with one already pending for the same key"""
+        return value
+
+    def write(self, entries: Dict[Hashable, Any]):
+        raise NotImplementedError
+
+    def add(self, key: Hashable, value: Any):
+        """Buffer a write, flushing inline when the buffer is full"""
+        with self._lock:
+            if key in self._pending:
+                self._pending[key] = self.merge(self._pending[key], value)
+            else:
+                self._pending[key] = value
+            full = len(self._pending) >= self.max_size
+        self._ensure_flusher()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Persist everything pending; returns the number of entries written"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._pending = self._pending, {}
+            if not entries:
+                return 0
+            try:
+                self.write(entries)
+            except Exception as e:
+                logger.error(f"{self.__class__.__name__} flush failed, requeuing {len(entries)} entries: {e}")
+                with self._lock:
+                    for key, value in entries.items():
+                        self._pending[key] = (
+                            self.merge(value, self._pending[key]) if key in self._pending else value
+                        )
+                return 0
+            return len(entries)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name=f'{self.__class__.__name__}-flusher', daemon=True
+            )
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                if self._pending:
+                    self.flush()
+            finally:
+                # The flusher thread owns its DB connection; don't keep it open between runs
+                connection.close()
@@ -0,0 +1,24 @@
+"""
+Management command to prune offline sync records past the retention window
+"""
+from django.core.management.base import BaseCommand
+from apps.core.sync import prune_sync_records, sync_options
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones and upload receipts older than SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per query'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'🧹 Pruning sync records older than {sync_options()["retention_days"]} days...')
+        report = prune_sync_records(chunk_size=options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Deleted {report["tombstones"]} tombstones and {report["receipts"]} upload receipts')
+        )
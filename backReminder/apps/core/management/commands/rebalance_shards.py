@@ -0,0 +1,149 @@
+"""
+Management command to move users' data between shard databases
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from apps.core.sharding import (
+    ShardMover, hash_shard, shard_databases, shard_for_user, sharding_enabled, unpin
+)
+from apps.users.models import User, UserShard
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebalance per-user data across USER_SHARDS. To add shards: run with --pin-all, '
+        'add the new database to USER_SHARD_URLS, migrate it (migrate --database shard_N), '
+        'deploy, then run without options to move pinned users to their hash placement.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pin-all',
+            action='store_true',
+            help='Pin every unpinned user to the database that holds their data today'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Move a single user (with --to)'
+        )
+        parser.add_argument(
+            '--to',
+            help='Target database alias for --user; the user stays pinned there'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Maximum number of users moved in this run'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Users moved per batch; each batch waits out the directory cache once'
+        )
+        parser.add_argument(
+            '--grace',
+            type=float,
+            help='Seconds to wait between flipping and finishing a batch '
+                 '(default: USER_SHARD_DIRECTORY_TIMEOUT)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would move without moving anything'
+        )
+
+    def handle(self, *args, **options):
+        if options['pin_all']:
+            return self.pin_all()
+
+        if not sharding_enabled():
+            raise CommandError('USER_SHARD_URLS is not set; there is nothing to rebalance')
+
+        mover = ShardMover(grace=options['grace'])
+        if options['user']:
+            return self.move_one(mover, options)
+
+        plan = {}
+        in_place = []
+        pins = UserShard.objects.order_by('user_id').values_list('user_id', 'database')
+        for user_id, database in pins.iterator():
+            target = hash_shard(user_id)
+            if database == target:
+                in_place.append(user_id)
+            else:
+                plan[user_id] = target
+            if options['limit'] and len(plan) >= options['limit']:
+                break
+
+        self.stdout.write(f'🧭 {len(plan)} users to move, {len(in_place)} pins already in place')
+        if options['dry_run']:
+            for user_id, target in list(plan.items())[:50]:
+                self.stdout.write(f'   user {user_id}: {shard_for_user(user_id)} -> {target}')
+            return
+
+        unpin(in_place)
+
+        user_ids = list(plan)
+        totals = {'users': 0, 'copied': 0, 'deleted': 0}
+        for start in range(0, len(user_ids), options['batch_size']):
+            batch = {user_id: plan[user_id] for user_id in user_ids[start:start + options['batch_size']]}
+            report = mover.move(batch)
+            for field in totals:
+                totals[field] += report[field]
+            self.stdout.write(f'   moved {totals["users"]}/{len(user_ids)} users')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Moved {totals["users"]} users ({totals["copied"]} rows copied, '
+                f'{totals["deleted"]} deleted from their old shard)'
+            )
+        )
+
+    def pin_all(self):
+        aliases = shard_databases()
+        created = 0
+        last_id = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:5000]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            pinned = set(UserShard.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+            created += len(UserShard.objects.bulk_create([
+                UserShard(
+                    user_id=user_id,
+                    database=hash_shard(user_id, aliases) if sharding_enabled() else DEFAULT_DB_ALIAS,
+                )
+                for user_id in user_ids if user_id not in pinned
+            ]))
+        self.stdout.write(self.style.SUCCESS(f'📌 Pinned {created} users to their current database'))
+
+    def move_one(self, mover: ShardMover, options):
+        user_id, target = options['user'], options['to']
+        if not target:
+            raise CommandError('--user needs --to')
+        if target not in settings.DATABASES:
+            raise CommandError(f"Unknown database '{target}'")
+        if not User.objects.filter(id=user_id).exists():
+            raise CommandError(f'User {user_id} does not exist')
+
+        source = shard_for_user(user_id)
+        if options['dry_run']:
+            self.stdout.write(f'🧭 user {user_id}: {source} -> {target}')
+            return
+        if source == target:
+            ShardMover.pin(user_id, target)
+            self.stdout.write(f'📌 User {user_id} already lives on {target}; pinned')
+            return
+
+        report = mover.move({user_id: target}, pin_targets=True)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Moved user {user_id} from {source} to {target} ({report["copied"]} rows copied)'
+            )
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collection', models.CharField(max_length=30, verbose_name='Collection')),
+                ('object_id', models.CharField(max_length=64, verbose_name='Object id')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Deleted at')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='sync_tombstones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sync tombstone',
+                'verbose_name_plural': 'Sync tombstones',
+                'db_table': 'sync_tombstones',
+                'indexes': [models.Index(fields=['user', 'created_at', 'id'], name='sync_tombst_user_id_743f63_idx'), models.Index(fields=['created_at'], name='sync_tombst_created_630e90_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0001_sync_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncMutation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, verbose_name='Idempotency key')),
+                ('kind', models.CharField(max_length=30, verbose_name='Mutation type')),
+                ('result', models.JSONField(default=dict, verbose_name='Result')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Applied at')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='sync_mutations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sync mutation',
+                'verbose_name_plural': 'Sync mutations',
+                'db_table': 'sync_mutations',
+                'indexes': [models.Index(fields=['created_at'], name='sync_mutati_created_b2a7aa_idx')],
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
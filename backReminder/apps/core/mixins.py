@@ -0,0 +1,100 @@
+"""
+ViewSet mixins shared across apps
+"""
+from typing import Callable, Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from rest_framework import status
+from rest_framework.response import Response
+
+from .replicas import read_from_replica, replica_eligible
+from .utils import compute_etag, etag_matches
+
+
+class ReplicaReadMixin:
+    """
+    Serves the safe requests of replica_actions from a read replica.
+
+    replica_actions = None covers every safe request of a plain APIView.
+    Users who wrote in the last REPLICA_STICKY_SECONDS keep reading from
+    the primary (see apps.core.replicas).
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # After authentication, so the user's stickiness pin can be checked
+        action = getattr(self, 'action', None)
+        if (self.replica_actions is None or action in self.replica_actions) and replica_eligible(request):
+            self._replica_context = read_from_replica()
+            self._replica_context.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        context = getattr(self, '_replica_context', None)
+        if context is not None:
+            self._replica_context = None
+            context.__exit__(None, None, None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    ETag / If-None-Match support for ModelViewSet list and retrieve.
+
+    The validator is one aggregate query over the filtered queryset -
+    max() of each etag_fields column plus the row count - so an unchanged
+    response is answered with 304 before any object is loaded or serialized.
+    The count catches deletions; etag_fields must cover every timestamp
+    the serialized representation depends on (use 'relation__updated_at'
+    for nested data), and bulk .update() calls on these models must bump
+    updated_at themselves.
+    """
+    etag_fields = ('updated_at',)
+
+    def get_etag(self, queryset) -> Optional[str]:
+        """Validator for the rows of queryset, or None when it is empty"""
+        aggregates = {f'last_{index}': Max(field) for index, field in enumerate(self.etag_fields)}
+        stats = queryset.order_by().aggregate(total=Count('pk'), **aggregates)
+        if not stats['total']:
+            return None
+        return compute_etag(
+            queryset.model._meta.label,
+            self.request.user.pk,
+            self.request.get_full_path(),
+            self.request.accepted_renderer.format,
+            stats['total'],
+            *(stats[name] for name in aggregates),
+        )
+
+    def conditional_response(self, queryset, build: Callable[[], Response]) -> Response:
+        """Return 304 if the client's copy is current, otherwise build() with an ETag"""
+        etag = self.get_etag(queryset)
+        if etag is None:
+            return build()
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag_matches(self.request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(
+            queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        build = lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            # Malformed lookups get get_object()'s usual 404
+            return build()
+        return self.conditional_response(queryset, build)
@@ -5,6 +5,8 @@ import uuid
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from .sharding import UserShardedManager
+
 
 class BaseModel(models.Model):
     """
@@ -56,3 +58,70 @@ class SoftDeleteMixin(models.Model):
         self.is_deleted = False
         self.deleted_at = None
         self.save()
+
+
+class SyncTombstone(models.Model):
+    """
+    Record of a deleted row, served to offline clients by the sync download.
+
+    created_at is the deletion time. Rows are kept for
+    SYNC_TOMBSTONE_RETENTION_DAYS; older sync cursors need a full resync.
+    """
+    # Unconstrained: tombstones live on the user's shard
+    user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='sync_tombstones',
+        db_constraint=False
+    )
+    collection = models.CharField(_('Collection'), max_length=30)
+    object_id = models.CharField(_('Object id'), max_length=64)
+    created_at = models.DateTimeField(_('Deleted at'), auto_now_add=True)
+
+    objects = UserShardedManager()
+
+    class Meta:
+        db_table = 'sync_tombstones'
+        verbose_name = _('Sync tombstone')
+        verbose_name_plural = _('Sync tombstones')
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.collection}:{self.object_id} deleted at {self.created_at}"
+
+
+class SyncMutation(models.Model):
+    """
+    Receipt of a client mutation applied by the sync upload.
+
+    The client's idempotency key is unique per user, so a batch retried
+    after a dropped connection is answered from these receipts instead of
+    being applied twice. Kept as long as tombstones.
+    """
+    user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='sync_mutations',
+        db_constraint=False
+    )
+    key = models.CharField(_('Idempotency key'), max_length=100)
+    kind = models.CharField(_('Mutation type'), max_length=30)
+    result = models.JSONField(_('Result'), default=dict)
+    created_at = models.DateTimeField(_('Applied at'), auto_now_add=True)
+
+    objects = UserShardedManager()
+
+    class Meta:
+        db_table = 'sync_mutations'
+        verbose_name = _('Sync mutation')
+        verbose_name_plural = _('Sync mutations')
+        unique_together = ['user', 'key']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.key}"
@@ -1,9 +1,16 @@
 """
 Custom pagination classes
 """
+import logging
+
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
+logger = logging.getLogger(__name__)
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     """
@@ -41,3 +48,50 @@ class SmallPagination(StandardResultsSetPagination):
     """
     page_size = 10
     max_page_size = 50
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over very large tables.
+
+    An unfiltered queryset is counted from the planner statistics
+    (pg_class.reltuples on PostgreSQL, information_schema on MySQL) once
+    the table is past exact_threshold rows. Filtered querysets are counted
+    exactly, but only up to max_count rows, so a broad filter never scans
+    the whole table just to number the pages.
+    """
+    exact_threshold = 100000
+    max_count = 100000
+
+    def _estimated_table_count(self):
+        model = self.object_list.model
+        connection = connections[self.object_list.db]
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            elif connection.vendor == 'mysql':
+                cursor.execute(
+                    'SELECT table_rows FROM information_schema.tables '
+                    'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+                )
+            else:
+                return None
+            row = cursor.fetchone()
+        # reltuples is -1 for tables that were never analyzed
+        return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        if not queryset.query.where:
+            try:
+                estimate = self._estimated_table_count()
+            except DatabaseError as e:
+                logger.warning(f"Could not estimate row count for {queryset.model._meta.db_table}: {e}")
+                estimate = None
+            if estimate is not None and estimate >= self.exact_threshold:
+                return int(estimate)
+        return queryset.order_by()[:self.max_count].count()
@@ -0,0 +1,172 @@
+"""
+Read replicas - Serve safe reads from replicas of the default database
+
+Views opt in with ReplicaReadMixin or @replica_reads; the queries they run
+go to a replica unless the user wrote recently. Any write marks the request,
+and ReplicaStickinessMiddleware then pins the user to the primary for
+REPLICA_STICKY_SECONDS so they always read their own writes. Replicas whose
+measured lag exceeds REPLICA_MAX_LAG are skipped.
+
+Sharded models are served by their shard and never by these replicas.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .sharding import is_sharded, sharding_enabled
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_CACHE_PREFIX = 'replica:pin'
+LAG_CHECK_INTERVAL = 5
+
+_replica_reads: ContextVar[bool] = ContextVar('replica_reads', default=False)
+_wrote: ContextVar[bool] = ContextVar('replica_wrote', default=False)
+
+_lag_lock = threading.Lock()
+_lag_cache: Dict[str, Tuple[float, float]] = {}
+
+
+def replica_databases() -> List[str]:
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def sticky_seconds() -> int:
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+
+
+def pin_to_primary(user_id):
+    """Keep a user's reads on the primary until replicas have caught up"""
+    cache.set(f'{PIN_CACHE_PREFIX}:{user_id}', 1, sticky_seconds())
+
+
+def is_pinned(user_id) -> bool:
+    return bool(cache.get(f'{PIN_CACHE_PREFIX}:{user_id}'))
+
+
+def _measure_lag(alias: str) -> float:
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+            'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+        )
+        return float(cursor.fetchone()[0])
+
+
+def replica_lag(alias: str) -> float:
+    """Replication lag in seconds, measured at most every LAG_CHECK_INTERVAL seconds per process"""
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached and now - cached[1] < LAG_CHECK_INTERVAL:
+        return cached[0]
+    with _lag_lock:
+        try:
+            lag = _measure_lag(alias)
+        except DatabaseError as e:
+            logger.warning(f"Replica {alias} unavailable, reading from the primary: {e}")
+            lag = float('inf')
+        _lag_cache[alias] = (lag, now)
+    return lag
+
+
+def choose_replica() -> Optional[str]:
+    """A random replica within the lag budget, or None to use the primary"""
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG', 10)
+    candidates = [alias for alias in replica_databases() if replica_lag(alias) <= max_lag]
+    return random.choice(candidates) if candidates else None
+
+
+def replica_eligible(request) -> bool:
+    """Safe request from a user who has not written recently"""
+    if request.method not in SAFE_METHODS or not replica_databases():
+        return False
+    user = getattr(request, 'user', None)
+    return not (user is not None and user.is_authenticated and is_pinned(user.pk))
+
+
+@contextmanager
+def read_from_replica(enabled: bool = True):
+    """Send the reads made inside the block to a replica"""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view):
+    """Decorator for function views whose safe requests can be served by a replica"""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with read_from_replica(replica_eligible(request)):
+            return view(request, *args, **kwargs)
+    return wrapped
+
+
+class ReplicaRouter:
+    """
+    Routes reads to replicas inside read_from_replica() blocks.
+
+    Must come before the shard router in DATABASE_ROUTERS: it records every
+    write of the request for stickiness, and sends writes of objects read
+    from a replica back to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or (sharding_enabled() and is_sharded(model)):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db not in (None, DEFAULT_DB_ALIAS, *replica_databases()):
+            return None
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replica_databases():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replica_databases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema from the primary
+        if db in replica_databases():
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """Pins users who wrote during a request to the primary for a short window"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            # DRF sets the authenticated user (JWT included) on the Django request
+            user = getattr(request, 'user', None)
+            if _wrote.get() and user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+            return response
+        finally:
+            _wrote.reset(token)
@@ -0,0 +1,486 @@
+"""
+User data sharding - Route each user's rows to one of N databases
+
+Per-user models live on the database picked by a stable hash of the user id,
+unless the UserShard directory pins the user somewhere else (while shards are
+being added or a user is moved by hand). Users, profiles and every other
+model stay on the default database, so sharded models reference users
+without a database constraint and must not join them in SQL on a shard.
+
+With USER_SHARDS unset everything routes to the default database and the
+router is a no-op.
+"""
+import logging
+import time
+import zlib
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, models, router, transaction
+from django.db.migrations.operations import CreateModel
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Parents before children, so rows can be copied between shards in this order
+SHARDED_MODELS = (
+    'medications.medication',
+    'medications.doseslot',
+    'medications.medicationhistory',
+    'schedules.dailyschedule',
+    'schedules.medicationdose',
+    'schedules.weeklyprogress',
+    'notifications.notification',
+    'core.synctombstone',
+    'core.syncmutation',
+)
+
+DIRECTORY_CACHE_PREFIX = 'shard:user'
+
+# Auto-increment ids per shard (reserve_id_ranges): 512 shards stay below
+# 2**53, the largest integer JavaScript clients read exactly
+SHARD_ID_RANGE = 2 ** 44
+
+_purging: ContextVar[bool] = ContextVar('purging_user_rows', default=False)
+
+
+def shard_databases() -> List[str]:
+    """Aliases of the databases holding per-user rows"""
+    return list(getattr(settings, 'USER_SHARDS', None) or [DEFAULT_DB_ALIAS])
+
+
+def sharding_enabled() -> bool:
+    return shard_databases() != [DEFAULT_DB_ALIAS]
+
+
+def is_sharded(model) -> bool:
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def sharded_models() -> List[type]:
+    return [apps.get_model(label) for label in SHARDED_MODELS]
+
+
+def _without_user_constraint(field):
+    if not (field.is_relation and field.many_to_one and field.db_constraint):
+        return field
+    target = field.remote_field.model
+    label = target if isinstance(target, str) else target._meta.label
+    if label.lower() != settings.AUTH_USER_MODEL.lower():
+        return field
+    _name, _path, args, kwargs = field.deconstruct()
+    return type(field)(*args, **{**kwargs, 'db_constraint': False})
+
+
+class CreateShardedModel(CreateModel):
+    """
+    CreateModel of the sharded models' initial migrations (0001_initial_sharded).
+
+    On a shard database the user foreign key is created without its
+    constraint: a shard has no users table to reference. The migration
+    state keeps the field as declared, so the later AlterField migrations
+    that drop the constraint apply everywhere unchanged.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        alias = schema_editor.connection.alias
+        if alias == DEFAULT_DB_ALIAS or alias not in shard_databases():
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        unconstrained = CreateModel(
+            self.name,
+            [(name, _without_user_constraint(field)) for name, field in self.fields],
+            options=self.options,
+            bases=self.bases,
+            managers=self.managers,
+        )
+        state = from_state.clone()
+        unconstrained.state_forwards(app_label, state)
+        unconstrained.database_forwards(app_label, schema_editor, from_state, state)
+
+
+def joins_users(alias: str) -> bool:
+    """Whether rows on this database can be joined with the users table (default or its replicas)"""
+    return alias == DEFAULT_DB_ALIAS or alias not in shard_databases()
+
+
+def hash_shard(user_id, shards: Optional[List[str]] = None) -> str:
+    """Placement of a user by hash alone - crc32 is stable across processes"""
+    shards = shards or shard_databases()
+    return shards[zlib.crc32(str(user_id).encode()) % len(shards)]
+
+
+def directory_timeout() -> int:
+    return getattr(settings, 'USER_SHARD_DIRECTORY_TIMEOUT', 300)
+
+
+def pinned_shard(user_id) -> Optional[str]:
+    """Database the directory pins a user to, cached in the shared cache"""
+    key = f'{DIRECTORY_CACHE_PREFIX}:{user_id}'
+    alias = cache.get(key)
+    if alias is None:
+        from apps.users.models import UserShard
+        alias = UserShard.objects.filter(user_id=user_id).values_list('database', flat=True).first() or ''
+        cache.set(key, alias, directory_timeout())
+    return alias or None
+
+
+def shard_for_user(user_id) -> str:
+    """Database holding a user's rows"""
+    if not sharding_enabled():
+        return DEFAULT_DB_ALIAS
+    return pinned_shard(user_id) or hash_shard(user_id)
+
+
+def group_by_shard(user_ids: Iterable) -> Dict[str, List]:
+    """Split user ids by the database holding their rows"""
+    groups = defaultdict(list)
+    for user_id in user_ids:
+        groups[shard_for_user(user_id)].append(user_id)
+    return dict(groups)
+
+
+def across_shards(queryset: models.QuerySet) -> Iterator[models.QuerySet]:
+    """
+    The queryset once per shard, for jobs that scan every user.
+
+    A queryset already bound with using() is yielded unchanged.
+    """
+    if queryset._db is not None:
+        yield queryset
+        return
+    for alias in shard_databases():
+        yield queryset.using(alias)
+
+
+def _is_user(instance) -> bool:
+    return instance._meta.label_lower == settings.AUTH_USER_MODEL.lower()
+
+
+class UserShardRouter:
+    """
+    Database router for the sharded models.
+
+    Without an instance hint there is no user to route by, so plain
+    Model.objects queries fall through to the default database; use
+    objects.for_user() (or across_shards() for scans) instead. Rows loaded
+    from a shard are saved and deleted back on it, and related managers of
+    a user (user.medications...) follow the user's placement.
+    """
+
+    def _db_for_model(self, model, **hints):
+        instance = hints.get('instance')
+        if not is_sharded(model):
+            # Django would otherwise follow the instance to its shard (e.g. for medication.user)
+            if instance is not None and is_sharded(type(instance)):
+                return DEFAULT_DB_ALIAS
+            return None
+        if instance is None or not sharding_enabled():
+            return None
+        if _is_user(instance):
+            return shard_for_user(instance.pk) if instance.pk is not None else None
+        if is_sharded(type(instance)):
+            if instance._state.db:
+                return instance._state.db
+            user_id = getattr(instance, 'user_id', None)
+            return shard_for_user(user_id) if user_id is not None else None
+        return None
+
+    db_for_read = _db_for_model
+    db_for_write = _db_for_model
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Sharded rows only point at users (unconstrained) or rows of the same user
+        if is_sharded(type(obj1)) or is_sharded(type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in shard_databases():
+            return None
+        # Shard databases only hold the sharded tables
+        return model_name is not None and f'{app_label}.{model_name}' in SHARDED_MODELS
+
+
+class UserShardedQuerySet(models.QuerySet):
+    """QuerySet of a sharded model, with helpers that pick the user's database"""
+
+    def for_user(self, user):
+        """Rows of one user, read from the database that holds them"""
+        user_id = getattr(user, 'pk', user)
+        alias = shard_for_user(user_id)
+        # Left unbound on the default database so routers can send reads to its replicas
+        queryset = self if alias == DEFAULT_DB_ALIAS else self.using(alias)
+        return queryset.filter(user_id=user_id)
+
+    def _shard_of(self, values: Dict) -> Optional[str]:
+        user = values.get('user', values.get('user_id'))
+        if user is not None:
+            return shard_for_user(getattr(user, 'pk', user))
+        return None
+
+    def create(self, **kwargs):
+        if self._db is None and sharding_enabled():
+            alias = self._shard_of(kwargs)
+            if alias:
+                return self.using(alias).create(**kwargs)
+        return super().create(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if self._db is not None or not sharding_enabled():
+            return super().bulk_create(objs, *args, **kwargs)
+        by_shard = defaultdict(list)
+        for obj in objs:
+            by_shard[router.db_for_write(self.model, instance=obj) or DEFAULT_DB_ALIAS].append(obj)
+        created = []
+        for alias, shard_objs in by_shard.items():
+            created.extend(self.using(alias).bulk_create(shard_objs, *args, **kwargs))
+        return created
+
+
+UserShardedManager = models.Manager.from_queryset(UserShardedQuerySet)
+
+
+def unpin(user_ids: List, chunk_size: int = 1000):
+    """Drop directory pins so the users fall back to their hash placement"""
+    from apps.users.models import UserShard
+
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        UserShard.objects.filter(user_id__in=chunk).delete()
+        cache.set_many({f'{DIRECTORY_CACHE_PREFIX}:{user_id}': '' for user_id in chunk}, directory_timeout())
+
+
+def purging_user_rows() -> bool:
+    """
+    Whether the deletes in progress come from delete_user_rows().
+
+    Delete signal handlers that keep sync tombstones or an audit trail skip
+    these: the user is leaving that database, not deleting the rows.
+    """
+    return _purging.get()
+
+
+def _has_field(model, name: str) -> bool:
+    return any(field.name == name for field in model._meta.concrete_fields)
+
+
+def _has_auto_pk(model) -> bool:
+    return isinstance(model._meta.pk, (models.AutoField, models.BigAutoField, models.SmallAutoField))
+
+
+def shard_id_base(alias: str) -> Optional[int]:
+    """First auto-increment id of a shard's range, None for databases outside USER_SHARDS"""
+    shards = list(getattr(settings, 'USER_SHARDS', None) or [])
+    if alias not in shards:
+        return None
+    return (shards.index(alias) + 1) * SHARD_ID_RANGE
+
+
+def reserve_id_ranges(alias: str):
+    """
+    Start the auto-increment ids of a shard's sharded tables at its range.
+
+    Ids then stay unique across shards and rows keep them when their user
+    moves. Sequences already inside the range are left alone. On SQLite an
+    insert with a larger explicit id moves the sequence past it, so moves
+    into a SQLite shard can leave it allocating from another shard's range
+    (ShardMover renumbers the rows that then collide).
+    """
+    base = shard_id_base(alias)
+    if base is None:
+        return
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for model in sharded_models():
+            if not _has_auto_pk(model):
+                continue
+            table, column = model._meta.db_table, model._meta.pk.column
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, column])
+                sequence = cursor.fetchone()[0]
+                cursor.execute(f'SELECT last_value FROM {sequence}')
+                if cursor.fetchone()[0] < base:
+                    cursor.execute('SELECT setval(%s, %s, false)', [sequence, base])
+            elif connection.vendor == 'sqlite':
+                cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, base - 1])
+                elif row[0] < base - 1:
+                    cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [base - 1, table])
+            else:
+                logger.warning(f"No id range reserved for {table} on {alias} ({connection.vendor})")
+
+
+def delete_user_rows(user_id, alias: str) -> int:
+    """Delete every sharded row of a user from one database"""
+    deleted = 0
+    token = _purging.set(True)
+    try:
+        with transaction.atomic(using=alias):
+            for model in reversed(sharded_models()):
+                deleted += model._base_manager.using(alias).filter(user_id=user_id).delete()[0]
+    finally:
+        _purging.reset(token)
+    return deleted
+
+
+class ShardMover:
+    """
+    Moves users' rows between databases.
+
+    A move copies the rows, flips the directory pin so new requests use the
+    target, waits out the directory cache (grace seconds) and copies again
+    whatever a request still routed to the source wrote meanwhile, before
+    deleting the source rows. Rows keep their ids (auto-increment ids come
+    from per-shard ranges, see reserve_id_ranges); a row whose id is taken
+    on the target by another user's row gets a new one, and sync clients a
+    tombstone for the old one. Rows deleted on the source during the grace
+    period are not propagated, so run moves off-peak.
+    """
+
+    def __init__(self, grace: Optional[float] = None, chunk_size: int = 1000):
+        self.grace = directory_timeout() if grace is None else grace
+        self.chunk_size = chunk_size
+        # (model label, source id) -> target id of rows renumbered on a collision, kept across both passes
+        self.renumbered: Dict = {}
+
+    @staticmethod
+    def pin(user_id, alias: str):
+        """Pin a user to a database"""
+        from apps.users.models import UserShard
+
+        UserShard.objects.update_or_create(user_id=user_id, defaults={'database': alias})
+        cache.set(f'{DIRECTORY_CACHE_PREFIX}:{user_id}', alias, directory_timeout())
+
+    @staticmethod
+    def _clear_key_conflicts(model, chunk: List[models.Model], alias: str):
+        """Delete target rows holding a unique key of chunk under another id (recreated on the source meanwhile)"""
+        pks = {obj.pk for obj in chunk}
+        rows = model._base_manager.using(alias).filter(user_id__in={obj.user_id for obj in chunk})
+        for names in model._meta.unique_together:
+            attnames = [model._meta.get_field(name).attname for name in names]
+            keys = {tuple(getattr(obj, attname) for attname in attnames) for obj in chunk}
+            stale = [
+                pk for pk, *key in rows.values_list('pk', *attnames)
+                if tuple(key) in keys and pk not in pks
+            ]
+            if stale:
+                model._base_manager.using(alias).filter(pk__in=stale).delete()
+
+    @staticmethod
+    def _restamp(model, obj: models.Model, now: datetime):
+        """Make sync clients download a row again under its new id"""
+        from .models import SyncTombstone
+        from .sync import COLLECTION_OF_MODEL
+
+        if model in COLLECTION_OF_MODEL:
+            obj.updated_at = now
+        elif model is SyncTombstone:
+            obj.created_at = now
+
+    @staticmethod
+    def _tombstone_renumbered(model, renumbered: List, alias: str):
+        """Tell sync clients the source ids of renumbered rows are gone"""
+        from .models import SyncTombstone
+        from .sync import COLLECTION_OF_MODEL
+
+        collection = COLLECTION_OF_MODEL.get(model)
+        if collection is None or not renumbered:
+            return
+        SyncTombstone.objects.using(alias).bulk_create([
+            SyncTombstone(user_id=obj.user_id, collection=collection, object_id=str(source_pk))
+            for obj, source_pk in renumbered
+        ])
+
+    def _upsert(self, model, objs: List[models.Model], alias: str) -> int:
+        fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+        # bulk_create stamps these with the current time; the source's values are put back
+        stamps = [
+            field.name for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        ]
+        manager = model._base_manager.using(alias)
+        now = timezone.now()
+        for start in range(0, len(objs), self.chunk_size):
+            chunk = objs[start:start + self.chunk_size]
+            for obj in chunk:
+                source_pk = obj.pk
+                obj.pk = self.renumbered.get((model._meta.label, source_pk), source_pk)
+                if obj.pk != source_pk:
+                    self._restamp(model, obj, now)
+            self._clear_key_conflicts(model, chunk, alias)
+            owners = dict(manager.filter(pk__in=[obj.pk for obj in chunk]).values_list('pk', 'user_id'))
+            updates, inserts, renumbered = [], [], []
+            for obj in chunk:
+                if obj.pk not in owners:
+                    inserts.append(obj)
+                elif owners[obj.pk] == obj.user_id:
+                    updates.append(obj)
+                else:
+                    # The id is taken by another user's row (see reserve_id_ranges)
+                    renumbered.append((obj, obj.pk))
+                    obj.pk = None
+                    self._restamp(model, obj, now)
+                    inserts.append(obj)
+            if updates:
+                manager.bulk_update(updates, fields)
+            stamped = [[getattr(obj, name) for name in stamps] for obj in inserts]
+            manager.bulk_create(inserts)
+            if inserts and stamps:
+                for obj, values in zip(inserts, stamped):
+                    for name, value in zip(stamps, values):
+                        setattr(obj, name, value)
+                manager.bulk_update(inserts, stamps)
+            for obj, source_pk in renumbered:
+                self.renumbered[(model._meta.label, source_pk)] = obj.pk
+            self._tombstone_renumbered(model, renumbered, alias)
+            if renumbered:
+                logger.info(f"Renumbered {len(renumbered)} {model._meta.label} rows on {alias}")
+        return len(objs)
+
+    def copy(self, user_id, source: str, target: str, since: Optional[datetime] = None) -> int:
+        """Copy a user's rows (changed since `since`, if given) from source to target"""
+        copied = 0
+        with transaction.atomic(using=target):
+            for model in sharded_models():
+                rows = model._base_manager.using(source).filter(user_id=user_id)
+                if since is not None:
+                    stamp = 'updated_at' if _has_field(model, 'updated_at') else 'created_at'
+                    rows = rows.filter(**{f'{stamp}__gte': since})
+                copied += self._upsert(model, list(rows), target)
+        return copied
+
+    def move(self, moves: Dict, pin_targets: bool = False, sleep=time.sleep) -> Dict[str, int]:
+        """
+        Move users to new databases; moves maps user id -> target alias.
+
+        Target pins are dropped when the target is the user's hash placement
+        unless pin_targets is set.
+        """
+        report = {'users': 0, 'copied': 0, 'recopied': 0, 'deleted': 0}
+        started = {}
+        for user_id, target in moves.items():
+            source = shard_for_user(user_id)
+            if source == target:
+                continue
+            started[user_id] = (source, target, timezone.now())
+            report['copied'] += self.copy(user_id, source, target)
+            self.pin(user_id, target)
+
+        if started and self.grace:
+            sleep(self.grace)
+
+        for user_id, (source, target, since) in started.items():
+            report['recopied'] += self.copy(user_id, source, target, since=since)
+            report['deleted'] += delete_user_rows(user_id, source)
+            if not pin_targets and target == hash_shard(user_id):
+                unpin([user_id])
+            report['users'] += 1
+            logger.info(f"Moved user {user_id} from {source} to {target}")
+        return report
@@ -0,0 +1,27 @@
+"""
+Core signals - Record tombstones of deleted rows for offline sync, reserve shard id ranges
+"""
+from django.db.models.signals import post_delete, post_migrate
+from django.dispatch import receiver
+
+from apps.medications.models import Medication
+from apps.notifications.models import Notification
+from apps.schedules.models import DailySchedule, MedicationDose
+from .sharding import reserve_id_ranges
+from .sync import record_tombstone
+
+
+@receiver(post_delete, sender=Medication)
+@receiver(post_delete, sender=DailySchedule)
+@receiver(post_delete, sender=MedicationDose)
+@receiver(post_delete, sender=Notification)
+def record_sync_tombstone(sender, instance, using, origin=None, **kwargs):
+    """Deleted rows are served to offline clients as tombstones"""
+    record_tombstone(instance, using, origin)
+
+
+@receiver(post_migrate)
+def reserve_shard_id_ranges(sender, using=None, **kwargs):
+    """After every migrate: SQLite table rebuilds reset their sequence"""
+    if sender.name == 'apps.core':
+        reserve_id_ranges(using)
@@ -0,0 +1,224 @@
+"""
+Offline sync - Delta download of a user's changes since a cursor
+
+Medications, daily schedules, doses and notifications are streamed in
+(updated_at, collection, id) order together with tombstones of deleted
+rows, so a returning client downloads only what changed. The cursor is
+the position of the last change served and pages are read with keyset
+conditions on (user, updated_at, id) indexes.
+
+Deleting a medication or schedule implies deleting its schedules and
+doses: the cascade does not record tombstones for those children.
+
+Changes are served only once they are SYNC_SETTLE_SECONDS old, so a
+transaction that commits late cannot slip in behind a cursor already
+handed out.
+"""
+import base64
+import binascii
+import json
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from apps.medications.models import Medication
+from apps.medications.serializers import MedicationRowSerializer
+from apps.notifications.models import Notification
+from apps.schedules.models import DailySchedule, MedicationDose
+
+from .models import SyncMutation, SyncTombstone
+from .sharding import across_shards, purging_user_rows
+
+logger = logging.getLogger(__name__)
+
+TOMBSTONES = 'deleted'
+
+# Collection name -> (model, fields served). Order is the tie-break rank
+# between changes sharing a timestamp.
+COLLECTIONS = {
+    'medications': (Medication, MedicationRowSerializer.value_fields),
+    'schedules': (DailySchedule, [
+        'id', 'medication', 'date', 'scheduled_time', 'taken', 'taken_at', 'skipped',
+        'skipped_reason', 'notification_sent', 'is_active', 'created_at', 'updated_at',
+    ]),
+    'doses': (MedicationDose, [
+        'id', 'medication', 'daily_schedule', 'amount_taken', 'scheduled_time', 'actual_time',
+        'side_effects', 'effectiveness', 'notes', 'is_active', 'created_at', 'updated_at',
+    ]),
+    'notifications': (Notification, [
+        'id', 'title', 'message', 'notification_type', 'is_read', 'created_at', 'read_at', 'updated_at',
+    ]),
+}
+RANKS = {name: rank for rank, name in enumerate([*COLLECTIONS, TOMBSTONES])}
+COLLECTION_OF_MODEL = {model: name for name, (model, _fields) in COLLECTIONS.items()}
+# Foreign keys whose deletion cascades to a synced row
+PARENT_FIELDS = {Medication: 'medication_id', DailySchedule: 'daily_schedule_id'}
+
+
+class CursorError(ValueError):
+    """Malformed sync cursor"""
+
+
+class CursorExpired(CursorError):
+    """Cursor older than the tombstone retention window - the client must resync from scratch"""
+
+
+def sync_options() -> Dict[str, int]:
+    return {
+        'page_size': getattr(settings, 'SYNC_PAGE_SIZE', 200),
+        'max_page_size': getattr(settings, 'SYNC_MAX_PAGE_SIZE', 1000),
+        'settle_seconds': getattr(settings, 'SYNC_SETTLE_SECONDS', 5),
+        'retention_days': getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90),
+    }
+
+
+def _implied_by(instance, origin) -> bool:
+    """Whether the deletion cascades from a parent (or user) deleted along with it"""
+    if origin is None or isinstance(origin, type(instance)):
+        return False
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    if origin_model._meta.label_lower == settings.AUTH_USER_MODEL.lower():
+        return True  # The account and its devices' data go away together
+    return origin_model in PARENT_FIELDS and hasattr(instance, PARENT_FIELDS[origin_model])
+
+
+def record_tombstone(instance, using: str, origin=None):
+    collection = COLLECTION_OF_MODEL.get(type(instance))
+    if collection is None or purging_user_rows() or _implied_by(instance, origin):
+        return
+    SyncTombstone.objects.using(using).create(
+        user_id=instance.user_id, collection=collection, object_id=str(instance.pk)
+    )
+
+
+def prune_sync_records(chunk_size: int = 1000, now=None) -> Dict[str, int]:
+    """Delete tombstones and upload receipts older than the retention window, in chunks, on every shard"""
+    horizon = (now or timezone.now()) - timedelta(days=sync_options()['retention_days'])
+    report = {'tombstones': 0, 'receipts': 0}
+    for name, model in (('tombstones', SyncTombstone), ('receipts', SyncMutation)):
+        for queryset in across_shards(model.objects.filter(created_at__lt=horizon)):
+            while True:
+                ids = list(queryset.order_by('created_at').values_list('id', flat=True)[:chunk_size])
+                if not ids:
+                    break
+                report[name] += model.objects.using(queryset.db).filter(id__in=ids).delete()[0]
+                if len(ids) < chunk_size:
+                    break
+    return report
+
+
+Position = Tuple[Any, int, Any]  # (timestamp, collection rank, id)
+CAUGHT_UP = -1  # Rank of a position before every change at its timestamp
+
+
+def encode_cursor(position: Position) -> str:
+    stamp, rank, pk = position
+    raw = json.dumps([stamp.isoformat(), rank, str(pk)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Position:
+    """Parse a cursor, rejecting ones older than the tombstone retention window"""
+    try:
+        stamp, rank, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        stamp = parse_datetime(stamp)
+        if stamp is None or timezone.is_naive(stamp) or (rank != CAUGHT_UP and rank not in RANKS.values()):
+            raise ValueError
+    except (ValueError, TypeError, binascii.Error):
+        raise CursorError('Invalid sync cursor')
+    if stamp < timezone.now() - timedelta(days=sync_options()['retention_days']):
+        raise CursorExpired('Sync cursor expired, start a full sync')
+    return stamp, rank, str(pk)
+
+
+def _after(model, stamp_field: str, rank: int, position: Optional[Position]) -> Q:
+    """Keyset condition for rows of one collection after the cursor position"""
+    if position is None:
+        return Q()
+    stamp, cursor_rank, pk = position
+    if rank > cursor_rank:
+        return Q(**{f'{stamp_field}__gte': stamp})
+    if rank < cursor_rank:
+        return Q(**{f'{stamp_field}__gt': stamp})
+    try:
+        pk = model._meta.pk.to_python(pk)
+    except ValidationError:
+        raise CursorError('Invalid sync cursor')
+    return Q(**{f'{stamp_field}__gt': stamp}) | Q(**{stamp_field: stamp, 'pk__gt': pk})
+
+
+def _representation(value: Any, datetime_field: serializers.DateTimeField) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, 'tzinfo') and hasattr(value, 'date'):
+        return datetime_field.to_representation(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)  # UUIDs and decimals, as DRF renders them
+
+
+def download_changes(user, cursor: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    One page of a user's changes after cursor.
+
+    Each collection contributes at most limit + 1 rows in keyset order; the
+    first limit of the merged stream are served and the cursor moves to the
+    last of them, or to the settle horizon once the client has caught up
+    so idle clients keep fresh cursors. Without a cursor (first sync)
+    tombstones are skipped.
+    """
+    options = sync_options()
+    limit = min(max(1, limit or options['page_size']), options['max_page_size'])
+    position = decode_cursor(cursor) if cursor else None
+    horizon = timezone.now() - timedelta(seconds=options['settle_seconds'])
+
+    candidates: List[Tuple[Position, str, Dict[str, Any]]] = []
+    for name, (model, fields) in COLLECTIONS.items():
+        rows = (
+            model.objects.for_user(user)
+            .filter(_after(model, 'updated_at', RANKS[name], position), updated_at__lt=horizon)
+            .order_by('updated_at', 'pk')
+            .values(*fields)[:limit + 1]
+        )
+        candidates.extend(((row['updated_at'], RANKS[name], row['id']), name, row) for row in rows)
+    if position is not None:
+        tombstones = (
+            SyncTombstone.objects.for_user(user)
+            .filter(_after(SyncTombstone, 'created_at', RANKS[TOMBSTONES], position), created_at__lt=horizon)
+            .order_by('created_at', 'pk')
+            .values('id', 'collection', 'object_id', 'created_at')[:limit + 1]
+        )
+        candidates.extend(((row['created_at'], RANKS[TOMBSTONES], row['id']), TOMBSTONES, row) for row in tombstones)
+
+    # Typed ids: within a (timestamp, collection) tie the order must be the database's, which
+    # the pk__gt cursor condition follows (as strings, id 10 would sort before id 9)
+    candidates.sort(key=lambda candidate: candidate[0])
+    page = candidates[:limit]
+
+    medication_rows = MedicationRowSerializer()
+    datetime_field = medication_rows.datetime_field
+    changes = {name: [] for name in COLLECTIONS}
+    deleted = {name: [] for name in COLLECTIONS}
+    for _position, name, row in page:
+        if name == TOMBSTONES:
+            deleted[row['collection']].append(row['object_id'])
+        elif name == 'medications':
+            changes[name].append(medication_rows.to_representation(row))
+        else:
+            changes[name].append({field: _representation(value, datetime_field) for field, value in row.items()})
+
+    has_more = len(candidates) > limit
+    return {
+        'changes': changes,
+        'deleted': deleted,
+        'cursor': encode_cursor(page[-1][0] if has_more else (horizon, CAUGHT_UP, '')),
+        'has_more': has_more,
+    }
@@ -0,0 +1,327 @@
+"""
+Offline sync upload - Idempotent batched apply of client mutations
+
+A batch is applied in one transaction on the user's database: the
+targets are loaded and locked with one query per model, mutations are
+applied in memory in client order, and the rows are written back with a
+few bulk statements together with one receipt per mutation. A retried
+batch is answered from the receipts.
+
+Conflict rules:
+- medication.update is resolved per field. Stock counts are server-wins:
+  they only apply if the row is unchanged since the client's
+  base_updated_at. The other fields are last-writer-wins: they apply if
+  the edit was made (client_time) after the row's last server change.
+- dose.taken / dose.skipped target a daily schedule. A taken dose beats
+  a skip from any device; taking it again keeps the earliest taken_at.
+- notification.read only ever marks as read, keeping the earliest read_at.
+
+Client times in the future are clamped to the server clock, so a fast
+device clock cannot win every conflict.
+"""
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from apps.medications.history import record_saved
+from apps.medications.slots import SLOT_FIELDS, sync_slots
+from apps.medications.models import DOSAGE_FIELDS, Medication
+from apps.medications.serializers import MedicationUpdateSerializer
+from apps.notifications.models import Notification
+from apps.schedules.models import DailySchedule
+
+from .models import SyncMutation
+from .sharding import shard_for_user
+
+logger = logging.getLogger(__name__)
+
+TARGET_MODELS = {
+    'medication.update': Medication,
+    'dose.taken': DailySchedule,
+    'dose.skipped': DailySchedule,
+    'notification.read': Notification,
+}
+SERVER_WINS_FIELDS = ('total_pills', 'remaining_pills')
+SKIP_REASONS = {choice for choice, _label in DailySchedule._meta.get_field('skipped_reason').choices}
+# Fields with at most this many distinct values in a batch are written with plain UPDATEs
+GROUPED_WRITE_MAX_VALUES = 8
+
+
+class MutationError(ValueError):
+    """Mutation that cannot be applied as sent"""
+
+
+def max_upload_mutations() -> int:
+    return getattr(settings, 'SYNC_MAX_UPLOAD_MUTATIONS', 1000)
+
+
+def _parse_time(value: Any, name: str, now) -> Optional[Any]:
+    if value in (None, ''):
+        return None
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None or timezone.is_naive(parsed):
+        raise MutationError(f'{name} must be an ISO 8601 datetime with a timezone')
+    return min(parsed, now)
+
+
+def bulk_write(model, objs: List[Any], fields: List[str], using: str):
+    """
+    Write fields of objs in a handful of statements.
+
+    bulk_update() puts every field in a CASE with one branch per row. Here
+    fields with few distinct values (flags, the batch timestamp) are set
+    with one UPDATE ... WHERE pk IN per combination of values, and only
+    the remaining fields go through bulk_update().
+    """
+    grouped, varying = [], []
+    for name in fields:
+        try:
+            values = {getattr(obj, name) for obj in objs}
+        except TypeError:  # Unhashable values such as lists
+            values = None
+        (grouped if values is not None and len(values) <= GROUPED_WRITE_MAX_VALUES else varying).append(name)
+
+    manager = model._base_manager.using(using)
+    if grouped:
+        groups = defaultdict(list)
+        for obj in objs:
+            groups[tuple(getattr(obj, name) for name in grouped)].append(obj.pk)
+        for values, pks in groups.items():
+            manager.filter(pk__in=pks).update(**dict(zip(grouped, values)))
+    if varying:
+        manager.bulk_update(objs, varying)
+
+
+def parse_mutation(raw: Any, now) -> Dict[str, Any]:
+    """Validate the envelope of a client mutation"""
+    if not isinstance(raw, dict):
+        raise MutationError('Mutation must be an object')
+    key = raw.get('id')
+    if not isinstance(key, str) or not key or len(key) > 100:
+        raise MutationError('id must be a string of at most 100 characters')
+    kind = raw.get('type')
+    if kind not in TARGET_MODELS:
+        raise MutationError(f"type must be one of {', '.join(TARGET_MODELS)}")
+    try:
+        target = TARGET_MODELS[kind]._meta.pk.to_python(raw.get('target'))
+    except ValidationError:
+        target = None
+    if target is None:
+        raise MutationError('target must be the id of the changed object')
+    fields = raw.get('fields') or {}
+    if not isinstance(fields, dict):
+        raise MutationError('fields must be an object')
+    return {
+        'key': key,
+        'kind': kind,
+        'target': target,
+        'client_time': _parse_time(raw.get('client_time'), 'client_time', now) or now,
+        'base': _parse_time(raw.get('base_updated_at'), 'base_updated_at', now),
+        'fields': fields,
+    }
+
+
+class MutationBatch:
+    """
+    Applies one upload for one user.
+
+    results keeps the client's order: one entry per mutation, with status
+    applied, conflict (some or all changes lost to the server, whose values
+    are returned), rejected (invalid or unknown target) or the original
+    result flagged duplicate.
+    """
+
+    def __init__(self, user, mutations: List[Any]):
+        self.user = user
+        self.alias = shard_for_user(user.pk)
+        self.now = timezone.now()
+        self.results: List[Optional[Dict[str, Any]]] = [None] * len(mutations)
+        self.parsed: List[Tuple[int, Dict[str, Any]]] = []
+        for index, raw in enumerate(mutations):
+            try:
+                self.parsed.append((index, parse_mutation(raw, self.now)))
+            except MutationError as e:
+                key = raw.get('id') if isinstance(raw, dict) else None
+                self.results[index] = {'id': key, 'status': 'rejected', 'error': str(e)}
+
+    def apply(self) -> List[Dict[str, Any]]:
+        # A concurrent retry of the same batch can win the receipt race once
+        for attempt in range(2):
+            try:
+                with transaction.atomic(using=self.alias):
+                    self._apply()
+                return self.results
+            except IntegrityError:
+                if attempt:
+                    raise
+                logger.info(f"Sync upload for user {self.user.pk} raced a retry, re-reading receipts")
+
+    def _load(self, model, ids) -> Dict[Any, Any]:
+        if not ids:
+            return {}
+        return (
+            model.objects.using(self.alias).select_for_update()
+            .filter(user_id=self.user.pk, pk__in=ids).order_by('pk').in_bulk()
+        )
+
+    def _apply(self):
+        keys = [mutation['key'] for _index, mutation in self.parsed]
+        receipts = dict(
+            SyncMutation.objects.using(self.alias)
+            .filter(user_id=self.user.pk, key__in=keys).values_list('key', 'result')
+        )
+        fresh, seen = [], set()
+        for index, mutation in self.parsed:
+            if mutation['key'] in receipts:
+                self.results[index] = {**receipts[mutation['key']], 'duplicate': True}
+            elif mutation['key'] in seen:
+                self.results[index] = {'id': mutation['key'], 'status': 'rejected', 'error': 'Duplicate id in batch'}
+            else:
+                seen.add(mutation['key'])
+                fresh.append((index, mutation))
+
+        targets = lambda model: {m['target'] for _i, m in fresh if TARGET_MODELS[m['kind']] is model}
+        self.schedules = self._load(DailySchedule, targets(DailySchedule))
+        self.notifications = self._load(Notification, targets(Notification))
+        self.medications = self._load(
+            Medication, targets(Medication) | {schedule.medication_id for schedule in self.schedules.values()}
+        )
+        # Server clocks as loaded, before this batch touches the rows
+        self.clocks = {pk: medication.updated_at for pk, medication in self.medications.items()}
+        self.medication_fields = set()
+        # One serializer per batch: building its fields costs more than validating
+        self.medication_serializer = MedicationUpdateSerializer(partial=True)
+        self.dirty = {Medication: {}, DailySchedule: {}, Notification: {}}
+
+        handlers = {
+            'medication.update': self._update_medication,
+            'dose.taken': self._take_dose,
+            'dose.skipped': self._skip_dose,
+            'notification.read': self._read_notification,
+        }
+        receipts = []
+        for index, mutation in fresh:
+            try:
+                result = handlers[mutation['kind']](mutation)
+            except MutationError as e:
+                result = {'status': 'rejected', 'error': str(e)}
+            self.results[index] = result = {'id': mutation['key'], **result}
+            receipts.append(SyncMutation(
+                user_id=self.user.pk, key=mutation['key'], kind=mutation['kind'], result=result
+            ))
+
+        self._write(Medication, sorted(self.medication_fields | {'updated_at'}))
+        rescheduled = []
+        for medication in self.dirty[Medication].values():
+            # Bulk writes send no signals; the rows were loaded with their snapshot
+            changes = record_saved(medication, self.alias, self.medication_fields)
+            if any(name in changes for name in SLOT_FIELDS):
+                rescheduled.append(medication)
+        sync_slots(rescheduled, self.alias)
+        self._write(DailySchedule, ['taken', 'taken_at', 'skipped', 'skipped_reason', 'updated_at'])
+        self._write(Notification, ['is_read', 'read_at', 'updated_at'])
+        SyncMutation.objects.using(self.alias).bulk_create(receipts)
+
+    def _write(self, model, fields: List[str]):
+        objs = list(self.dirty[model].values())
+        if objs:
+            for obj in objs:
+                obj.updated_at = self.now
+            bulk_write(model, objs, fields, self.alias)
+
+    def _target(self, rows: Dict[Any, Any], mutation: Dict[str, Any]):
+        obj = rows.get(mutation['target'])
+        if obj is None:
+            raise MutationError('Target not found')
+        return obj
+
+    def _update_medication(self, mutation: Dict[str, Any]) -> Dict[str, Any]:
+        medication = self._target(self.medications, mutation)
+        try:
+            validated = self.medication_serializer.run_validation(mutation['fields'])
+        except serializers.ValidationError as e:
+            return {'status': 'rejected', 'error': e.detail}
+
+        clock = self.clocks[medication.pk]
+        unchanged_since_base = mutation['base'] is not None and mutation['base'] >= clock
+        applied, lost = [], []
+        for name, value in validated.items():
+            if name in SERVER_WINS_FIELDS:
+                wins = unchanged_since_base
+            else:
+                wins = unchanged_since_base or mutation['client_time'] >= clock
+            if wins:
+                setattr(medication, name, value)
+                applied.append(name)
+            else:
+                lost.append(name)
+        if applied:
+            if 'dosage' in applied:
+                # Bulk writes skip Medication.save()
+                medication.parse_dosage()
+                self.medication_fields.update(DOSAGE_FIELDS)
+            self.medication_fields.update(applied)
+            self.dirty[Medication][medication.pk] = medication
+        if not lost:
+            return {'status': 'applied', 'fields': applied}
+        server = self.medication_serializer.to_representation(medication)
+        return {'status': 'conflict', 'fields': applied, 'server': {name: server[name] for name in lost}}
+
+    def _take_dose(self, mutation: Dict[str, Any]) -> Dict[str, Any]:
+        schedule = self._target(self.schedules, mutation)
+        taken_at = _parse_time(mutation['fields'].get('taken_at'), 'taken_at', self.now) or mutation['client_time']
+        if schedule.taken:
+            if schedule.taken_at and taken_at >= schedule.taken_at:
+                return {'status': 'applied'}
+            schedule.taken_at = taken_at
+        else:
+            schedule.taken, schedule.taken_at = True, taken_at
+            schedule.skipped, schedule.skipped_reason = False, ''
+            # Same stock rule as DailySchedule.mark_taken()
+            medication = self.medications.get(schedule.medication_id)
+            if medication is not None and medication.remaining_pills is not None:
+                medication.remaining_pills = max(0, medication.remaining_pills - medication.pills_per_dose)
+                self.medication_fields.add('remaining_pills')
+                self.dirty[Medication][medication.pk] = medication
+        self.dirty[DailySchedule][schedule.pk] = schedule
+        return {'status': 'applied'}
+
+    def _skip_dose(self, mutation: Dict[str, Any]) -> Dict[str, Any]:
+        schedule = self._target(self.schedules, mutation)
+        reason = mutation['fields'].get('reason') or ''
+        if reason and reason not in SKIP_REASONS:
+            raise MutationError(f"reason must be one of {', '.join(sorted(SKIP_REASONS))}")
+        if schedule.taken:
+            return {
+                'status': 'conflict',
+                'server': {'taken': True, 'taken_at': schedule.taken_at.isoformat() if schedule.taken_at else None},
+            }
+        schedule.skipped, schedule.skipped_reason = True, reason
+        self.dirty[DailySchedule][schedule.pk] = schedule
+        return {'status': 'applied'}
+
+    def _read_notification(self, mutation: Dict[str, Any]) -> Dict[str, Any]:
+        notification = self._target(self.notifications, mutation)
+        read_at = _parse_time(mutation['fields'].get('read_at'), 'read_at', self.now) or mutation['client_time']
+        if not notification.is_read:
+            notification.is_read, notification.read_at = True, read_at
+        elif notification.read_at is None or read_at < notification.read_at:
+            notification.read_at = read_at
+        else:
+            return {'status': 'applied'}
+        self.dirty[Notification][notification.pk] = notification
+        return {'status': 'applied'}
+
+
+def apply_mutations(user, mutations: List[Any]) -> List[Dict[str, Any]]:
+    """Apply a batch of client mutations, returning one result per mutation"""
+    if len(mutations) > max_upload_mutations():
+        raise MutationError(f'At most {max_upload_mutations()} mutations per upload')
+    return MutationBatch(user, mutations).apply()
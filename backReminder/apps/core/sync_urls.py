@@ -0,0 +1,12 @@
+"""
+Sync URLs - Offline synchronization for mobile clients
+"""
+from django.urls import path
+from . import views
+
+app_name = 'sync'
+
+urlpatterns = [
+    path('download/', views.sync_download, name='download'),
+    path('upload/', views.sync_upload, name='upload'),
+]
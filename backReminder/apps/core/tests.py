@@ -0,0 +1,207 @@
+import time as clock
+from datetime import date, time, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.medications.models import Medication
+from apps.notifications.models import Notification
+from apps.schedules.models import DailySchedule
+from apps.users.models import User
+
+from .models import SyncMutation, SyncTombstone
+from .sharding import ShardMover
+from .sync import download_changes
+from .sync_upload import apply_mutations
+
+
+class DownloadChangesTests(TestCase):
+
+    def test_pages_through_rows_sharing_a_timestamp(self):
+        """Integer ids tied on updated_at ('9' and '10') come back in cursor order, none skipped"""
+        user = User.objects.create_user(username='sync', email='sync@example.com', password='x')
+        Notification.objects.bulk_create(
+            Notification(user=user, title=f'Notification {index}', message='') for index in range(15)
+        )
+        # What mark_all_read does: every notification gets the same updated_at
+        Notification.objects.filter(user=user).update(updated_at=timezone.now() - timedelta(minutes=1))
+        expected = list(Notification.objects.filter(user=user).order_by('pk').values_list('pk', flat=True))
+        self.assertTrue(any(pk < 10 for pk in expected) and any(pk >= 10 for pk in expected))
+
+        served, cursor = [], None
+        for _page in range(10):
+            page = download_changes(user, cursor=cursor, limit=4)
+            served.extend(row['id'] for row in page['changes']['notifications'])
+            cursor = page['cursor']
+            if not page['has_more']:
+                break
+
+        self.assertEqual(served, expected)
+
+
+class MutationBatchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='upload', email='upload@example.com', password='x')
+        self.medication = Medication.objects.create(
+            user=self.user, name='Aspirin', dosage='1 tablet', times=[time(9, 0)], total_pills=30, remaining_pills=30
+        )
+        self.schedule = DailySchedule.objects.create(
+            user=self.user, medication=self.medication, date=date(2026, 3, 2), scheduled_time=time(9, 0)
+        )
+        self.notification = Notification.objects.create(user=self.user, title='Take Aspirin', message='')
+
+    def mutation(self, key, kind, target, **fields):
+        client_time = fields.pop('client_time', None)
+        base = fields.pop('base_updated_at', None)
+        return {
+            'id': key, 'type': kind, 'target': str(target), 'fields': fields,
+            'client_time': client_time and client_time.isoformat(),
+            'base_updated_at': base and base.isoformat(),
+        }
+
+    def test_stock_is_server_wins_and_other_fields_last_writer_wins(self):
+        """Offline edits keep newer field values; stock only moves from an up-to-date copy"""
+        server_clock = self.medication.updated_at
+        results = apply_mutations(self.user, [
+            # Edited after the server change, from a stale copy
+            self.mutation(
+                'newer', 'medication.update', self.medication.pk, name='Aspirin 100', remaining_pills=5,
+                client_time=timezone.now(), base_updated_at=server_clock - timedelta(hours=1),
+            ),
+            # Edited before the server change
+            self.mutation(
+                'older', 'medication.update', self.medication.pk, notes='With food',
+                client_time=server_clock - timedelta(hours=1),
+            ),
+        ])
+
+        self.assertEqual(
+            [(result['status'], result['fields']) for result in results],
+            [('conflict', ['name']), ('conflict', [])]
+        )
+        self.assertEqual(results[0]['server'], {'remaining_pills': 30})
+        self.assertEqual(results[1]['server'], {'notes': ''})
+        self.medication.refresh_from_db()
+        self.assertEqual((self.medication.name, self.medication.remaining_pills, self.medication.notes), ('Aspirin 100', 30, ''))
+
+        results = apply_mutations(self.user, [self.mutation(
+            'current', 'medication.update', self.medication.pk, remaining_pills=5,
+            base_updated_at=self.medication.updated_at,
+        )])
+
+        self.assertEqual(results[0]['status'], 'applied')
+        self.medication.refresh_from_db()
+        self.assertEqual(self.medication.remaining_pills, 5)
+
+    def test_taken_beats_skipped_and_keeps_earliest_taken_at(self):
+        """A skip from another device loses to a taken dose, whichever arrives first"""
+        first, later = timezone.now() - timedelta(hours=2), timezone.now() - timedelta(hours=1)
+        results = apply_mutations(self.user, [
+            self.mutation('skip', 'dose.skipped', self.schedule.pk, reason='forgot'),
+            self.mutation('take-later', 'dose.taken', self.schedule.pk, taken_at=later.isoformat()),
+            self.mutation('skip-again', 'dose.skipped', self.schedule.pk),
+            self.mutation('take-first', 'dose.taken', self.schedule.pk, taken_at=first.isoformat()),
+        ])
+
+        self.assertEqual([result['status'] for result in results], ['applied', 'applied', 'conflict', 'applied'])
+        self.schedule.refresh_from_db()
+        self.assertEqual((self.schedule.taken, self.schedule.skipped, self.schedule.taken_at), (True, False, first))
+        # Stock is taken out once per dose, not once per report
+        self.medication.refresh_from_db()
+        self.assertEqual(self.medication.remaining_pills, 29)
+
+    def test_read_keeps_earliest_read_at(self):
+        first, later = timezone.now() - timedelta(hours=2), timezone.now() - timedelta(hours=1)
+        apply_mutations(self.user, [
+            self.mutation('phone', 'notification.read', self.notification.pk, read_at=later.isoformat()),
+            self.mutation('tablet', 'notification.read', self.notification.pk, read_at=first.isoformat()),
+            self.mutation('watch', 'notification.read', self.notification.pk, read_at=later.isoformat()),
+        ])
+
+        self.notification.refresh_from_db()
+        self.assertEqual((self.notification.is_read, self.notification.read_at), (True, first))
+
+    def test_retried_batch_is_answered_from_receipts(self):
+        """A client retrying after a lost response gets the same results and applies nothing twice"""
+        batch = [
+            self.mutation('take', 'dose.taken', self.schedule.pk),
+            self.mutation('rename', 'medication.update', self.medication.pk, name='Aspirin 100'),
+            self.mutation('missing', 'notification.read', 0),
+        ]
+        results = apply_mutations(self.user, batch)
+        updated_at = Medication.objects.get(pk=self.medication.pk).updated_at
+
+        replayed = apply_mutations(self.user, batch)
+
+        self.assertEqual(replayed, [{**result, 'duplicate': True} for result in results])
+        self.assertEqual(results[2]['status'], 'rejected')
+        self.assertEqual(SyncMutation.objects.filter(user=self.user).count(), 3)
+        self.medication.refresh_from_db()
+        self.assertEqual((self.medication.remaining_pills, self.medication.updated_at), (29, updated_at))
+
+    def test_hundreds_of_mutations_in_a_few_queries(self):
+        """The number of queries doesn't grow with the batch, and a full batch applies well under a second"""
+        medications = Medication.objects.bulk_create(
+            Medication(user=self.user, name=f'Medication {index}', dosage='1 tablet', times=[time(9, 0)])
+            for index in range(50)
+        )
+        schedules = DailySchedule.objects.bulk_create(
+            DailySchedule(user=self.user, medication=medications[index % 50], date=date(2026, 3, 2),
+                          scheduled_time=time(index // 50, 0))
+            for index in range(300)
+        )
+        notifications = Notification.objects.bulk_create(
+            Notification(user=self.user, title=f'Notification {index}', message='') for index in range(150)
+        )
+        batch = (
+            [self.mutation(f'm{index}', 'medication.update', m.pk, notes='With food') for index, m in enumerate(medications)]
+            + [self.mutation(f's{index}', 'dose.taken', s.pk) for index, s in enumerate(schedules)]
+            + [self.mutation(f'n{index}', 'notification.read', n.pk) for index, n in enumerate(notifications)]
+        )
+
+        started = clock.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            results = apply_mutations(self.user, batch)
+        elapsed = clock.perf_counter() - started
+
+        self.assertEqual({result['status'] for result in results}, {'applied'})
+        self.assertLessEqual(len(queries), 16)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(DailySchedule.objects.filter(user=self.user, taken=True).count(), 300)
+
+
+class ShardMoverTests(TestCase):
+
+    def test_renumbered_rows_reach_sync_clients(self):
+        """A moved notification whose id is taken gets a new one, re-served, and a tombstone for the old one"""
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        moving = User.objects.create_user(username='moving', email='moving@example.com', password='x')
+        taken = Notification.objects.create(user=owner, title='Taken', message='')
+        created = timezone.now() - timedelta(days=3)
+        started = timezone.now()
+        mover = ShardMover(grace=0)
+
+        mover._upsert(Notification, [Notification(
+            pk=taken.pk, user=moving, title='Moved', message='', created_at=created, updated_at=created
+        )], 'default')
+
+        moved = Notification.objects.get(user=moving)
+        self.assertNotEqual(moved.pk, taken.pk)
+        self.assertEqual(moved.created_at, created)
+        self.assertGreaterEqual(moved.updated_at, started)
+        self.assertEqual(Notification.objects.get(pk=taken.pk).title, 'Taken')
+        tombstone = SyncTombstone.objects.get(user=moving)
+        self.assertEqual((tombstone.collection, tombstone.object_id), ('notifications', str(taken.pk)))
+
+        # The second pass updates the renumbered row instead of inserting it again
+        mover._upsert(Notification, [Notification(
+            pk=taken.pk, user=moving, title='Moved', message='', is_read=True, created_at=created, updated_at=created
+        )], 'default')
+
+        moved_again = Notification.objects.get(user=moving)
+        self.assertEqual(moved_again.pk, moved.pk)
+        self.assertTrue(moved_again.is_read)
+        self.assertGreaterEqual(moved_again.updated_at, started)
@@ -1,9 +1,11 @@
 """
 Core utilities and helper functions
 """
+import hashlib
 import re
 from typing import Dict, List, Any
 from django.core.exceptions import ValidationError
+from django.utils.http import parse_etags, quote_etag
 from django.utils.translation import gettext_lazy as _
 
 
@@ -112,3 +114,27 @@ def format_api_success(data: Any, message: str = 'Success') -> Dict[str, Any]:
         'message': message,
         'data': data
     }
+
+
+def compute_etag(*parts: Any) -> str:
+    """
+    Build a quoted ETag from the values a response depends on
+    (ids, updated_at timestamps, counts...)
+    """
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False)
+    return quote_etag(digest.hexdigest())
+
+
+def etag_matches(request, etag: str) -> bool:
+    """
+    Check a request's If-None-Match header against an ETag, using the weak
+    comparison RFC 7232 prescribes for conditional GETs
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if '*' in etags:
+        return True
+    bare = etag.removeprefix('W/')
+    return any(candidate.removeprefix('W/') == bare for candidate in etags)
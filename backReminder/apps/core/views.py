@@ -1,13 +1,20 @@
 """
-Core views - System health and status
+Core views - System health, status and offline sync
 """
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.db import connections
 from django.core.cache import cache
+from rest_framework import status as http_status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 import json
 
+from .sync import CursorError, CursorExpired, download_changes
+from .sync_upload import MutationError, apply_mutations
+
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -24,7 +31,8 @@ def home(request):
             'users': '/api/users/',
             'health': '/health/',
             'api_docs': '/api/docs/',
-            'api_schema': '/api/schema/'
+            'api_schema': '/api/schema/',
+            'sync': '/api/sync/'
         },
         'documentation': '/api/docs/'
     })
@@ -87,3 +95,45 @@ def system_status(request):
         'status': 'healthy' if overall_healthy else 'degraded',
         'services': status
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_download(request):
+    """
+    Changes since the client's cursor, with tombstones of deleted rows.
+
+    Clients follow the returned cursor while has_more is true and keep the
+    last one for their next sync. 410 means the cursor is too old and the
+    client must start over without one.
+    """
+    try:
+        limit = int(request.query_params.get('limit') or 0) or None
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=http_status.HTTP_400_BAD_REQUEST)
+    try:
+        page = download_changes(request.user, request.query_params.get('cursor') or None, limit)
+    except CursorExpired as e:
+        return Response({'error': str(e)}, status=http_status.HTTP_410_GONE)
+    except CursorError as e:
+        return Response({'error': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+    return Response(page)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def sync_upload(request):
+    """
+    Apply a batch of offline mutations in one transaction.
+
+    Each mutation carries a client-generated id; resending a batch returns
+    the original results instead of applying it twice.
+    """
+    mutations = request.data.get('mutations') if isinstance(request.data, dict) else None
+    if not isinstance(mutations, list):
+        return Response({'error': 'mutations must be a list'}, status=http_status.HTTP_400_BAD_REQUEST)
+    try:
+        results = apply_mutations(request.user, mutations)
+    except MutationError as e:
+        return Response({'error': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+    return Response({'results': results})
@@ -0,0 +1,32 @@
+"""
+Medication Reminder - Medication Admin Configuration
+Copyright (C) 2025 Francisco [Tu Apellido/Empresa]. All Rights Reserved.
+"""
+
+from django.contrib import admin
+from apps.core.pagination import EstimatedCountPaginator
+from .models import Medication
+from .search import matching
+
+
+@admin.register(Medication)
+class MedicationAdmin(admin.ModelAdmin):
+    """Admin configuration for Medication model"""
+    
+    list_display = ('name', 'dosage', 'user', 'frequency', 'remaining_pills', 'is_active', 'created_at')
+    list_filter = ('is_active', 'frequency', 'medication_type')
+    # Email prefix, plus the indexed name/condition/prescriber search of search.py
+    search_fields = ('^user__email',)
+    # Served by the (user, name) index
+    ordering = ('user', 'name')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('created_at', 'updated_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_search_results(self, request, queryset, search_term):
+        by_email, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term:
+            return by_email, may_have_duplicates
+        return by_email | matching(queryset, search_term), may_have_duplicates
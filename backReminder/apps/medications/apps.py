@@ -5,3 +5,6 @@ class MedicationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.medications'
     verbose_name = 'Medications'
+
+    def ready(self):
+        from . import signals  # noqa: F401
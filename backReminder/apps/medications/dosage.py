@@ -0,0 +1,88 @@
+"""
+Dosage parsing - Structured quantity and unit from the free-text dosage
+
+Dosages are parsed once, when a medication is saved, into the
+dose_quantity, dose_unit and pills_per_dose columns, so stock and supply
+math reads numbers instead of re-parsing text (and can run in SQL).
+
+Only counted units ('2 tablets', '1 capsule', or a bare '2') are stock
+units: a strength such as '500mg' is one pill per dose, not 500.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple, Optional
+
+# '2 tablets', '1.5 ml', '0,5 mg', '500mg'
+AMOUNT_PATTERN = re.compile(r'(\d+(?:[.,]\d+)?)\s*([^\W\d_]+|%)?')
+
+# Spellings -> unit; units counted out of stock one by one
+COUNT_UNITS = {
+    'tablet': ('tablet', 'tablets', 'tab', 'tabs', 'pill', 'pills', 'tableta', 'tabletas', 'pastilla', 'pastillas',
+               'comprimido', 'comprimidos'),
+    'capsule': ('capsule', 'capsules', 'cap', 'caps', 'capsula', 'capsulas', 'cápsula', 'cápsulas'),
+    'drop': ('drop', 'drops', 'gota', 'gotas'),
+    'puff': ('puff', 'puffs', 'inhalation', 'inhalations', 'disparo', 'disparos', 'inhalacion', 'inhalaciones'),
+    'patch': ('patch', 'patches', 'parche', 'parches'),
+    'sachet': ('sachet', 'sachets', 'sobre', 'sobres'),
+    'ampoule': ('ampoule', 'ampoules', 'ampolla', 'ampollas', 'ampolleta', 'ampolletas'),
+    'dose': ('dose', 'doses', 'dosis'),
+}
+MEASURE_UNITS = {
+    'mg': ('mg', 'mgs', 'milligram', 'milligrams', 'miligramo', 'miligramos'),
+    'g': ('g', 'gr', 'gram', 'grams', 'gramo', 'gramos'),
+    'mcg': ('mcg', 'µg', 'μg', 'ug', 'microgram', 'micrograms', 'microgramo', 'microgramos'),
+    'ml': ('ml', 'milliliter', 'milliliters', 'millilitre', 'millilitres', 'mililitro', 'mililitros', 'cc'),
+    'l': ('l', 'liter', 'liters', 'litre', 'litres', 'litro', 'litros'),
+    'iu': ('iu', 'ui', 'unit', 'units', 'unidad', 'unidades'),
+    '%': ('%',),
+}
+UNITS = {
+    spelling: unit
+    for table in (COUNT_UNITS, MEASURE_UNITS) for unit, spellings in table.items() for spelling in spellings
+}
+
+# Bounds of Medication.dose_quantity (max_digits=8, decimal_places=2)
+MAX_QUANTITY = Decimal('999999.99')
+MAX_PILLS_PER_DOSE = 100
+
+
+class Dosage(NamedTuple):
+    quantity: Optional[Decimal]
+    unit: str
+    pills_per_dose: int
+
+
+def _quantity(text: str) -> Optional[Decimal]:
+    try:
+        quantity = Decimal(text.replace(',', '.')).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+    return quantity if quantity <= MAX_QUANTITY else None
+
+
+def _unit(word: Optional[str]) -> str:
+    # Words that are not units ('2 every morning') leave the amount bare
+    return UNITS.get(word.lower(), '') if word else ''
+
+
+def _pills(quantity: Optional[Decimal]) -> int:
+    if quantity is None or quantity < 1:
+        return 1
+    return min(int(quantity), MAX_PILLS_PER_DOSE)
+
+
+def parse_dosage(dosage: str) -> Dosage:
+    """
+    Quantity and unit of the first amount in dosage, and the stock units per dose.
+
+    The stock count comes from the first counted amount ('500mg, 2 tablets'
+    takes 2), else from a bare number, else it is 1.
+    """
+    amounts = [(_quantity(number), _unit(word)) for number, word in AMOUNT_PATTERN.findall(dosage or '')]
+    if not amounts:
+        return Dosage(None, '', 1)
+    quantity, unit = amounts[0]
+    counted = next((amount for amount, word in amounts if word in COUNT_UNITS), None)
+    if counted is None and not unit:
+        counted = quantity
+    return Dosage(quantity, unit, _pills(counted))
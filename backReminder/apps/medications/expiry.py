@@ -0,0 +1,84 @@
+"""
+Medication expiry - Nightly deactivation of medications past their end date
+
+On each shard the expired medications are deactivated with one UPDATE
+(through the partial index medication_expiry_idx), then their dose slots
+and their untaken schedules from today on are deleted in chunks, so
+reminders stop and the is_active filtered queries stay small.
+
+A queryset update sends no signals: the history rows and dose slots the
+save signals would maintain are written here.
+"""
+import logging
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.sharding import across_shards
+from apps.schedules.models import DailySchedule
+
+from .history import record_many
+from .models import DoseSlot, Medication
+
+logger = logging.getLogger(__name__)
+
+# Westernmost offset in use (Baker Island, UTC-12)
+EARLIEST_UTC_OFFSET = timedelta(hours=-12)
+
+
+def expiry_date(now: datetime) -> date:
+    """
+    The date it is in the westernmost timezone at `now`.
+
+    Medications ending before it have ended for every user, whatever their
+    timezone, and no user's today is earlier.
+    """
+    return (now + EARLIEST_UTC_OFFSET).astimezone(dt_timezone.utc).date()
+
+
+def _purge_schedules(medication_ids: List, using: str, since: date, batch_size: int) -> int:
+    """Delete the untaken schedules of medications dated `since` or later, batch_size rows per statement"""
+    schedules = DailySchedule.objects.using(using).filter(
+        medication_id__in=medication_ids, taken=False, date__gte=since
+    )
+    deleted = 0
+    while True:
+        ids = list(schedules.order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        # Deleted through the ORM so offline clients get tombstones
+        deleted += DailySchedule.objects.using(using).filter(id__in=ids).delete()[0]
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+
+def expire_medications(batch_size: int = 1000, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Deactivate every medication past its end date and purge its upcoming schedules, on every shard"""
+    now = now or timezone.now()
+    cutoff = expiry_date(now)
+    report = {'deactivated': 0, 'slots': 0, 'schedules': 0}
+    for medications in across_shards(Medication.objects.all()):
+        alias = medications.db
+        expired = medications.filter(is_active=True, end_date__lt=cutoff)
+        with transaction.atomic(using=alias):
+            rows = list(expired.select_for_update().order_by().values_list('id', 'user_id'))
+            if not rows:
+                continue
+            # updated_at moves so offline clients download the deactivation
+            report['deactivated'] += expired.update(is_active=False, updated_at=now)
+            record_many(rows, 'deactivated', {'is_active': [True, False]}, alias)
+            ids = [pk for pk, _user_id in rows]
+            for start in range(0, len(ids), batch_size):
+                report['slots'] += DoseSlot.objects.using(alias).filter(
+                    medication_id__in=ids[start:start + batch_size]
+                ).delete()[0]
+        for start in range(0, len(ids), batch_size):
+            report['schedules'] += _purge_schedules(ids[start:start + batch_size], alias, cutoff, batch_size)
+    logger.info(
+        f"Medication expiry: {report['deactivated']} deactivated, "
+        f"{report['schedules']} schedules and {report['slots']} dose slots removed"
+    )
+    return report
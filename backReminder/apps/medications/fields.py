@@ -0,0 +1,149 @@
+"""
+Medication fields - Portable compact storage for dose times
+
+Dose times are stored as minutes of the day in a fenced, comma-separated
+string (',480,1200,' for 08:00 and 20:00) that works the same on
+PostgreSQL and SQLite. The fences make "has a dose at 08:00" an exact
+LIKE '%,480,%' match on either backend (the `has` lookup). In Python the
+field is always a sorted list of datetime.time, whatever was assigned.
+"""
+import re
+from datetime import time
+from typing import Any, Iterable, List
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+from django.utils.translation import gettext_lazy as _
+
+MINUTES_PER_DAY = 24 * 60
+TIME_OF_DAY_PATTERN = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)(?::[0-5]\d)?$')
+
+# Every minute of the day, prebuilt: decoding and formatting are table lookups
+_TIMES = tuple(time(*divmod(minute, 60)) for minute in range(MINUTES_PER_DAY))
+_LABELS = tuple(f'{moment.hour:02d}:{moment.minute:02d}' for moment in _TIMES)
+
+
+def minute_of_day(value: Any) -> int:
+    """Minute of the day (0-1439) of a time, an 'HH:MM' string or a minute count"""
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < MINUTES_PER_DAY:
+        return value
+    if isinstance(value, str):
+        match = TIME_OF_DAY_PATTERN.match(value.strip())
+        if match:
+            return int(match.group(1)) * 60 + int(match.group(2))
+    raise ValidationError(_('Invalid time %(value)r, use HH:MM'), params={'value': value}, code='invalid')
+
+
+def time_of_minute(minute: int) -> time:
+    return _TIMES[minute]
+
+
+def format_minute(minute: int) -> str:
+    """'HH:MM' of a minute of the day"""
+    return _LABELS[minute]
+
+
+def format_times(times: Iterable[time]) -> List[str]:
+    return [_LABELS[moment.hour * 60 + moment.minute] for moment in times or ()]
+
+
+def pack_minutes(minutes: Iterable[int]) -> str:
+    minutes = sorted(set(minutes))
+    return f",{','.join(map(str, minutes))}," if minutes else ''
+
+
+def unpack_minutes(packed: str) -> List[int]:
+    return [int(part) for part in packed.strip(',').split(',')] if packed else []
+
+
+class DoseTimesDescriptor(DeferredAttribute):
+    """Normalizes assigned values, so instances always hold a list of times"""
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = self.field.to_python(value)
+
+
+class DoseTimesFormField(forms.CharField):
+    """Comma-separated HH:MM times, for the admin"""
+
+    def prepare_value(self, value):
+        if isinstance(value, (list, tuple)):
+            return ', '.join(_LABELS[minute_of_day(item)] for item in value)
+        return value
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        return [part.strip() for part in value.split(',') if part.strip()]
+
+
+class DoseTimesField(models.CharField):
+    """Up to max_times distinct times of day, packed as minutes (see module docstring)"""
+
+    descriptor_class = DoseTimesDescriptor
+    description = _('Times of day')
+
+    def __init__(self, *args, max_times: int = 8, **kwargs):
+        self.max_times = max_times
+        kwargs.setdefault('max_length', 64)
+        kwargs.setdefault('default', list)
+        kwargs.setdefault('blank', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.max_times != 8:
+            kwargs['max_times'] = self.max_times
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return [_TIMES[int(part)] for part in value.strip(',').split(',')] if value else []
+
+    def to_python(self, value) -> List[time]:
+        if value is None or value == '':
+            return []
+        if isinstance(value, str):
+            if value.startswith(','):
+                return [_TIMES[minute] for minute in unpack_minutes(value)]
+            value = value.split(',')
+        if not isinstance(value, (list, tuple)):
+            raise ValidationError(_('Expected a list of times'), code='invalid')
+        if all(type(item) is time for item in value):
+            if all(item.second == item.microsecond == 0 for item in value):
+                return sorted(set(value))
+        return [_TIMES[minute] for minute in sorted({minute_of_day(item) for item in value})]
+
+    def get_prep_value(self, value) -> str:
+        return pack_minutes(minute_of_day(item) for item in self.to_python(value))
+
+    def validate(self, value, model_instance):
+        super().validate(value, model_instance)
+        if len(value) > self.max_times:
+            raise ValidationError(
+                _('At most %(max)d times per day'), params={'max': self.max_times}, code='max_times'
+            )
+
+    def value_to_string(self, obj):
+        return self.get_prep_value(self.value_from_object(obj))
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'form_class': DoseTimesFormField, **kwargs})
+
+
+@DoseTimesField.register_lookup
+class HasTime(models.Lookup):
+    """times__has='08:00' - rows with a dose at that minute"""
+
+    lookup_name = 'has'
+    prepare_rhs = False
+
+    def get_prep_lookup(self):
+        return f'%,{minute_of_day(self.rhs)},%'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} LIKE {rhs}', lhs_params + rhs_params
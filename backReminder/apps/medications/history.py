@@ -0,0 +1,178 @@
+"""
+Medication history - Change capture for the medication audit trail
+
+Medications loaded from the database keep a snapshot of their values
+(Medication.from_db), so the diff of a save is a comparison of a few
+Python values with no extra query. History rows are enqueued when the
+transaction commits and written in bulk by a write buffer, off the
+request path: edits never wait on the audit trail.
+
+Rows are stamped with the time of the change, not of the flush. The
+buffer lives in the process, so rows still pending when a process is
+killed (rather than shut down) are lost.
+"""
+import logging
+import uuid
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.buffers import WriteBuffer
+from apps.core.sharding import shard_for_user
+
+logger = logging.getLogger(__name__)
+
+# Derived columns follow dosage, which is recorded; the low stock flag is job bookkeeping
+UNTRACKED_FIELDS = (
+    'id', 'user', 'created_at', 'updated_at', 'dose_quantity', 'dose_unit', 'pills_per_dose', 'low_stock_notified_at',
+)
+
+
+@lru_cache(maxsize=None)
+def tracked_fields(model) -> Dict[str, Any]:
+    """attname -> field for the fields whose changes are recorded"""
+    return {
+        field.attname: field for field in model._meta.concrete_fields
+        if field.name not in UNTRACKED_FIELDS
+    }
+
+
+def _comparable(field, value: Any) -> Any:
+    # Serializers assign '08:00' where the database returned time(8, 0)
+    try:
+        return field.to_python(value)
+    except (ValidationError, TypeError, ValueError):
+        return value
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def snapshot(instance) -> Dict[str, Any]:
+    """Tracked values loaded on an instance, with lists copied as they are mutated in place"""
+    fields = tracked_fields(type(instance))
+    return {
+        name: list(value) if isinstance(value, list) else value
+        for name, value in instance.__dict__.items() if name in fields
+    }
+
+
+def diff(instance, update_fields: Optional[Iterable[str]] = None) -> Dict[str, List[Any]]:
+    """[old, new] for each tracked field changed since the instance was loaded or last saved"""
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        return {}
+    fields = tracked_fields(type(instance))
+    if update_fields is None:
+        names = list(loaded)
+    else:
+        attnames = {field.name: attname for attname, field in fields.items()}
+        names = [attnames.get(name, name) for name in update_fields]
+    changes = {}
+    for name in names:
+        if name not in loaded or name not in fields:
+            continue
+        old, new = loaded[name], getattr(instance, name)
+        if _comparable(fields[name], old) != _comparable(fields[name], new):
+            changes[name] = [_json_value(old), _json_value(new)]
+    return changes
+
+
+def action_for(changes: Dict[str, List[Any]]) -> str:
+    if 'is_active' in changes:
+        return 'reactivated' if changes['is_active'][1] else 'deactivated'
+    return 'updated'
+
+
+class MedicationHistoryBuffer(WriteBuffer):
+    """Collects history rows and inserts them with one bulk_create per shard on each flush"""
+
+    def write(self, entries: Dict[Hashable, Dict[str, Any]]):
+        from .models import Medication, MedicationHistory
+
+        by_shard = defaultdict(list)
+        for key, values in entries.items():
+            by_shard[shard_for_user(values['user_id'])].append(MedicationHistory(id=key, **values))
+        for alias, rows in by_shard.items():
+            # A medication deleted before the flush keeps its history, unlinked
+            linked = {row.medication_id for row in rows if row.medication_id is not None}
+            existing = set(
+                Medication._base_manager.using(alias).filter(pk__in=linked).values_list('pk', flat=True)
+            ) if linked else set()
+            for row in rows:
+                if row.medication_id not in existing:
+                    row.medication_id = None
+            MedicationHistory.objects.using(alias).bulk_create(rows, batch_size=500)
+
+
+history_buffer = MedicationHistoryBuffer(
+    flush_interval=getattr(settings, 'MEDICATION_HISTORY_FLUSH_INTERVAL', 5),
+    max_size=getattr(settings, 'MEDICATION_HISTORY_BUFFER_SIZE', 1000),
+)
+
+
+def record(medication, action: str, changes: Dict[str, List[Any]], using: str):
+    """Enqueue a history row once the current transaction on `using` commits"""
+    values = {
+        'medication_id': None if action == 'deleted' else medication.pk,
+        'user_id': medication.user_id,
+        'action': action,
+        'changes': changes,
+        'created_at': timezone.now(),
+    }
+    transaction.on_commit(lambda: history_buffer.add(uuid.uuid4(), values), using=using)
+
+
+def record_many(medications: Iterable[Tuple[Any, Any]], action: str, changes: Dict[str, List[Any]], using: str):
+    """Enqueue the same change for (medication id, user id) pairs updated in bulk, which sends no signals"""
+    created_at = timezone.now()
+    rows = [
+        {'medication_id': pk, 'user_id': user_id, 'action': action, 'changes': changes, 'created_at': created_at}
+        for pk, user_id in medications
+    ]
+
+    def enqueue():
+        for values in rows:
+            history_buffer.add(uuid.uuid4(), values)
+
+    transaction.on_commit(enqueue, using=using)
+
+
+def record_created(medication, using: str):
+    medication._loaded_values = snapshot(medication)
+    changes = {
+        name: [None, _json_value(value)] for name, value in medication._loaded_values.items()
+        if value not in (None, '', [])
+    }
+    record(medication, 'created', changes, using)
+
+
+def record_saved(medication, using: str, update_fields: Optional[Iterable[str]] = None) -> Dict[str, List[Any]]:
+    """Record the changes of an update, if any, and move the snapshot forward"""
+    changes = diff(medication, update_fields)
+    if changes:
+        record(medication, action_for(changes), changes, using)
+        current = snapshot(medication)
+        medication._loaded_values.update((name, current[name]) for name in changes)
+    return changes
+
+
+def record_deleted(medication, using: str):
+    changes = {
+        name: [_json_value(value), None] for name, value in snapshot(medication).items()
+        if value not in (None, '', [])
+    }
+    changes['id'] = [str(medication.pk), None]
+    record(medication, 'deleted', changes, using)
@@ -0,0 +1,52 @@
+"""
+Management command to parse the dosage of existing medications into their structured columns
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core.sharding import across_shards
+from apps.core.sync_upload import bulk_write
+from apps.medications.dosage import parse_dosage
+from apps.medications.models import DOSAGE_FIELDS, Medication
+
+
+class Command(BaseCommand):
+    help = 'Fill dose_quantity, dose_unit and pills_per_dose from the dosage of every medication'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Medications written per batch'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write('💊 Parsing medication dosages...')
+        scanned = updated = 0
+        for medications in across_shards(Medication.objects.all()):
+            alias = medications.db
+            iterator = medications.only('id', 'dosage', *DOSAGE_FIELDS).order_by('pk').iterator(chunk_size=batch_size)
+            batch = []
+            for medication in iterator:
+                scanned += 1
+                parsed = parse_dosage(medication.dosage)
+                if parsed == tuple(getattr(medication, name) for name in DOSAGE_FIELDS):
+                    continue
+                medication.dose_quantity, medication.dose_unit, medication.pills_per_dose = parsed
+                batch.append(medication)
+                if len(batch) >= batch_size:
+                    updated += self._write(batch, alias)
+                    batch = []
+            if batch:
+                updated += self._write(batch, alias)
+        self.stdout.write(self.style.SUCCESS(f'✅ {updated} of {scanned} medications updated'))
+
+    def _write(self, batch, alias):
+        # Bumped so clients pick up the new pills_per_dose on their next sync
+        now = timezone.now()
+        for medication in batch:
+            medication.updated_at = now
+        bulk_write(Medication, batch, [*DOSAGE_FIELDS, 'updated_at'], alias)
+        return len(batch)
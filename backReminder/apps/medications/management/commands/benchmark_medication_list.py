@@ -0,0 +1,110 @@
+"""
+Management command to benchmark medication list serialization
+"""
+import time
+import uuid
+from datetime import date, timedelta, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.medications.models import Medication
+from apps.medications.serializers import MedicationRowSerializer, MedicationSerializer
+from apps.users.models import User
+
+
+def sample_medications(count):
+    """Unsaved medications with every serialized field populated"""
+    now = timezone.now()
+    return [
+        Medication(
+            id=uuid.uuid4(),
+            name=f'Medication {index}',
+            dosage=f'{index % 3 + 1} tablets of 500mg',
+            frequency='three_times_daily',
+            times=[dt_time(8), dt_time(14, 30), dt_time(20)],
+            notes='Take with food',
+            color='#4F46E5',
+            medication_type='tablet',
+            condition='Hypertension',
+            prescriber='Dr. House',
+            prescription_date=date(2025, 1, 1) + timedelta(days=index % 300),
+            total_pills=90,
+            remaining_pills=index % 20,
+            low_stock_alert=5,
+            is_active=index % 7 != 0,
+            start_date=date(2025, 1, 1),
+            end_date=None if index % 2 else date(2026, 1, 1),
+            created_at=now - timedelta(days=index),
+            updated_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = 'Compare MedicationSerializer with the .values() fast path used by list endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=500,
+            help='Number of medications in the list'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Runs per path (best run is reported)'
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help="Benchmark a user's stored medications (by email), queries included"
+        )
+
+    def handle(self, *args, **options):
+        if options['count'] <= 0 or options['repeat'] <= 0:
+            raise CommandError('--count and --repeat must be positive')
+
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f"User {options['user']} not found")
+            queryset = Medication.objects.for_user(user)[:options['count']]
+            full = lambda: MedicationSerializer(list(queryset), many=True).data
+            fast = lambda: MedicationRowSerializer(
+                list(queryset.values(*MedicationRowSerializer.value_fields)), many=True
+            ).data
+            label = f"{options['user']}'s medications (queries included)"
+        else:
+            medications = sample_medications(options['count'])
+            rows = [
+                {name: getattr(medication, name) for name in MedicationRowSerializer.value_fields}
+                for medication in medications
+            ]
+            full = lambda: MedicationSerializer(medications, many=True).data
+            fast = lambda: MedicationRowSerializer(rows, many=True).data
+            label = f"{options['count']} sample medications"
+
+        self.stdout.write(f'⏱️  Serializing {label}, best of {options["repeat"]}...')
+        full_seconds, full_data = best_of(options['repeat'], full)
+        fast_seconds, fast_data = best_of(options['repeat'], fast)
+        if [dict(item) for item in full_data] != fast_data:
+            raise CommandError('Fast path output differs from MedicationSerializer')
+
+        self.stdout.write(f'   Items: {len(fast_data)}')
+        self.stdout.write(f'   MedicationSerializer: {full_seconds * 1000:.2f} ms')
+        self.stdout.write(f'   MedicationRowSerializer: {fast_seconds * 1000:.2f} ms')
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ {full_seconds / fast_seconds:.1f}x faster, identical output')
+        )
@@ -0,0 +1,27 @@
+"""
+Management command to deactivate medications past their end date
+"""
+from django.core.management.base import BaseCommand
+from apps.medications.expiry import expire_medications
+
+
+class Command(BaseCommand):
+    help = 'Deactivate medications past their end date and delete their untaken upcoming schedules'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per statement'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('📅 Expiring medications past their end date...')
+        report = expire_medications(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ {report["deactivated"]} medications deactivated, '
+                f'{report["schedules"]} schedules and {report["slots"]} dose slots removed'
+            )
+        )
@@ -0,0 +1,27 @@
+"""
+Management command to rebuild the dose slot index from the medications
+"""
+from django.core.management.base import BaseCommand
+from apps.medications.slots import rebuild_slots
+
+
+class Command(BaseCommand):
+    help = 'Recompute the (timezone, minute) dose slots of every active medication'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Medications rewritten per batch'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🗂️  Rebuilding dose slots...')
+        report = rebuild_slots(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ {report["slots"]} slots for {report["medications"]} medications '
+                f'({report["stale"]} stale slots removed)'
+            )
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medication',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='medications_user_id_2c8a45_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medications', '0002_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='medicationhistory',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Created at'),
+        ),
+        migrations.AlterField(
+            model_name='medicationhistory',
+            name='medication',
+            field=models.ForeignKey(blank=True, help_text='Empty once the medication is deleted', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='history', to='medications.medication'),
+        ),
+        migrations.AddIndex(
+            model_name='medicationhistory',
+            index=models.Index(fields=['medication', 'created_at'], name='medication__medicat_32621d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicationhistory',
+            index=models.Index(fields=['user', 'created_at'], name='medication__user_id_cd4332_idx'),
+        ),
+    ]
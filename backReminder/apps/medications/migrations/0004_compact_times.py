@@ -0,0 +1,66 @@
+from django.db import migrations
+
+import apps.medications.fields
+from apps.medications.fields import minute_of_day
+
+BATCH_SIZE = 2000
+
+
+def _legacy_minutes(value):
+    # time[] values, or their text form on backends without arrays
+    if isinstance(value, str):
+        value = [part.strip(' "') for part in value.strip('{}[]').split(',') if part.strip(' "')]
+    return [minute_of_day(item) for item in value or ()]
+
+
+def pack_times(apps, schema_editor):
+    Medication = apps.get_model('medications', 'Medication')
+    manager = Medication._base_manager.using(schema_editor.connection.alias)
+    batch = []
+    for pk, legacy in manager.exclude(times_array__isnull=True).values_list('pk', 'times_array').iterator(BATCH_SIZE):
+        minutes = _legacy_minutes(legacy)
+        if minutes:
+            batch.append(Medication(pk=pk, times=minutes))
+        if len(batch) >= BATCH_SIZE:
+            manager.bulk_update(batch, ['times'])
+            batch = []
+    manager.bulk_update(batch, ['times'])
+
+
+def unpack_times(apps, schema_editor):
+    Medication = apps.get_model('medications', 'Medication')
+    manager = Medication._base_manager.using(schema_editor.connection.alias)
+    batch = []
+    for medication in manager.exclude(times='').only('pk', 'times').iterator(BATCH_SIZE):
+        medication.times_array = medication.times
+        batch.append(medication)
+        if len(batch) >= BATCH_SIZE:
+            manager.bulk_update(batch, ['times_array'])
+            batch = []
+    manager.bulk_update(batch, ['times_array'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medications', '0003_history_capture'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='medication',
+            old_name='times',
+            new_name='times_array',
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='times',
+            field=apps.medications.fields.DoseTimesField(blank=True, default=list, help_text='Scheduled times for taking medication', max_length=64),
+        ),
+        # The hint lets the shard router run it on every database holding medications
+        migrations.RunPython(pack_times, unpack_times, hints={'model_name': 'medication'}),
+        migrations.RemoveField(
+            model_name='medication',
+            name='times_array',
+        ),
+    ]
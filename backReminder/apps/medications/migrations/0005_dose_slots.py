@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('medications', '0004_compact_times'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoseSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timezone', models.CharField(max_length=50, verbose_name='Timezone')),
+                ('minute', models.PositiveSmallIntegerField(verbose_name='Minute of day')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('medication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='medications.medication')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='dose_slots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Dose slot',
+                'verbose_name_plural': 'Dose slots',
+                'db_table': 'medication_slots',
+                'indexes': [models.Index(fields=['timezone', 'minute', 'medication'], name='medication_slot_due_idx')],
+                'unique_together': {('medication', 'minute')},
+            },
+        ),
+    ]
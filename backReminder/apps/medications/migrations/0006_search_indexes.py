@@ -0,0 +1,49 @@
+# Indexes behind medication search (apps/medications/search.py)
+#
+# PostgreSQL: trigram GIN indexes on UPPER(column::text) serve the
+# UPPER(column::text) LIKE UPPER('%term%') filters of icontains. They are
+# built CONCURRENTLY so the medications table stays writable, which is why
+# this migration is not atomic. pg_trgm must be installable by the
+# migrating role.
+#
+# SQLite: an FTS5 trigram table kept in sync by triggers (search.py keeps
+# the DDL, since it is also refreshed after every migrate).
+
+from django.db import migrations
+
+from apps.medications.search import SEARCH_COLUMNS, drop_sqlite_index, install_sqlite_index
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in SEARCH_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS medications_{column}_trgm_idx '
+                f'ON medications USING gin (UPPER({column}::text) gin_trgm_ops)'
+            )
+    else:
+        install_sqlite_index(connection)
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for column in SEARCH_COLUMNS:
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS medications_{column}_trgm_idx')
+    else:
+        drop_sqlite_index(connection)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('medications', '0005_dose_slots'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes, hints={'model_name': 'medication'}),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medications', '0006_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medication',
+            name='dose_quantity',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=8, null=True, verbose_name='Dose quantity'),
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='dose_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20, verbose_name='Dose unit'),
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='pills_per_dose',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, help_text='Pills/doses taken out of stock per dose', verbose_name='Pills per dose'),
+        ),
+    ]
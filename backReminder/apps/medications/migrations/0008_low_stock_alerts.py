@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:37
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medications', '0007_dosage_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medication',
+            name='low_stock_notified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Low stock notified at'),
+        ),
+        migrations.AddIndex(
+            model_name='medication',
+            index=models.Index(models.F('low_stock_notified_at'), django.db.models.expressions.CombinedExpression(models.F('remaining_pills'), '-', models.F('low_stock_alert')), condition=models.Q(('is_active', True), ('remaining_pills__isnull', False)), name='medication_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medications', '0008_low_stock_alerts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medication',
+            index=models.Index(condition=models.Q(('end_date__isnull', False), ('is_active', True)), fields=['end_date'], name='medication_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# SQLite: the FTS5 table was an external-content table over the implicit
+# rowid of medications, which VACUUM may renumber (the primary key is a
+# UUID). It is replaced by one keyed through medications_fts_rows, whose
+# INTEGER PRIMARY KEY is stable (see search.py). Nothing to do on PostgreSQL.
+
+from django.db import migrations
+
+from apps.medications.search import drop_sqlite_index, install_sqlite_index
+
+
+def rebuild_search_index(apps, schema_editor):
+    drop_sqlite_index(schema_editor.connection)
+    install_sqlite_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medications', '0010_user_fk_without_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop, hints={'model_name': 'medication'}),
+    ]
@@ -2,28 +2,97 @@
 Medication models - Core medication management
 """
 from django.db import models
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Cast, Greatest, Length, Replace
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from django.contrib.postgres.fields import ArrayField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from apps.core.models import BaseModel
+from apps.core.sharding import UserShardedManager, UserShardedQuerySet
 from apps.core.utils import ColorValidator, FrequencyValidator, generate_medication_times
+from .dosage import parse_dosage
+from .fields import DoseTimesField, format_minute, format_times
+from .history import snapshot
+
+# Columns derived from dosage on save
+DOSAGE_FIELDS = ('dose_quantity', 'dose_unit', 'pills_per_dose')
+
+
+def times_to_strings(times):
+    """Format scheduled times as HH:MM strings"""
+    return format_times(times)
+
+
+def is_stock_low(remaining_pills, low_stock_alert):
+    """Whether tracked stock has reached the alert threshold"""
+    return remaining_pills is not None and remaining_pills <= low_stock_alert
+
+
+class MedicationQuerySet(UserShardedQuerySet):
+    """Medication queries, with the supply math done by the database"""
+    
+    def with_supply(self):
+        """
+        Annotate doses_per_day, pills_per_day and days_of_supply.
+        
+        doses_per_day counts the packed dose times (one more comma than
+        times); days_of_supply is whole days left, None when stock is not
+        tracked or nothing is scheduled.
+        """
+        doses_per_day = Greatest(Length('times') - Length(Replace('times', Value(','), Value(''))) - 1, 0)
+        return self.annotate(
+            doses_per_day=Cast(doses_per_day, IntegerField()),
+        ).annotate(
+            pills_per_day=F('doses_per_day') * F('pills_per_dose'),
+        ).annotate(
+            days_of_supply=Case(
+                When(Q(remaining_pills__isnull=False) & Q(pills_per_day__gt=0),
+                     then=F('remaining_pills') / F('pills_per_day')),
+                default=None,
+                output_field=IntegerField(),
+            ),
+        )
+    
+    def tracked_stock(self):
+        """Active medications whose stock is counted, with stock_margin (remaining - threshold)"""
+        return self.filter(is_active=True, remaining_pills__isnull=False).alias(
+            stock_margin=F('remaining_pills') - F('low_stock_alert')
+        )
+    
+    def low_stock(self):
+        """Active medications at or below their low stock threshold (served by medication_low_stock_idx)"""
+        return self.tracked_stock().filter(stock_margin__lte=0)
 
 
 class Medication(BaseModel):
     """
     Medication model matching the frontend structure
     """
+    # Unconstrained: medications may live on a different database than users
     user = models.ForeignKey(
         'users.User',
         on_delete=models.CASCADE,
         related_name='medications',
-        verbose_name=_('User')
+        verbose_name=_('User'),
+        db_constraint=False
     )
     
     # Basic medication information
     name = models.CharField(_('Medication name'), max_length=100)
     dosage = models.CharField(_('Dosage'), max_length=50, help_text=_('e.g., 500mg, 2 tablets'))
     
+    # Parsed from dosage on save (see dosage.py)
+    dose_quantity = models.DecimalField(
+        _('Dose quantity'), max_digits=8, decimal_places=2, null=True, blank=True, editable=False
+    )
+    dose_unit = models.CharField(_('Dose unit'), max_length=20, blank=True, editable=False)
+    pills_per_dose = models.PositiveSmallIntegerField(
+        _('Pills per dose'),
+        default=1,
+        editable=False,
+        help_text=_('Pills/doses taken out of stock per dose')
+    )
+    
     # Frequency and timing
     frequency = models.CharField(
         _('Frequency'),
@@ -41,11 +110,9 @@ class Medication(BaseModel):
         default='once_daily'
     )
     
-    # Times as array of strings (HH:MM format)
-    times = ArrayField(
-        models.TimeField(),
-        size=8,  # Maximum 8 times per day
-        default=list,
+    # Times of day, stored as packed minutes (see fields.py)
+    times = DoseTimesField(
+        max_times=8,
         help_text=_('Scheduled times for taking medication')
     )
     
@@ -105,12 +172,16 @@ class Medication(BaseModel):
         default=5,
         help_text=_('Alert when remaining pills/doses reach this number')
     )
+    # Set when the refill notification went out, cleared once stock is back above the threshold
+    low_stock_notified_at = models.DateTimeField(_('Low stock notified at'), null=True, blank=True, editable=False)
     
     # Status
     is_active = models.BooleanField(_('Active'), default=True)
     start_date = models.DateField(_('Start date'), null=True, blank=True)
     end_date = models.DateField(_('End date'), null=True, blank=True)
     
+    objects = MedicationQuerySet.as_manager()
+    
     class Meta:
         db_table = 'medications'
         verbose_name = _('Medication')
@@ -119,6 +190,19 @@ class Medication(BaseModel):
         indexes = [
             models.Index(fields=['user', 'is_active']),
             models.Index(fields=['user', 'name']),
+            models.Index(fields=['user', 'updated_at', 'id']),
+            # Low stock scan (refills.py): pending alerts first, then how far below the threshold
+            models.Index(
+                'low_stock_notified_at', F('remaining_pills') - F('low_stock_alert'),
+                name='medication_low_stock_idx',
+                condition=Q(is_active=True, remaining_pills__isnull=False),
+            ),
+            # Nightly expiry (expiry.py)
+            models.Index(
+                fields=['end_date'],
+                name='medication_expiry_idx',
+                condition=Q(is_active=True, end_date__isnull=False),
+            ),
         ]
     
     def __str__(self):
@@ -133,27 +217,34 @@ class Medication(BaseModel):
         if not self.times and self.frequency != 'custom':
             self.times = generate_medication_times(self.frequency)
         
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'dosage' in update_fields:
+            self.parse_dosage()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *DOSAGE_FIELDS}
+        
         super().save(*args, **kwargs)
     
+    def parse_dosage(self):
+        """Refresh the columns derived from dosage"""
+        self.dose_quantity, self.dose_unit, self.pills_per_dose = parse_dosage(self.dosage)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Keep the loaded values so saves can be diffed for the history"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = snapshot(instance)
+        return instance
+    
     @property
     def times_as_strings(self):
         """Return times as string list for API compatibility"""
-        return [time.strftime('%H:%M') for time in self.times]
+        return times_to_strings(self.times)
     
     @property
     def is_low_stock(self):
         """Check if medication is running low"""
-        if self.remaining_pills is None:
-            return False
-        return self.remaining_pills <= self.low_stock_alert
-    
-    @property
-    def pills_per_dose(self):
-        """Extract number of pills per dose from dosage"""
-        # Simple extraction - could be enhanced
-        import re
-        match = re.search(r'(\d+)', self.dosage)
-        return int(match.group(1)) if match else 1
+        return is_stock_low(self.remaining_pills, self.low_stock_alert)
     
     def reduce_stock(self, amount=None):
         """Reduce stock when medication is taken"""
@@ -163,19 +254,62 @@ class Medication(BaseModel):
             self.save(update_fields=['remaining_pills'])
 
 
+class DoseSlot(models.Model):
+    """
+    Inverted index of dose times: (timezone, local minute of the day) -> medication.
+    
+    One row per dose time of each active medication, in the timezone of its
+    user, so the medications due at a given instant are found with index
+    probes instead of a scan. Maintained by slots.py.
+    """
+    medication = models.ForeignKey(
+        Medication,
+        on_delete=models.CASCADE,
+        related_name='slots'
+    )
+    user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='dose_slots',
+        db_constraint=False
+    )
+    timezone = models.CharField(_('Timezone'), max_length=50)
+    minute = models.PositiveSmallIntegerField(_('Minute of day'))
+    created_at = models.DateTimeField(_('Created at'), auto_now_add=True)
+    
+    objects = UserShardedManager()
+    
+    class Meta:
+        db_table = 'medication_slots'
+        verbose_name = _('Dose slot')
+        verbose_name_plural = _('Dose slots')
+        unique_together = [('medication', 'minute')]
+        indexes = [
+            # Covers the due lookup: medication ids are read from the index
+            models.Index(fields=['timezone', 'minute', 'medication'], name='medication_slot_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.medication_id} at {format_minute(self.minute)} {self.timezone}"
+
+
 class MedicationHistory(BaseModel):
     """
     History of medication changes for auditing
     """
     medication = models.ForeignKey(
         Medication,
-        on_delete=models.CASCADE,
-        related_name='history'
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='history',
+        help_text=_('Empty once the medication is deleted')
     )
     user = models.ForeignKey(
         'users.User',
         on_delete=models.CASCADE,
-        related_name='medication_history'
+        related_name='medication_history',
+        db_constraint=False
     )
     
     action = models.CharField(
@@ -198,11 +332,21 @@ class MedicationHistory(BaseModel):
     
     notes = models.TextField(_('Notes'), blank=True)
     
+    # Time of the change - rows are written later, in bulk (see history.py)
+    created_at = models.DateTimeField(_('Created at'), default=timezone.now)
+    
+    objects = UserShardedManager()
+    
     class Meta:
         db_table = 'medication_history'
         verbose_name = _('Medication History')
         verbose_name_plural = _('Medication History')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['medication', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
     
     def __str__(self):
-        return f"{self.medication.name} - {self.action} at {self.created_at}"
+        name = self.medication.name if self.medication_id else next(filter(None, self.changes.get('name', [])), '')
+        return f"{name} - {self.action} at {self.created_at}"
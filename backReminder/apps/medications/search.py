@@ -0,0 +1,149 @@
+"""
+Medication search - Ranked substring search over name, condition and prescriber
+
+Matching is a case-insensitive substring match on any of the three
+columns, answered from an index on both backends (see migration 0006):
+trigram GIN indexes that serve icontains on PostgreSQL, an FTS5 trigram
+table on SQLite, joined back to medications by id. Terms shorter than a
+trigram cannot use either index and fall back to a plain icontains filter.
+
+Results are ranked the same way everywhere: exact name, name prefix, name
+substring, condition, then prescriber; ties by name.
+"""
+import logging
+import sqlite3
+from functools import lru_cache
+
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, QuerySet, When
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = ('name', 'condition', 'prescriber')
+TRIGRAM_LENGTH = 3
+MAX_TERM_LENGTH = 100
+
+FTS_TABLE = 'medications_fts'
+# FTS rowid -> medication id. medications has a UUID primary key, so its
+# implicit rowid is not stable (VACUUM may renumber it); this table's
+# INTEGER PRIMARY KEY is.
+FTS_ROWS_TABLE = 'medications_fts_rows'
+FTS_ROWID_SQL = f'(SELECT rowid FROM {FTS_ROWS_TABLE} WHERE medication_id = %s.id)'
+FTS_MATCH_SQL = (
+    f'SELECT medication_id FROM {FTS_ROWS_TABLE} WHERE rowid IN '
+    f'(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'
+)
+FTS_TRIGGERS = {
+    'medications_fts_insert': (
+        'AFTER INSERT ON medications BEGIN '
+        f'INSERT INTO {FTS_ROWS_TABLE}(medication_id) VALUES (new.id); '
+        f'INSERT INTO {FTS_TABLE}(rowid, name, condition, prescriber) '
+        f"VALUES ({FTS_ROWID_SQL % 'new'}, new.name, new.condition, new.prescriber); END"
+    ),
+    'medications_fts_delete': (
+        'AFTER DELETE ON medications BEGIN '
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = {FTS_ROWID_SQL % 'old'}; "
+        f'DELETE FROM {FTS_ROWS_TABLE} WHERE medication_id = old.id; END'
+    ),
+    'medications_fts_update': (
+        'AFTER UPDATE OF name, condition, prescriber ON medications BEGIN '
+        f'UPDATE {FTS_TABLE} SET name = new.name, condition = new.condition, prescriber = new.prescriber '
+        f"WHERE rowid = {FTS_ROWID_SQL % 'new'}; END"
+    ),
+}
+
+
+def sqlite_supports_fts() -> bool:
+    """FTS5's trigram tokenizer ships with SQLite 3.34"""
+    return sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def install_sqlite_index(connection):
+    """
+    Create (if missing) and rebuild the FTS5 table and its triggers.
+
+    SQLite migrations that rebuild the medications table drop its triggers,
+    so this also runs after every migrate.
+    """
+    if connection.vendor != 'sqlite' or not sqlite_supports_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {FTS_ROWS_TABLE} '
+            '(rowid INTEGER PRIMARY KEY, medication_id TEXT NOT NULL UNIQUE)'
+        )
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+            f"{', '.join(SEARCH_COLUMNS)}, tokenize='trigram')"
+        )
+        for name, body in FTS_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f'DELETE FROM {FTS_ROWS_TABLE}')
+        cursor.execute(f'INSERT INTO {FTS_ROWS_TABLE}(medication_id) SELECT id FROM medications')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, condition, prescriber) '
+            f'SELECT keys.rowid, medications.name, medications.condition, medications.prescriber '
+            f'FROM {FTS_ROWS_TABLE} keys JOIN medications ON medications.id = keys.medication_id'
+        )
+    has_fts_table.cache_clear()
+
+
+def drop_sqlite_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name in FTS_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_ROWS_TABLE}')
+    has_fts_table.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def has_fts_table(alias: str) -> bool:
+    connection = connections[alias]
+    return connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+
+
+def normalize_term(term: str) -> str:
+    return ' '.join((term or '').split())[:MAX_TERM_LENGTH]
+
+
+def _fts_phrase(term: str) -> str:
+    # A quoted phrase is a plain substring match for the trigram tokenizer
+    return '"' + term.replace('"', '""') + '"'
+
+
+def search_rank(term: str) -> Case:
+    """0 for the best matches; lower is better"""
+    return Case(
+        When(name__iexact=term, then=0),
+        When(name__istartswith=term, then=1),
+        When(name__icontains=term, then=2),
+        When(condition__icontains=term, then=3),
+        default=4,
+        output_field=IntegerField(),
+    )
+
+
+def matching(queryset: QuerySet, term: str) -> QuerySet:
+    """Medications of queryset matching term, unordered"""
+    term = normalize_term(term)
+    if not term:
+        return queryset.none()
+    if len(term) >= TRIGRAM_LENGTH and has_fts_table(queryset.db):
+        return queryset.filter(pk__in=RawSQL(FTS_MATCH_SQL, [_fts_phrase(term)]))
+    return queryset.filter(
+        Q(name__icontains=term) | Q(condition__icontains=term) | Q(prescriber__icontains=term)
+    )
+
+
+def search_medications(queryset: QuerySet, term: str) -> QuerySet:
+    """Medications of queryset matching term, best first (works on .values() querysets too)"""
+    return (
+        matching(queryset, term)
+        .annotate(search_rank=search_rank(normalize_term(term)))
+        .order_by('search_rank', 'name', 'pk')
+    )
@@ -2,8 +2,9 @@
 Medication serializers - API serialization for medications
 """
 from rest_framework import serializers
+from django.conf import settings
 from django.utils import timezone
-from .models import Medication, MedicationHistory
+from .models import Medication, MedicationHistory, is_stock_low, times_to_strings
 from apps.core.utils import ColorValidator, FrequencyValidator, TimeValidator
 
 
@@ -91,12 +92,61 @@ class MedicationSerializer(serializers.ModelSerializer):
         data = super().to_representation(instance)
         
         # Convert time objects to strings
-        if instance.times:
-            data['times'] = [time.strftime('%H:%M') for time in instance.times]
+        data['times'] = times_to_strings(instance.times)
         
         return data
 
 
+class MedicationRowSerializer(serializers.BaseSerializer):
+    """
+    Read-only fast path for medication lists.
+
+    Renders rows of Medication.objects.values(*value_fields) exactly like
+    MedicationSerializer renders instances, without building model
+    instances or going through the field machinery for every value.
+    """
+    value_fields = [
+        'id', 'name', 'dosage', 'frequency', 'times', 'notes', 'color', 'medication_type',
+        'condition', 'prescriber', 'prescription_date', 'total_pills', 'remaining_pills',
+        'low_stock_alert', 'pills_per_dose', 'is_active', 'start_date', 'end_date', 'created_at', 'updated_at',
+    ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # DRF's datetime handling, with the active timezone resolved once per list
+        self.datetime_field = serializers.DateTimeField(
+            default_timezone=timezone.get_current_timezone() if settings.USE_TZ else None
+        )
+
+    def to_representation(self, row):
+        times = times_to_strings(row['times'])
+        prescription_date, start_date, end_date = row['prescription_date'], row['start_date'], row['end_date']
+        return {
+            'id': str(row['id']),
+            'name': row['name'],
+            'dosage': row['dosage'],
+            'frequency': row['frequency'],
+            'times': times,
+            'times_as_strings': list(times),
+            'notes': row['notes'],
+            'color': row['color'],
+            'medication_type': row['medication_type'],
+            'condition': row['condition'],
+            'prescriber': row['prescriber'],
+            'prescription_date': prescription_date.isoformat() if prescription_date else None,
+            'total_pills': row['total_pills'],
+            'remaining_pills': row['remaining_pills'],
+            'low_stock_alert': row['low_stock_alert'],
+            'is_low_stock': is_stock_low(row['remaining_pills'], row['low_stock_alert']),
+            'pills_per_dose': row['pills_per_dose'],
+            'is_active': row['is_active'],
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+            'created_at': self.datetime_field.to_representation(row['created_at']),
+            'updated_at': self.datetime_field.to_representation(row['updated_at']),
+        }
+
+
 class MedicationCreateSerializer(MedicationSerializer):
     """
     Serializer for creating medications
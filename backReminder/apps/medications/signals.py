@@ -0,0 +1,67 @@
+"""
+Medication signals - Feed the change history, the dose slot index and the search index
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save
+from django.dispatch import receiver
+
+from apps.core.sharding import purging_user_rows
+from apps.users.models import User
+
+from .history import record_created, record_deleted, record_saved
+from .models import Medication
+from .search import FTS_TABLE, install_sqlite_index
+from .slots import SLOT_FIELDS, move_user_slots, sync_slots
+
+
+def _deleted_with_user(origin) -> bool:
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return model._meta.label_lower == settings.AUTH_USER_MODEL.lower()
+
+
+@receiver(post_save, sender=Medication)
+def medication_saved(sender, instance, created, raw=False, using=None, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        record_created(instance, using)
+        if instance.is_active and instance.times:
+            sync_slots([instance], using)
+        return
+    changes = record_saved(instance, using, update_fields)
+    if any(name in changes for name in SLOT_FIELDS):
+        sync_slots([instance], using)
+
+
+@receiver(post_delete, sender=Medication)
+def medication_deleted(sender, instance, using=None, origin=None, **kwargs):
+    # Account deletion and shard moves take the history along with the rows
+    if purging_user_rows() or _deleted_with_user(origin):
+        return
+    record_deleted(instance, using)
+
+
+@receiver(post_init, sender=User)
+def remember_timezone(sender, instance, **kwargs):
+    instance._loaded_timezone = instance.__dict__.get('timezone')
+
+
+@receiver(post_save, sender=User)
+def move_dose_slots(sender, instance, created, raw=False, **kwargs):
+    """Slots are keyed by the user's timezone"""
+    if created or raw or instance.timezone == instance._loaded_timezone:
+        return
+    move_user_slots(instance.pk, instance.timezone)
+    instance._loaded_timezone = instance.timezone
+
+
+@receiver(post_migrate)
+def refresh_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """SQLite table rebuilds during migrate drop the FTS triggers"""
+    connection = connections[using]
+    if sender.name == 'apps.medications' and connection.vendor == 'sqlite':
+        if FTS_TABLE in connection.introspection.table_names():
+            install_sqlite_index(connection)
@@ -0,0 +1,131 @@
+"""
+Dose slots - Maintain and query the (timezone, minute) index of dose times
+
+Saving a medication rewrites its slots when its times or active flag
+changed, and changing a user's timezone moves their slots along. The
+reminder dispatcher asks for the doses due at an instant: timezones are
+grouped by the local minute it is in each of them, which gives one index
+probe per group, so the cost follows the number of due doses and not the
+number of medications.
+
+Local times skipped by a DST transition are never due on that day.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import available_timezones
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.sharding import across_shards
+from apps.notifications.planner import load_zone
+
+from .fields import minute_of_day
+from .models import DoseSlot, Medication
+
+logger = logging.getLogger(__name__)
+
+# Saves that change these fields change the medication's slots
+SLOT_FIELDS = ('times', 'is_active')
+
+
+@lru_cache(maxsize=None)
+def zone_name(tz_name: str) -> str:
+    """Canonical name slots are stored under (unknown names fall back like the planner)"""
+    return load_zone(tz_name).key
+
+
+@lru_cache(maxsize=1)
+def zone_names() -> Tuple[str, ...]:
+    return tuple(sorted(available_timezones() | {zone_name(settings.TIME_ZONE)}))
+
+
+def _user_timezones(medications: List[Medication]) -> Dict[int, str]:
+    from apps.users.models import User
+
+    timezones = {
+        medication.user_id: medication.user.timezone for medication in medications
+        if Medication.user.is_cached(medication)
+    }
+    missing = {medication.user_id for medication in medications} - timezones.keys()
+    if missing:
+        timezones.update(User.objects.filter(pk__in=missing).values_list('pk', 'timezone'))
+    return timezones
+
+
+def sync_slots(medications: Iterable[Medication], using: str):
+    """Replace the slots of medications (all on the `using` database) with their current dose times"""
+    medications = list(medications)
+    if not medications:
+        return
+    DoseSlot.objects.using(using).filter(medication_id__in=[medication.pk for medication in medications]).delete()
+    scheduled = [medication for medication in medications if medication.is_active and medication.times]
+    if not scheduled:
+        return
+    timezones = _user_timezones(scheduled)
+    DoseSlot.objects.using(using).bulk_create([
+        DoseSlot(
+            medication_id=medication.pk,
+            user_id=medication.user_id,
+            timezone=zone_name(timezones.get(medication.user_id, '')),
+            minute=minute_of_day(moment),
+        )
+        for medication in scheduled for moment in medication.times
+    ])
+
+
+def move_user_slots(user_id, tz_name: str) -> int:
+    """Re-key a user's slots after a timezone change"""
+    return DoseSlot.objects.for_user(user_id).update(timezone=zone_name(tz_name))
+
+
+def local_minutes(now: datetime) -> Dict[int, List[str]]:
+    """Timezones grouped by the local minute of the day it is in them at `now`"""
+    groups = defaultdict(list)
+    for name in zone_names():
+        local = now.astimezone(load_zone(name))
+        groups[local.hour * 60 + local.minute].append(name)
+    return groups
+
+
+def due_doses(now: Optional[datetime] = None) -> List[Tuple]:
+    """(medication id, user id, local minute) of every dose scheduled at the current minute, on every shard"""
+    groups = local_minutes(now or timezone.now())
+    condition = Q()
+    for minute, names in groups.items():
+        condition |= Q(timezone__in=names, minute=minute)
+    due = []
+    for slots in across_shards(DoseSlot.objects.filter(condition)):
+        due.extend(slots.values_list('medication_id', 'user_id', 'minute'))
+    return due
+
+
+def rebuild_slots(batch_size: int = 1000) -> Dict[str, int]:
+    """Recompute every slot from the medications, one shard and batch at a time"""
+    report = {'medications': 0, 'slots': 0, 'stale': 0}
+    for medications in across_shards(Medication.objects.all()):
+        alias = medications.db
+        iterator = (
+            medications.filter(is_active=True).exclude(times='')
+            .only('id', 'user_id', 'times', 'is_active').order_by('pk').iterator(chunk_size=batch_size)
+        )
+        batch = []
+        for medication in iterator:
+            batch.append(medication)
+            report['slots'] += len(medication.times)
+            if len(batch) >= batch_size:
+                sync_slots(batch, alias)
+                report['medications'] += len(batch)
+                batch = []
+        sync_slots(batch, alias)
+        report['medications'] += len(batch)
+        # Slots left behind by medications that stopped being scheduled
+        report['stale'] += DoseSlot.objects.using(alias).filter(
+            Q(medication__is_active=False) | Q(medication__times='')
+        ).delete()[0]
+    logger.info(f"Rebuilt {report['slots']} dose slots for {report['medications']} medications")
+    return report
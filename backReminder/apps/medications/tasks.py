@@ -0,0 +1,29 @@
+"""
+Celery tasks for medication maintenance
+"""
+from celery import shared_task
+import logging
+
+from .expiry import expire_medications
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def expire_medications_task(batch_size=1000):
+    """
+    Deactivate medications past their end date and purge their upcoming schedules
+    """
+    try:
+        report = expire_medications(batch_size=batch_size)
+        return {
+            'status': 'success',
+            **report
+        }
+
+    except Exception as exc:
+        logger.error(f"Medication expiry task failed: {exc}")
+        return {
+            'status': 'error',
+            'error': str(exc)
+        }
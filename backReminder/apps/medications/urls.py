@@ -6,8 +6,9 @@ from rest_framework.routers import DefaultRouter
 from .views import MedicationViewSet, MedicationHistoryViewSet
 
 router = DefaultRouter()
-router.register('', MedicationViewSet, basename='medications')
+# Before the medications routes, whose detail pattern would swallow history/
 router.register('history', MedicationHistoryViewSet, basename='medication-history')
+router.register('', MedicationViewSet, basename='medications')
 
 app_name = 'medications'
 
@@ -3,23 +3,47 @@ Medication Reminder - Medication Views
 Copyright (C) 2025 Francisco [Tu Apellido/Empresa]. All Rights Reserved.
 """
 
+import uuid
+from datetime import timedelta
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.core.mixins import ConditionalGetMixin, ReplicaReadMixin
+from apps.core.sharding import joins_users
 
 from .models import Medication, MedicationHistory
-from .serializers import MedicationSerializer, MedicationHistorySerializer
+from .search import normalize_term, search_medications
+from .serializers import MedicationSerializer, MedicationHistorySerializer, MedicationRowSerializer
 
 
-class MedicationViewSet(viewsets.ModelViewSet):
+class MedicationViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for managing medications"""
     serializer_class = MedicationSerializer
     permission_classes = [IsAuthenticated]
+    replica_actions = ('list', 'retrieve', 'active', 'search', 'refills')
+    # Read-only list actions rendered from .values() rows
+    row_actions = ('list', 'active', 'search')
+    
+    def use_rows(self):
+        # Schema generation still describes the full serializer
+        return self.action in self.row_actions and not getattr(self, 'swagger_fake_view', False)
     
     def get_queryset(self):
-        return Medication.objects.filter(user=self.request.user)
+        queryset = Medication.objects.for_user(self.request.user)
+        if self.use_rows():
+            return queryset.values(*MedicationRowSerializer.value_fields)
+        return queryset
+    
+    def get_serializer_class(self):
+        if self.use_rows():
+            return MedicationRowSerializer
+        return super().get_serializer_class()
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -28,8 +52,42 @@ class MedicationViewSet(viewsets.ModelViewSet):
     def active(self, request):
         """Get only active medications"""
         active_meds = self.get_queryset().filter(is_active=True)
-        serializer = self.get_serializer(active_meds, many=True)
-        return Response(serializer.data)
+        return self.conditional_response(
+            active_meds, lambda: Response(self.get_serializer(active_meds, many=True).data)
+        )
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked, paginated search over name, condition and prescriber (?q=)"""
+        term = normalize_term(request.query_params.get('q', ''))
+        if not term:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        results = search_medications(self.get_queryset(), term)
+        page = self.paginate_queryset(results)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+    
+    @action(detail=False, methods=['get'])
+    def refills(self, request):
+        """Days of supply left for active medications with tracked stock, soonest to run out first"""
+        rows = (
+            Medication.objects.for_user(request.user)
+            .filter(is_active=True, remaining_pills__isnull=False)
+            .with_supply()
+            .order_by(F('days_of_supply').asc(nulls_last=True), 'name')
+            .values('id', 'name', 'remaining_pills', 'pills_per_dose', 'doses_per_day', 'days_of_supply')
+        )
+        today = timezone.localdate()
+        return Response([
+            {
+                **row,
+                'id': str(row['id']),
+                'runs_out_on': (
+                    (today + timedelta(days=row['days_of_supply'])).isoformat()
+                    if row['days_of_supply'] is not None else None
+                ),
+            }
+            for row in rows
+        ])
     
     @action(detail=True, methods=['post'])
     def toggle_active(self, request, pk=None):
@@ -44,10 +102,26 @@ class MedicationViewSet(viewsets.ModelViewSet):
         })
 
 
-class MedicationHistoryViewSet(viewsets.ModelViewSet):
-    """ViewSet for medication history"""
+class MedicationHistoryViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for medication history.
+    
+    Read-only: rows are written by the change capture in history.py.
+    ?medication=<id> narrows the list to one medication, read from the
+    (medication, created_at) index.
+    """
+    etag_fields = ('updated_at', 'medication__updated_at')
     serializer_class = MedicationHistorySerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return MedicationHistory.objects.filter(medication__user=self.request.user)
+        queryset = MedicationHistory.objects.for_user(self.request.user).select_related('medication')
+        medication = self.request.query_params.get('medication')
+        if medication:
+            try:
+                queryset = queryset.filter(medication_id=uuid.UUID(medication))
+            except ValueError:
+                raise ValidationError({'medication': 'Must be a medication id'})
+        if joins_users(queryset.db):
+            queryset = queryset.select_related('user')
+        return queryset
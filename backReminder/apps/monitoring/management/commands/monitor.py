@@ -6,6 +6,7 @@ from django.utils import timezone
 from apps.monitoring.services import FeatureSyncService
 from apps.monitoring.test_service import APITestService, SystemHealthService
 from apps.monitoring.models import SystemVersion
+from apps.users.activity import activity_buffer
 import json
 import os
 
@@ -153,7 +154,10 @@ class Command(BaseCommand):
         
         self.stdout.write('\nSystem Metrics:')
         self.stdout.write(f'   Total Users: {health_check.total_users}')
-        self.stdout.write(f'   Active Users (24h): {health_check.active_users_24h}')
+        self.stdout.write(
+            f'   Active Users (24h): {health_check.active_users_24h} '
+            f'(activity of the last {activity_buffer.flush_interval:g}s may be missing)'
+        )
         self.stdout.write(f'   Total Medications: {health_check.total_medications}')
         self.stdout.write(f'   Schedules Today: {health_check.total_schedules_today}')
         
@@ -360,22 +360,31 @@ class SystemHealthService:
         metrics = {}
         
         try:
-            # User metrics
+            # User metrics - persist this process's buffered activity first.
+            # Other processes write theirs every LAST_ACTIVE_FLUSH_INTERVAL, so
+            # users whose first activity in 24h is that recent may be missing.
+            from apps.users.activity import activity_buffer
+            activity_buffer.flush()
             metrics['total_users'] = User.objects.count()
             metrics['active_users_24h'] = User.objects.filter(
                 last_active__gte=timezone.now() - timezone.timedelta(hours=24)
             ).count()
+            metrics['active_users_lag_seconds'] = activity_buffer.flush_interval
             
             # Medication metrics
+            from apps.core.sharding import across_shards
             from apps.medications.models import Medication
-            metrics['total_medications'] = Medication.objects.filter(is_active=True).count()
+            metrics['total_medications'] = sum(
+                queryset.count() for queryset in across_shards(Medication.objects.filter(is_active=True))
+            )
             
             # Schedule metrics (if app exists)
             try:
                 from apps.schedules.models import DailySchedule
-                metrics['total_schedules_today'] = DailySchedule.objects.filter(
-                    date=timezone.now().date()
-                ).count()
+                metrics['total_schedules_today'] = sum(
+                    queryset.count()
+                    for queryset in across_shards(DailySchedule.objects.filter(date=timezone.now().date()))
+                )
             except ImportError:
                 metrics['total_schedules_today'] = 0
             
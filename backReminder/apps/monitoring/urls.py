@@ -5,7 +5,8 @@ from django.urls import path
 from .views import (
     MonitoringDashboardView, sync_features, run_api_tests, 
     setup_default_tests, health_check, version_report,
-    create_version, feature_sync_report, export_report
+    create_version, feature_sync_report, export_report,
+    delivery_metrics
 )
 
 app_name = 'monitoring'
@@ -29,6 +30,9 @@ urlpatterns = [
     path('version-report/', version_report, name='version_report'),
     path('create-version/', create_version, name='create_version'),
     
+    # Reminder delivery
+    path('delivery-metrics/', delivery_metrics, name='delivery_metrics'),
+    
     # Export reports
     path('export/', export_report, name='export_report'),
 ]
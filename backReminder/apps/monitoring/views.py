@@ -220,6 +220,32 @@ def feature_sync_report(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def delivery_metrics(request):
+    """
+    Per-channel delivery latency, error rate and circuit state
+    """
+    try:
+        from apps.notifications.channels import CHANNEL_CLASSES
+        from apps.notifications.outbox import outbox_stats
+        from apps.notifications.router import get_published_metrics
+        
+        return Response({
+            'workers': get_published_metrics(),
+            'outbox': outbox_stats(),
+            'throughput': {
+                channel: channel_class.throughput_by_worker()
+                for channel, channel_class in CHANNEL_CLASSES.items()
+            },
+            'timestamp': timezone.now(),
+        })
+    except Exception as e:
+        return Response({
+            'error': f'Delivery metrics failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
 def export_report(request):
@@ -4,7 +4,8 @@ Copyright (C) 2025 Francisco [Tu Apellido/Empresa]. All Rights Reserved.
 """
 
 from django.contrib import admin
-from .models import Notification
+from apps.core.pagination import EstimatedCountPaginator
+from .models import Notification, DeliveryBatch, OutboxMessage
 
 
 @admin.register(Notification)
@@ -13,8 +14,12 @@ class NotificationAdmin(admin.ModelAdmin):
     
     list_display = ('title', 'user', 'notification_type', 'is_read', 'created_at')
     list_filter = ('notification_type', 'is_read', 'created_at')
-    search_fields = ('title', 'message', 'user__email', 'user__first_name', 'user__last_name')
+    search_fields = ('^user__email',)
     readonly_fields = ('created_at', 'read_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Notification Details', {
@@ -24,3 +29,27 @@ class NotificationAdmin(admin.ModelAdmin):
             'fields': ('is_read', 'created_at', 'read_at')
         }),
     )
+
+
+@admin.register(DeliveryBatch)
+class DeliveryBatchAdmin(admin.ModelAdmin):
+    """Admin configuration for DeliveryBatch reports"""
+    
+    list_display = ('channel', 'kind', 'worker', 'sent', 'failed', 'duration_ms', 'created_at')
+    list_filter = ('channel', 'kind', 'created_at')
+    readonly_fields = ('channel', 'kind', 'worker', 'total', 'sent', 'failed', 'duration_ms', 'failures', 'created_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """Admin configuration for the delivery outbox"""
+    
+    list_display = ('idempotency_key', 'channel', 'kind', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'channel', 'kind')
+    search_fields = ('=idempotency_key',)
+    readonly_fields = ('idempotency_key', 'created_at', 'sent_at', 'last_error')
+    raw_id_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
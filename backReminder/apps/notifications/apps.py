@@ -10,3 +10,7 @@ class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.notifications'
     verbose_name = 'Notifications'
+
+    def ready(self):
+        from .message_templates import registry
+        registry.warm()
@@ -0,0 +1,437 @@
+"""
+Delivery channels - Send reminders and digests to users
+"""
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.core.sharding import group_by_shard
+from apps.schedules.models import DailySchedule
+from .message_templates import registry
+from .models import DeliveryBatch
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+DIGEST_WATERMARK_KEY = 'notifications:digests:last_run'
+DIGEST_WINDOW = timedelta(hours=1)
+# How far back a late run still sends the digests it missed
+DIGEST_MAX_CATCH_UP = timedelta(hours=12)
+
+
+def _chunks(items: Sequence, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def reminder_context(schedule: DailySchedule) -> Dict[str, Any]:
+    """Template context of a medication reminder"""
+    medication = schedule.medication
+    user = schedule.user
+    return {
+        'medication': medication.name,
+        'dosage': medication.dosage,
+        'time': schedule.scheduled_time.strftime('%H:%M'),
+        'user_name': user.first_name or user.email,
+    }
+
+
+class Channel:
+    """
+    Base delivery channel.
+
+    Subclasses build one message per reminder and send lists of
+    (reference, message) pairs with send_batch(); every batch is recorded
+    as a DeliveryBatch with its failures.
+    """
+    name = None
+    user_flag = None
+    recipient_field = None
+    body_part = 'message'
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self.batch_size = batch_size or 100
+
+    def accepts(self, user) -> bool:
+        """Whether the user opted in (and can be reached) on this channel"""
+        return bool(getattr(user, self.user_flag, False))
+
+    def reminder_payload(self, schedule: DailySchedule) -> Dict[str, Any]:
+        """JSON-serializable reminder, as stored in the outbox"""
+        context = reminder_context(schedule)
+        language = schedule.user.language
+        return {
+            'recipient': getattr(schedule.user, self.recipient_field),
+            'title': registry.render('medication', language, 'title', context),
+            'body': registry.render('medication', language, self.body_part, context),
+            'data': {'schedule_id': str(schedule.id), 'medication_id': str(schedule.medication_id)},
+        }
+
+    def build_message(self, payload: Dict[str, Any]):
+        """Turn a stored payload into the object send_batch() expects"""
+        return payload
+
+    def build_reminder(self, schedule: DailySchedule):
+        return self.build_message(self.reminder_payload(schedule))
+
+    def send_batch(self, messages: List[Tuple[Any, Any]], kind: str = 'reminder') -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def record_batch(self, kind: str, total: int, report: Dict[str, Any], start_time: float):
+        """Store the outcome of a batch"""
+        DeliveryBatch.objects.create(
+            channel=self.name,
+            kind=kind,
+            worker=WORKER_ID,
+            total=total,
+            sent=len(report['sent']),
+            failed=len(report['failures']),
+            duration_ms=(time.time() - start_time) * 1000,
+            failures=report['failures'],
+        )
+        if report['failures']:
+            logger.warning(f"{self.name} {kind} batch: {len(report['failures'])}/{total} failed")
+
+    def send_reminders(self, schedules: Sequence[DailySchedule]) -> Dict[str, Any]:
+        """Send reminders in batches, returning sent schedule ids"""
+        summary = {'sent': [], 'failed': 0, 'batches': 0}
+        for batch in _chunks(list(schedules), self.batch_size):
+            report = self.send_batch(
+                [(schedule.id, self.build_reminder(schedule)) for schedule in batch],
+                kind='reminder'
+            )
+            summary['sent'].extend(report['sent'])
+            summary['failed'] += len(report['failures'])
+            summary['batches'] += 1
+        return summary
+
+    def send_payloads(self, payloads: Sequence[Tuple[Any, Dict[str, Any]]], kind: str = 'reminder') -> Dict[str, Any]:
+        """Send stored (reference, payload) pairs, reporting failures per reference"""
+        report = self.send_batch(
+            [(reference, self.build_message(payload)) for reference, payload in payloads],
+            kind=kind
+        )
+        return {'sent': report['sent'], 'failed': len(report['failures']), 'failures': report['failures'], 'batches': 1}
+
+    @classmethod
+    def throughput_by_worker(cls, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Aggregate messages per second for each worker"""
+        since = since or timezone.now() - timedelta(hours=24)
+        rows = DeliveryBatch.objects.filter(
+            channel=cls.name, created_at__gte=since
+        ).values('worker').annotate(
+            batches=Count('id'),
+            sent=Sum('sent'),
+            failed=Sum('failed'),
+            total_ms=Sum('duration_ms'),
+            avg_batch_ms=Avg('duration_ms'),
+        ).order_by('worker')
+
+        return [
+            {
+                **row,
+                'messages_per_second': row['sent'] / (row['total_ms'] / 1000) if row['total_ms'] else 0.0,
+            }
+            for row in rows
+        ]
+
+
+class EmailChannel(Channel):
+    """
+    Email delivery channel.
+
+    Messages are sent in batches over a single connection obtained from
+    get_connection(), so the SMTP handshake and login happen once per batch.
+    """
+    name = 'email'
+    user_flag = 'email_notifications'
+    recipient_field = 'email'
+    body_part = 'email'
+
+    def accepts(self, user) -> bool:
+        return super().accepts(user) and bool(user.email)
+
+    def __init__(self, backend: Optional[str] = None, from_email: Optional[str] = None, batch_size: Optional[int] = None):
+        super().__init__(batch_size or getattr(settings, 'EMAIL_REMINDER_BATCH_SIZE', 100))
+        self.backend = backend
+        self.from_email = from_email or settings.DEFAULT_FROM_EMAIL
+
+    # Rendering
+
+    def build_message(self, payload: Dict[str, Any]) -> EmailMessage:
+        return EmailMessage(payload['title'], payload['body'], self.from_email, [payload['recipient']])
+
+    def build_digest(self, user, schedules: Iterable[DailySchedule], local_date) -> EmailMessage:
+        """Build the daily digest email listing a user's doses"""
+        line = registry.get('digest', user.language, 'line')
+        lines = '\n'.join(
+            line.render({
+                'time': schedule.scheduled_time.strftime('%H:%M'),
+                'medication': schedule.medication.name,
+                'dosage': schedule.medication.dosage,
+            })
+            for schedule in schedules
+        )
+        context = {'date': local_date.isoformat(), 'user_name': user.first_name or user.email, 'lines': lines}
+        subject = registry.render('digest', user.language, 'title', context)
+        body = registry.render('digest', user.language, 'email', context)
+        return EmailMessage(subject, body, self.from_email, [user.email])
+
+    # Sending
+
+    def send_batch(self, messages: List[Tuple[Any, EmailMessage]], kind: str = 'reminder') -> Dict[str, Any]:
+        """
+        Send (reference, message) pairs over one connection and record the batch.
+
+        Messages go out one by one through the already open connection so a
+        rejected recipient only fails its own message instead of the batch.
+        """
+        report = {'sent': [], 'failures': []}
+        if not messages:
+            return report
+
+        start_time = time.time()
+        connection = get_connection(self.backend, fail_silently=False)
+        try:
+            connection.open()
+            for reference, message in messages:
+                message.connection = connection
+                try:
+                    if connection.send_messages([message]):
+                        report['sent'].append(reference)
+                    else:
+                        report['failures'].append({'ref': str(reference), 'to': message.to, 'error': 'not sent'})
+                except Exception as e:
+                    report['failures'].append({'ref': str(reference), 'to': message.to, 'error': str(e)})
+        except Exception as e:
+            # Connection could not be opened - the whole remaining batch failed
+            failed_refs = {failure['ref'] for failure in report['failures']}
+            sent_refs = set(report['sent'])
+            for reference, message in messages:
+                if reference not in sent_refs and str(reference) not in failed_refs:
+                    report['failures'].append({'ref': str(reference), 'to': message.to, 'error': str(e)})
+        finally:
+            connection.close()
+
+        self.record_batch(kind, len(messages), report, start_time)
+        return report
+
+    def send_digests(self, digests: Sequence[Tuple[Any, List[DailySchedule], Any]]) -> Dict[str, Any]:
+        """Send digest emails for (user, schedules, local_date) entries"""
+        summary = {'sent': [], 'failed': 0, 'batches': 0}
+        for batch in _chunks(list(digests), self.batch_size):
+            report = self.send_batch(
+                [(user.id, self.build_digest(user, schedules, local_date)) for user, schedules, local_date in batch],
+                kind='digest'
+            )
+            summary['sent'].extend(report['sent'])
+            summary['failed'] += len(report['failures'])
+            summary['batches'] += 1
+        return summary
+
+
+class ChannelBackend:
+    """
+    Provider backend used by push and SMS channels.
+
+    open() and close() bracket a batch so providers can reuse one session;
+    send() raises on failure.
+    """
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, recipient: str, title: str, body: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+
+class LoggingBackend(ChannelBackend):
+    """Backend that only logs messages - the default until a provider is configured"""
+
+    def send(self, recipient: str, title: str, body: str, data: Dict[str, Any]):
+        logger.info(f"Notification to {recipient[:12]}...: {title} - {body}")
+
+
+class ProviderChannel(Channel):
+    """
+    Channel that sends through a ChannelBackend configured in
+    NOTIFICATION_CHANNELS[name]['BACKEND']
+    """
+
+    def __init__(self, backend: Optional[ChannelBackend] = None, batch_size: Optional[int] = None):
+        options = getattr(settings, 'NOTIFICATION_CHANNELS', {}).get(self.name, {})
+        super().__init__(batch_size or options.get('BATCH_SIZE', 100))
+        if backend is None:
+            backend = import_string(options.get('BACKEND', 'apps.notifications.channels.LoggingBackend'))()
+        self.backend = backend
+
+    def accepts(self, user) -> bool:
+        return super().accepts(user) and bool(getattr(user, self.recipient_field, ''))
+
+    def send_batch(self, messages: List[Tuple[Any, Dict[str, Any]]], kind: str = 'reminder') -> Dict[str, Any]:
+        report = {'sent': [], 'failures': []}
+        if not messages:
+            return report
+
+        start_time = time.time()
+        try:
+            self.backend.open()
+            for reference, message in messages:
+                try:
+                    self.backend.send(message['recipient'], message['title'], message['body'], message['data'])
+                    report['sent'].append(reference)
+                except Exception as e:
+                    report['failures'].append({'ref': str(reference), 'error': str(e)})
+        except Exception as e:
+            sent_refs = set(report['sent'])
+            failed_refs = {failure['ref'] for failure in report['failures']}
+            for reference, _message in messages:
+                if reference not in sent_refs and str(reference) not in failed_refs:
+                    report['failures'].append({'ref': str(reference), 'error': str(e)})
+        finally:
+            self.backend.close()
+
+        self.record_batch(kind, len(messages), report, start_time)
+        return report
+
+
+class PushChannel(ProviderChannel):
+    """Push notifications to the user's registered device"""
+    name = 'push'
+    user_flag = 'push_notifications'
+    recipient_field = 'device_token'
+
+
+class SmsChannel(ProviderChannel):
+    """SMS reminders to the user's phone number"""
+    name = 'sms'
+    user_flag = 'sms_notifications'
+    recipient_field = 'phone_number'
+
+
+CHANNEL_CLASSES = {
+    'email': EmailChannel,
+    'push': PushChannel,
+    'sms': SmsChannel,
+}
+
+
+def _digest_window(now: datetime) -> timedelta:
+    """Time since the last run (at least DIGEST_WINDOW, at most DIGEST_MAX_CATCH_UP)"""
+    last_run = cache.get(DIGEST_WATERMARK_KEY)
+    if last_run is None:
+        return DIGEST_WINDOW
+    return min(max(now - last_run, DIGEST_WINDOW), DIGEST_MAX_CATCH_UP)
+
+
+def _claim_digests(due_users: Dict[int, Tuple[Any, Any]]) -> Dict[int, Any]:
+    """
+    Mark the digests as sent, returning the users this run claimed with their previous mark.
+
+    A profile already marked for the local date, or locked by a concurrent
+    run, is left out.
+    """
+    from apps.users.models import UserProfile
+
+    by_date = defaultdict(list)
+    for user_id, (_user, local_date) in due_users.items():
+        by_date[local_date].append(user_id)
+    claimed = {}
+    with transaction.atomic():
+        for local_date, user_ids in by_date.items():
+            rows = dict(
+                UserProfile.objects.filter(user_id__in=user_ids)
+                .filter(Q(last_digest_date__isnull=True) | Q(last_digest_date__lt=local_date))
+                .select_for_update(skip_locked=True)
+                .values_list('user_id', 'last_digest_date')
+            )
+            UserProfile.objects.filter(user_id__in=rows).update(last_digest_date=local_date)
+            claimed.update(rows)
+    return claimed
+
+
+def send_due_email_digests(now: Optional[datetime] = None, window: Optional[timedelta] = None) -> Dict[str, Any]:
+    """
+    Email the daily digest of users whose digest instant fell in the last window.
+
+    Users are matched per timezone on their local preferred time, then the
+    exact instant is confirmed through the planner. The window defaults to
+    the time since the last run, so a late run catches up; each digest is
+    claimed on the user's profile before sending, so overlapping windows
+    and concurrent runs send it once. Failed sends are released.
+    """
+    from apps.users.models import User, UserProfile
+    from .planner import DEFAULT_DIGEST_TIME, DeliveryPlanner, load_zone
+
+    now = now or timezone.now()
+    window = window or _digest_window(now)
+    planner = DeliveryPlanner()
+    recipients = User.objects.filter(is_active=True, email_notifications=True)
+
+    due_users = {}
+    for tz_name in recipients.values_list('timezone', flat=True).distinct():
+        zone = load_zone(tz_name)
+        local_start = timezone.localtime(now - window, zone)
+        local_now = timezone.localtime(now, zone)
+
+        if local_start.date() == local_now.date():
+            in_window = Q(profile__preferred_notification_time__gt=local_start.time(),
+                          profile__preferred_notification_time__lte=local_now.time())
+            default_due = local_start.time() < DEFAULT_DIGEST_TIME <= local_now.time()
+        else:
+            in_window = (Q(profile__preferred_notification_time__gt=local_start.time()) |
+                         Q(profile__preferred_notification_time__lte=local_now.time()))
+            default_due = DEFAULT_DIGEST_TIME > local_start.time() or DEFAULT_DIGEST_TIME <= local_now.time()
+        if default_due:
+            in_window |= Q(profile__preferred_notification_time__isnull=True)
+
+        users = recipients.filter(in_window, timezone=tz_name).select_related('profile')
+        for user in users:
+            profile = getattr(user, 'profile', None)
+            preferred = (profile.preferred_notification_time if profile else None) or DEFAULT_DIGEST_TIME
+            local_date = local_start.date() if preferred > local_start.time() else local_now.date()
+            if now - window < planner.digest_send_at(tz_name, local_date, preferred) <= now:
+                due_users[user.id] = (user, local_date)
+
+    if not due_users:
+        cache.set(DIGEST_WATERMARK_KEY, now, None)
+        return {'due': 0, 'sent': 0, 'failed': 0, 'batches': 0}
+
+    schedules_by_user = defaultdict(list)
+    for alias, user_ids in group_by_shard(due_users).items():
+        schedules = DailySchedule.objects.using(alias).filter(
+            user_id__in=user_ids,
+            date__in={due_users[user_id][1] for user_id in user_ids},
+        ).select_related('medication').order_by('scheduled_time')
+        for schedule in schedules:
+            if schedule.date == due_users[schedule.user_id][1]:
+                schedules_by_user[schedule.user_id].append(schedule)
+
+    claimed = _claim_digests({
+        user_id: due for user_id, due in due_users.items() if schedules_by_user[user_id]
+    })
+    digests = [
+        (due_users[user_id][0], schedules_by_user[user_id], due_users[user_id][1])
+        for user_id in claimed
+    ]
+    summary = EmailChannel().send_digests(digests)
+    for user_id in set(claimed) - set(summary['sent']):
+        UserProfile.objects.filter(user_id=user_id).update(last_digest_date=claimed[user_id])
+    cache.set(DIGEST_WATERMARK_KEY, now, None)
+    return {'due': len(digests), 'sent': len(summary['sent']), 'failed': summary['failed'], 'batches': summary['batches']}
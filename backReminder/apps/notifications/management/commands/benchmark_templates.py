@@ -0,0 +1,40 @@
+"""
+Management command to benchmark notification template rendering
+"""
+from django.core.management.base import BaseCommand, CommandError
+from apps.notifications.message_templates import TEMPLATES, registry
+
+
+class Command(BaseCommand):
+    help = 'Measure localized notification template renders per second'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=200000,
+            help='Number of reminders to render'
+        )
+        parser.add_argument(
+            '--language',
+            type=str,
+            default='es',
+            help='Template language to render'
+        )
+
+    def handle(self, *args, **options):
+        if options['count'] <= 0:
+            raise CommandError('--count must be positive')
+
+        registry.warm()
+        self.stdout.write(
+            f'⏱️  Rendering {options["count"]} medication reminders ({options["language"]})...'
+        )
+        result = registry.benchmark(options['count'], 'medication', options['language'])
+
+        self.stdout.write(f'   Templates compiled: {sum(len(parts) for languages in TEMPLATES.values() for parts in languages.values())}')
+        self.stdout.write(f'   Elapsed: {result["seconds"]}s')
+        self.stdout.write(f'   str.format baseline: {result["str_format_renders_per_second"]:,} renders/s')
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ {result["renders_per_second"]:,} renders/s (title + message)')
+        )
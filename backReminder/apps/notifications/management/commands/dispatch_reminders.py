@@ -0,0 +1,68 @@
+"""
+Management command to enqueue due reminders and relay the delivery outbox
+"""
+from django.core.management.base import BaseCommand
+from apps.notifications.channels import CHANNEL_CLASSES, send_due_email_digests
+from apps.notifications.outbox import enqueue_due_reminders, outbox_stats, relay_outbox
+from apps.notifications.router import get_router
+
+
+class Command(BaseCommand):
+    help = 'Deliver due reminders on every enabled channel (and optionally email digests)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--digests',
+            action='store_true',
+            help='Also send email digests due within the last hour'
+        )
+        parser.add_argument(
+            '--no-relay',
+            action='store_true',
+            help='Only enqueue; leave delivery to the relay worker'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=20,
+            help='Maximum outbox batches to relay'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('📨 Enqueuing due reminders...')
+        report = enqueue_due_reminders()
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Enqueued {report["enqueued"]} messages for {report["due"]} reminders ({report["expired"]} expired unsent)')
+        )
+        for channel, count in report['per_channel'].items():
+            self.stdout.write(f'   {channel}: {count}')
+
+        if not options['no_relay']:
+            self.stdout.write('🚚 Relaying outbox...')
+            report = relay_outbox(max_batches=options['max_batches'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✅ Sent {report["sent"]}/{report["claimed"]} '
+                    f'({report["retried"]} retried, {report["deferred"]} deferred, {report["late"]} late, {report["dead"]} dead)'
+                )
+            )
+        self.stdout.write(f'📦 Outbox: {outbox_stats()}')
+
+        if options['digests']:
+            report = send_due_email_digests()
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ Digests: {report["sent"]}/{report["due"]} sent')
+            )
+
+        self.stdout.write('📊 Channel metrics:')
+        for channel, metrics in get_router().metrics().items():
+            self.stdout.write(
+                f'   {channel}: circuit={metrics["circuit"]} p95={metrics["latency_ms"]["p95"]}ms '
+                f'error_rate={metrics["error_rate"]:.2%} rejected={metrics["rejected"]} '
+                f'timeouts={metrics["timeouts"]}'
+            )
+        for channel, channel_class in CHANNEL_CLASSES.items():
+            for row in channel_class.throughput_by_worker():
+                self.stdout.write(f'   {channel} @ {row["worker"]}: {row["messages_per_second"]:.1f} msg/s')
+
+        get_router().shutdown()
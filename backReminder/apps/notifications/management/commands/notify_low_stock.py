@@ -0,0 +1,26 @@
+"""
+Management command to create refill notifications for medications running low
+"""
+from django.core.management.base import BaseCommand
+from apps.notifications.refills import notify_low_stock
+
+
+class Command(BaseCommand):
+    help = 'Notify every medication that reached its low stock threshold, once per crossing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Medications notified per transaction'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('📦 Scanning for low stock...')
+        report = notify_low_stock(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ {report["notified"]} refill notifications ({report["rearmed"]} alerts re-armed)'
+            )
+        )
@@ -0,0 +1,51 @@
+"""
+Management command to plan reminder send instants in batch
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.notifications.planner import plan_reminders
+
+
+class Command(BaseCommand):
+    help = 'Compute send_at for pending medication reminders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='First schedule date to plan (YYYY-MM-DD), defaults to today'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Number of consecutive days to plan'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows written per bulk update'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = (
+                timezone.datetime.strptime(options['date'], '%Y-%m-%d').date()
+                if options['date'] else timezone.localdate()
+            )
+        except ValueError:
+            raise CommandError('--date must use the YYYY-MM-DD format')
+
+        dates = [start + timedelta(days=offset) for offset in range(options['days'])]
+        self.stdout.write(f'🗓️  Planning reminders for {dates[0]} → {dates[-1]}...')
+
+        report = plan_reminders(dates, batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Planned {report["planned"]} reminders '
+                f'({report["unchanged"]} unchanged, {report["timezones"]} timezones)'
+            )
+        )
@@ -0,0 +1,60 @@
+"""
+Management command to run the delivery outbox relay
+"""
+import time
+from django.core.management.base import BaseCommand
+from apps.notifications.outbox import relay_outbox
+from apps.notifications.router import get_router
+
+
+class Command(BaseCommand):
+    help = 'Deliver due outbox messages; run several instances to scale delivery'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep relaying until interrupted'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the outbox has nothing due'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Messages claimed per batch'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=20,
+            help='Batches relayed per pass'
+        )
+
+    def handle(self, *args, **options):
+        relay_options = {'batch_size': options['batch_size']} if options['batch_size'] else {}
+        self.stdout.write('🚚 Relaying delivery outbox...')
+        try:
+            while True:
+                started = time.monotonic()
+                report = relay_outbox(max_batches=options['max_batches'], **relay_options)
+                if report['claimed']:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f'✅ Sent {report["sent"]}/{report["claimed"]} in {report["batches"]} batches '
+                            f'({report["sent"] / elapsed:.1f} msg/s, {report["retried"]} retried, '
+                            f'{report["deferred"]} deferred, {report["dead"]} dead)'
+                        )
+                    )
+                if not options['loop']:
+                    break
+                if not report['claimed']:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️  Relay stopped')
+        finally:
+            get_router().shutdown()
@@ -0,0 +1,203 @@
+"""
+Localized notification templates - compiled once per process
+
+Templates use {placeholder} syntax. Each (type, language) template is
+compiled the first time it is needed into a printf-style format string plus
+an itemgetter over the context, so rendering is a single C-level formatting
+call with no parsing on the hot path.
+"""
+import threading
+import time
+from operator import itemgetter
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+DEFAULT_LANGUAGE = 'es'
+
+TEMPLATES = {
+    'medication': {
+        'es': {
+            'title': 'Recordatorio: {medication}',
+            'message': 'Toma {dosage} de {medication} a las {time}',
+            'email': 'Hola {user_name},\n\nEs momento de tomar {medication} ({dosage}) programado para las {time}.\n',
+        },
+        'en': {
+            'title': 'Reminder: {medication}',
+            'message': 'Take {dosage} of {medication} at {time}',
+            'email': 'Hi {user_name},\n\nIt is time to take {medication} ({dosage}) scheduled for {time}.\n',
+        },
+    },
+    'refill': {
+        'es': {
+            'title': 'Quedan pocas dosis de {medication}',
+            'message': 'Te quedan {remaining} dosis de {medication}. Es momento de surtir tu receta.',
+            'email': 'Hola {user_name},\n\nTe quedan {remaining} dosis de {medication}. Es momento de surtir tu receta.\n',
+        },
+        'en': {
+            'title': '{medication} is running low',
+            'message': 'You have {remaining} doses of {medication} left. Time to refill your prescription.',
+            'email': 'Hi {user_name},\n\nYou have {remaining} doses of {medication} left. Time to refill your prescription.\n',
+        },
+    },
+    'appointment': {
+        'es': {
+            'title': 'Cita: {appointment}',
+            'message': 'Tienes {appointment} el {date} a las {time}',
+            'email': 'Hola {user_name},\n\nTienes {appointment} el {date} a las {time}.\n',
+        },
+        'en': {
+            'title': 'Appointment: {appointment}',
+            'message': 'You have {appointment} on {date} at {time}',
+            'email': 'Hi {user_name},\n\nYou have {appointment} on {date} at {time}.\n',
+        },
+    },
+    'system': {
+        'es': {
+            'title': '{title}',
+            'message': '{message}',
+            'email': 'Hola {user_name},\n\n{message}\n',
+        },
+        'en': {
+            'title': '{title}',
+            'message': '{message}',
+            'email': 'Hi {user_name},\n\n{message}\n',
+        },
+    },
+    'digest': {
+        'es': {
+            'title': 'Tus medicamentos para el {date}',
+            'line': '- {time} {medication} ({dosage})',
+            'email': 'Hola {user_name},\n\nEstas son tus dosis de hoy:\n{lines}\n',
+        },
+        'en': {
+            'title': 'Your medications for {date}',
+            'line': '- {time} {medication} ({dosage})',
+            'email': 'Hi {user_name},\n\nThese are your doses for today:\n{lines}\n',
+        },
+    },
+}
+
+
+class CompiledTemplate:
+    """
+    A template reduced to a printf format string and a context getter
+    """
+    __slots__ = ('source', 'fields', 'format', '_getter')
+
+    def __init__(self, source: str):
+        self.source = source
+        literal_parts = []
+        fields = []
+        for literal, field_name, _spec, _conversion in Formatter().parse(source):
+            literal_parts.append(literal.replace('%', '%%'))
+            if field_name is not None:
+                literal_parts.append('%s')
+                fields.append(field_name)
+        self.format = ''.join(literal_parts)
+        self.fields = tuple(fields)
+
+        if not fields:
+            self._getter = lambda context: ()
+        elif len(fields) == 1:
+            single = itemgetter(fields[0])
+            self._getter = lambda context: (single(context),)
+        else:
+            self._getter = itemgetter(*fields)
+
+    def render(self, context: Dict[str, Any]) -> str:
+        return self.format % self._getter(context)
+
+
+class TemplateRegistry:
+    """
+    Process-wide cache of compiled templates keyed by (type, language, part)
+    """
+
+    def __init__(self, templates: Dict[str, Dict[str, Dict[str, str]]] = None):
+        self.templates = templates or TEMPLATES
+        self._compiled: Dict[Tuple[str, str, str], CompiledTemplate] = {}
+        self._lock = threading.Lock()
+
+    def resolve_language(self, notification_type: str, language: Optional[str]) -> str:
+        """Pick the best available language, e.g. 'es-mx' falls back to 'es'"""
+        available = self.templates[notification_type]
+        if language in available:
+            return language
+        if language:
+            base = language.split('-')[0].split('_')[0].lower()
+            if base in available:
+                return base
+        default = getattr(settings, 'NOTIFICATION_DEFAULT_LANGUAGE', DEFAULT_LANGUAGE)
+        return default if default in available else next(iter(available))
+
+    def get(self, notification_type: str, language: Optional[str], part: str) -> CompiledTemplate:
+        """Return the compiled template, compiling it on first use"""
+        cache_key = (notification_type, language, part)
+        compiled = self._compiled.get(cache_key)
+        if compiled is None:
+            with self._lock:
+                resolved = self.resolve_language(notification_type, language)
+                compiled = self._compiled.get((notification_type, resolved, part))
+                if compiled is None:
+                    compiled = CompiledTemplate(self.templates[notification_type][resolved][part])
+                    self._compiled[(notification_type, resolved, part)] = compiled
+                self._compiled[cache_key] = compiled
+        return compiled
+
+    def render(self, notification_type: str, language: Optional[str], part: str, context: Dict[str, Any]) -> str:
+        return self.get(notification_type, language, part).render(context)
+
+    def render_many(
+        self,
+        notification_type: str,
+        language: Optional[str],
+        contexts: Iterable[Dict[str, Any]],
+        parts: Tuple[str, ...] = ('title', 'message'),
+    ) -> List[Tuple[str, ...]]:
+        """Render a batch sharing one (type, language), looking templates up once"""
+        renderers = [self.get(notification_type, language, part).render for part in parts]
+        if len(renderers) == 2:
+            first, second = renderers
+            return [(first(context), second(context)) for context in contexts]
+        return [tuple(render(context) for render in renderers) for context in contexts]
+
+    def warm(self):
+        """Compile every template up front"""
+        for notification_type, languages in self.templates.items():
+            for language, parts in languages.items():
+                for part in parts:
+                    self.get(notification_type, language, part)
+
+    def benchmark(self, count: int = 100000, notification_type: str = 'medication', language: str = 'es') -> Dict[str, Any]:
+        """Measure batch renders per second for one template pair"""
+        contexts = [
+            {'medication': f'Medicamento {index % 50}', 'dosage': '500mg', 'time': '08:00', 'user_name': 'Ana'}
+            for index in range(min(count, 10000))
+        ]
+        rounds, remainder = divmod(count, len(contexts))
+
+        start_time = time.perf_counter()
+        for _round in range(rounds):
+            self.render_many(notification_type, language, contexts)
+        if remainder:
+            self.render_many(notification_type, language, contexts[:remainder])
+        elapsed = time.perf_counter() - start_time
+
+        baseline_source = self.templates[notification_type][self.resolve_language(notification_type, language)]
+        start_time = time.perf_counter()
+        for context in contexts:
+            baseline_source['title'].format(**context)
+            baseline_source['message'].format(**context)
+        baseline_elapsed = (time.perf_counter() - start_time) * (count / len(contexts))
+
+        return {
+            'renders': count,
+            'seconds': round(elapsed, 4),
+            'renders_per_second': round(count / elapsed) if elapsed else None,
+            'str_format_renders_per_second': round(count / baseline_elapsed) if baseline_elapsed else None,
+        }
+
+
+registry = TemplateRegistry()
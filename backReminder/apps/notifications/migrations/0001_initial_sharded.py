@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from apps.core.sharding import CreateShardedModel
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    # Fresh shards create the tables without the user constraint
+    replaces = [
+        ('notifications', '0001_initial'),
+    ]
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        CreateShardedModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('medication', 'Medication Reminder'), ('system', 'System Notification'), ('appointment', 'Appointment Reminder'), ('refill', 'Prescription Refill')], default='system', max_length=20)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:57
+
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    """Admin '=' searches compare UPPER(column); PostgreSQL needs a matching expression index"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS notifications_outbox_key_upper_idx '
+            'ON notifications_outboxmessage (UPPER(idempotency_key::text))'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS notifications_outbox_key_upper_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at'], name='notificatio_created_46ad24_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at'], name='notificatio_user_id_c62b26_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
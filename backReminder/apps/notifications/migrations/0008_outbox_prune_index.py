@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_user_fk_without_constraint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['status', 'sent_at'], name='notificatio_status_e50878_idx'),
+        ),
+    ]
@@ -6,6 +6,8 @@ Copyright (C) 2025 Francisco [Tu Apellido/Empresa]. All Rights Reserved.
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from apps.core.sharding import UserShardedManager
+
 User = get_user_model()
 
 
@@ -19,16 +21,104 @@ class Notification(models.Model):
         ('refill', 'Prescription Refill'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications', db_constraint=False)
     title = models.CharField(max_length=200)
     message = models.TextField()
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES, default='system')
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     read_at = models.DateTimeField(null=True, blank=True)
     
+    objects = UserShardedManager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['user', 'updated_at', 'id']),
+        ]
         
     def __str__(self):
         return f"{self.title} - {self.user.email}"
+
+
+class DeliveryBatch(models.Model):
+    """Outcome of one batch sent through a delivery channel"""
+    
+    CHANNELS = [
+        ('email', 'Email'),
+        ('push', 'Push'),
+        ('sms', 'SMS'),
+    ]
+    
+    channel = models.CharField(max_length=10, choices=CHANNELS)
+    kind = models.CharField(max_length=20, default='reminder')
+    worker = models.CharField(max_length=100, help_text='host:pid of the sending worker')
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    duration_ms = models.FloatField(default=0.0)
+    failures = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['channel', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel} batch - {self.sent}/{self.total} at {self.created_at}"
+    
+    @property
+    def throughput(self):
+        """Messages sent per second in this batch"""
+        if not self.duration_ms:
+            return 0.0
+        return self.sent / (self.duration_ms / 1000)
+
+
+class OutboxMessage(models.Model):
+    """
+    Message waiting to be delivered by the outbox relay.
+
+    Rows are written in the same transaction as the state change that
+    produced them, so a committed change always has its message and a
+    rolled back one never does.
+    """
+    
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Dead'),
+    ]
+    
+    idempotency_key = models.CharField(max_length=120, unique=True)
+    channel = models.CharField(max_length=10, choices=DeliveryBatch.CHANNELS)
+    kind = models.CharField(max_length=20, default='reminder')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='outbox_messages', null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            # Retention prune (outbox.prune_outbox)
+            models.Index(fields=['status', 'sent_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel} {self.kind} [{self.status}] {self.idempotency_key}"
@@ -0,0 +1,363 @@
+"""
+Delivery outbox - Decouples state changes from provider delivery
+
+Writers enqueue messages in the same transaction as the change that produced
+them; a relay worker later claims due rows in batches, sends them through the
+channel router and retries failures with exponential backoff. Each message
+carries an idempotency key, unique in the table and forwarded to providers,
+so a retried or re-enqueued message is never stored twice.
+"""
+import logging
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.core.sharding import joins_users, shard_databases
+from apps.schedules.models import DailySchedule
+from .models import DeliveryBatch, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTBOX_OPTIONS = {
+    'BATCH_SIZE': 500,
+    'MAX_ATTEMPTS': 8,
+    'BASE_DELAY': 30,
+    'MAX_DELAY': 60 * 60,
+    'LEASE': 5 * 60,
+    'RETENTION_DAYS': 14,
+}
+
+
+def outbox_options() -> Dict[str, Any]:
+    return {**DEFAULT_OUTBOX_OPTIONS, **getattr(settings, 'NOTIFICATION_OUTBOX', {})}
+
+
+def enqueue(messages: Iterable[OutboxMessage], batch_size: int = 500) -> int:
+    """
+    Store outbox messages, skipping keys that already exist.
+
+    Call it inside the writer's transaction.atomic() block.
+    """
+    now = timezone.now()
+    messages = list(messages)
+    for message in messages:
+        if message.next_attempt_at is None:
+            message.next_attempt_at = now
+    OutboxMessage.objects.bulk_create(messages, batch_size=batch_size, ignore_conflicts=True)
+    return len(messages)
+
+
+def enqueue_due_reminders(now: Optional[datetime] = None, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Move due reminders into the outbox, one user shard at a time.
+
+    The schedules are marked as sent and their messages written in one
+    transaction, so a crash either keeps both or neither. Rows are locked
+    with SKIP LOCKED so concurrent runs split the work instead of waiting.
+    On a shard other than the outbox's database the messages are committed
+    first; a crash before the schedules are marked only re-enqueues keys
+    that already exist, which enqueue() skips.
+
+    Reminders left unsent past REMINDER_LOOKBACK (a worker outage) are
+    expired instead: marked as sent with no notification_sent_at, counted
+    and logged.
+    """
+    from .router import get_router
+
+    now = now or timezone.now()
+    channels = [lane.channel for lane in get_router().lanes.values()]
+    report = {'due': 0, 'enqueued': 0, 'expired': 0, 'per_channel': defaultdict(int)}
+    for alias in shard_databases():
+        report['expired'] += _expire_shard(alias, now, batch_size)
+        _enqueue_shard(alias, now, channels, batch_size, report)
+    report['per_channel'] = dict(report['per_channel'])
+    if report['expired']:
+        logger.warning(f"Outbox: {report['expired']} reminders expired unsent")
+    return report
+
+
+def _expire_shard(alias: str, now: datetime, batch_size: int) -> int:
+    from .planner import expired_reminders
+
+    expired = expired_reminders(now).using(alias)
+    count = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        count += DailySchedule.objects.using(alias).filter(id__in=ids, notification_sent=False).update(
+            notification_sent=True, updated_at=now
+        )
+        if len(ids) < batch_size:
+            break
+    return count
+
+
+def _enqueue_shard(alias: str, now: datetime, channels, batch_size: int, report: Dict[str, Any]):
+    from apps.users.models import User
+    from .planner import due_reminders
+
+    due = due_reminders(now).using(alias)
+    if joins_users(alias):
+        due_ids = list(due.filter(user__is_active=True).values_list('id', flat=True)[:batch_size * 10])
+    else:
+        candidates = list(due.values_list('id', 'user_id')[:batch_size * 10])
+        active = set(User.objects.filter(
+            id__in={user_id for _id, user_id in candidates}, is_active=True
+        ).values_list('id', flat=True))
+        due_ids = [schedule_id for schedule_id, user_id in candidates if user_id in active]
+    if not due_ids:
+        return
+
+    with transaction.atomic(using=alias):
+        schedules = DailySchedule.objects.using(alias).filter(id__in=due_ids, notification_sent=False)
+        if joins_users(alias):
+            schedules = list(
+                schedules.select_related('user', 'medication').select_for_update(skip_locked=True, of=('self',))
+            )
+        else:
+            schedules = list(schedules.select_related('medication').select_for_update(skip_locked=True, of=('self',)))
+            users = User.objects.in_bulk({schedule.user_id for schedule in schedules})
+            for schedule in schedules:
+                schedule.user = users[schedule.user_id]
+
+        messages = []
+        for schedule in schedules:
+            for channel in channels:
+                if not channel.accepts(schedule.user):
+                    continue
+                payload = channel.reminder_payload(schedule)
+                key = f'reminder:{schedule.id}:{channel.name}'
+                payload['data']['idempotency_key'] = key
+                messages.append(OutboxMessage(
+                    idempotency_key=key,
+                    channel=channel.name,
+                    kind='reminder',
+                    user_id=schedule.user_id,
+                    payload=payload,
+                    next_attempt_at=now,
+                ))
+                report['per_channel'][channel.name] += 1
+
+        with transaction.atomic():
+            enqueue(messages, batch_size=batch_size)
+        if schedules:
+            DailySchedule.objects.using(alias).filter(
+                id__in=[schedule.id for schedule in schedules]
+            ).update(notification_sent=True, notification_sent_at=now, updated_at=now)
+
+    report['due'] += len(schedules)
+    report['enqueued'] += len(messages)
+
+
+class OutboxRelay:
+    """
+    Drains the outbox through the delivery router.
+
+    Claimed rows are leased: they move to 'sending' with next_attempt_at set
+    to the end of the lease, so rows of a crashed relay become claimable
+    again once the lease expires. Delivery is therefore at-least-once and
+    providers receive the idempotency key to drop duplicates.
+
+    A batch that times out while sending keeps its lease instead of being
+    retried at once: when it finishes, its sent rows are settled.
+    """
+
+    def __init__(self, router=None, **options):
+        from .router import get_router
+
+        self.router = router or get_router()
+        self.options = {**outbox_options(), **{key.upper(): value for key, value in options.items()}}
+
+    def backoff(self, attempts: int) -> timedelta:
+        """Exponential backoff with jitter over the upper half, capped at MAX_DELAY"""
+        ceiling = min(self.options['MAX_DELAY'], self.options['BASE_DELAY'] * (2 ** max(0, attempts - 1)))
+        return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+    def claim(self, now: datetime) -> List[OutboxMessage]:
+        """Lease the next batch of due messages"""
+        with transaction.atomic():
+            messages = list(
+                OutboxMessage.objects.filter(
+                    status__in=[OutboxMessage.PENDING, OutboxMessage.SENDING],
+                    next_attempt_at__lte=now,
+                ).order_by('next_attempt_at').select_for_update(skip_locked=True)[:self.options['BATCH_SIZE']]
+            )
+            if messages:
+                OutboxMessage.objects.filter(id__in=[message.id for message in messages]).update(
+                    status=OutboxMessage.SENDING,
+                    next_attempt_at=now + timedelta(seconds=self.options['LEASE']),
+                )
+        return messages
+
+    def deliver(self, messages: List[OutboxMessage]) -> Dict[str, Any]:
+        """Send claimed messages on their channel lanes and settle each row"""
+        now = timezone.now()
+        by_id = {message.id: message for message in messages}
+        errors: Dict[int, str] = {}
+        sent_ids = []
+        deferred_ids = []
+        late = 0
+
+        submitted = []
+        by_channel = defaultdict(list)
+        for message in messages:
+            by_channel[message.channel].append(message)
+        for channel, channel_messages in by_channel.items():
+            lane = self.router.lanes.get(channel)
+            if lane is None:
+                for message in channel_messages:
+                    errors[message.id] = f'Unknown channel {channel}'
+                continue
+            size = lane.channel.batch_size
+            for start in range(0, len(channel_messages), size):
+                batch = channel_messages[start:start + size]
+                future = lane.submit([(message.id, message.payload) for message in batch], method='send_payloads')
+                if future is None:
+                    # Lane saturated or circuit open - not the message's fault
+                    deferred_ids.extend(message.id for message in batch)
+                    continue
+                submitted.append((lane, future, batch))
+
+        for lane, future, batch in submitted:
+            summary = lane.collect(future)
+            if future.cancelled():
+                # Never got a worker: nothing was sent
+                deferred_ids.extend(message.id for message in batch)
+                continue
+            if summary is None and not future.done():
+                future.add_done_callback(self.settle_late)
+                late += len(batch)
+                continue
+            if summary is None:
+                for message in batch:
+                    errors[message.id] = f'{lane.name} batch timed out or failed'
+                continue
+            sent_ids.extend(summary['sent'])
+            for failure in summary['failures']:
+                errors[int(failure['ref'])] = failure['error']
+
+        self.router.publish_metrics()
+
+        if sent_ids:
+            OutboxMessage.objects.filter(id__in=sent_ids).update(
+                status=OutboxMessage.SENT, sent_at=now, last_error=''
+            )
+        if deferred_ids:
+            OutboxMessage.objects.filter(id__in=deferred_ids).update(
+                status=OutboxMessage.PENDING, next_attempt_at=now + self.backoff(1)
+            )
+
+        dead = 0
+        retried = []
+        for message_id, error in errors.items():
+            message = by_id[message_id]
+            message.attempts += 1
+            message.last_error = error[:1000]
+            if message.attempts >= self.options['MAX_ATTEMPTS']:
+                message.status = OutboxMessage.DEAD
+                dead += 1
+            else:
+                message.status = OutboxMessage.PENDING
+                message.next_attempt_at = now + self.backoff(message.attempts)
+            retried.append(message)
+        if retried:
+            OutboxMessage.objects.bulk_update(retried, ['status', 'attempts', 'last_error', 'next_attempt_at'])
+        if dead:
+            logger.error(f"Outbox: {dead} messages exhausted their retries")
+
+        return {
+            'claimed': len(messages),
+            'sent': len(sent_ids),
+            'retried': len(retried) - dead,
+            'deferred': len(deferred_ids),
+            'late': late,
+            'dead': dead,
+        }
+
+    @staticmethod
+    def settle_late(future):
+        """Mark the sent rows of a batch that finished after its timeout; the rest wait for their lease"""
+        try:
+            if future.cancelled() or future.exception() is not None:
+                return
+            sent_ids = future.result()['sent']
+            if sent_ids:
+                OutboxMessage.objects.filter(id__in=sent_ids, status=OutboxMessage.SENDING).update(
+                    status=OutboxMessage.SENT, sent_at=timezone.now(), last_error=''
+                )
+        except Exception as e:
+            logger.warning(f"Outbox: could not settle a late batch: {e}")
+        finally:
+            # Runs on the lane's worker thread (or the caller's, had it just finished)
+            if not connection.in_atomic_block:
+                connection.close()
+
+    def run(self, max_batches: int = 20) -> Dict[str, Any]:
+        """Relay batches until the outbox has nothing due or max_batches is reached"""
+        report = {'batches': 0, 'claimed': 0, 'sent': 0, 'retried': 0, 'deferred': 0, 'late': 0, 'dead': 0}
+        for _batch in range(max_batches):
+            messages = self.claim(timezone.now())
+            if not messages:
+                break
+            result = self.deliver(messages)
+            report['batches'] += 1
+            for field, value in result.items():
+                report[field] += value
+            if len(messages) < self.options['BATCH_SIZE']:
+                break
+        return report
+
+
+def relay_outbox(max_batches: int = 20, **options) -> Dict[str, Any]:
+    """Drain due outbox messages"""
+    return OutboxRelay(**options).run(max_batches=max_batches)
+
+
+def prune_outbox(chunk_size: int = 1000, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Delete sent messages and delivery batch reports older than RETENTION_DAYS, in chunks.
+
+    Pending, sending and dead messages are kept whatever their age.
+    """
+    horizon = (now or timezone.now()) - timedelta(days=outbox_options()['RETENTION_DAYS'])
+    report = {'messages': 0, 'batches': 0}
+    sent = OutboxMessage.objects.filter(status=OutboxMessage.SENT, sent_at__lt=horizon)
+    targets = (
+        ('messages', OutboxMessage, sent, 'sent_at'),
+        # Ids follow created_at: the oldest reports come first on the primary key
+        ('batches', DeliveryBatch, DeliveryBatch.objects.filter(created_at__lt=horizon), 'id'),
+    )
+    for name, model, queryset, order in targets:
+        while True:
+            ids = list(queryset.order_by(order).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            report[name] += model.objects.filter(id__in=ids).delete()[0]
+            if len(ids) < chunk_size:
+                break
+    return report
+
+
+def outbox_stats() -> Dict[str, Any]:
+    """Backlog per status and channel, plus the age of the oldest due message"""
+    counts = defaultdict(dict)
+    rows = OutboxMessage.objects.exclude(status=OutboxMessage.SENT).values('status', 'channel').annotate(total=Count('id'))
+    for row in rows:
+        counts[row['status']][row['channel']] = row['total']
+
+    oldest = OutboxMessage.objects.filter(
+        status=OutboxMessage.PENDING, next_attempt_at__lte=timezone.now()
+    ).order_by('next_attempt_at').values_list('created_at', flat=True).first()
+
+    return {
+        'backlog': dict(counts),
+        'oldest_due_seconds': (timezone.now() - oldest).total_seconds() if oldest else 0,
+    }
@@ -0,0 +1,276 @@
+"""
+Delivery planner - Computes the UTC send instant of medication reminders
+
+Reminders are planned in batch: schedules are grouped by the user's timezone
+and converted through a per (timezone, date) offset table, so zoneinfo is only
+consulted a handful of times per timezone instead of once per row.
+"""
+import logging
+from bisect import bisect_right
+from functools import lru_cache
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from itertools import groupby, islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.core.sharding import across_shards, joins_users
+from apps.schedules.models import DailySchedule
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_DIGEST_TIME = time(8, 0)
+# Reminders still unsent this long after their send instant are given up (see outbox.py)
+REMINDER_LOOKBACK = timedelta(hours=6)
+
+
+@lru_cache(maxsize=None)
+def load_zone(tz_name: str) -> ZoneInfo:
+    """Load a timezone, falling back to the project timezone on bad names"""
+    try:
+        return ZoneInfo(tz_name or settings.TIME_ZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone '{tz_name}', using {settings.TIME_ZONE}")
+        return ZoneInfo(settings.TIME_ZONE)
+
+
+def _minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+class OffsetTable:
+    """
+    UTC offsets of one timezone over one local date.
+
+    Offsets are piecewise constant within a day (a DST transition changes them
+    at most once or twice), so the table stores (first_minute, offset) segments
+    found by probing every hour and bisecting the hour where the offset changes.
+    Non-existent local times (spring forward) resolve with the pre-transition
+    offset, i.e. they are shifted forward; ambiguous ones (fall back) resolve to
+    the first occurrence.
+    """
+
+    def __init__(self, tz_name: str, local_date: date):
+        self.tz = load_zone(tz_name)
+        self.local_date = local_date
+        self._midnight = datetime.combine(local_date, time.min)
+        self.starts: List[int] = [0]
+        self.offsets: List[int] = [self._offset_at(0)]
+        self._build()
+
+    def _offset_at(self, minute: int) -> int:
+        local = (self._midnight + timedelta(minutes=minute)).replace(tzinfo=self.tz)
+        return int(local.utcoffset().total_seconds() // 60)
+
+    def _build(self):
+        previous = self.offsets[0]
+        low = 0
+        for hour_end in range(60, MINUTES_PER_DAY + 1, 60):
+            probe = min(hour_end, MINUTES_PER_DAY - 1)
+            current = self._offset_at(probe)
+            if current != previous:
+                high = probe
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    if self._offset_at(middle) == previous:
+                        low = middle
+                    else:
+                        high = middle
+                self.starts.append(high)
+                self.offsets.append(current)
+                previous = current
+            low = probe
+
+    def offset_for(self, minute: int) -> int:
+        """UTC offset in minutes for a local minute of the day"""
+        return self.offsets[bisect_right(self.starts, minute) - 1]
+
+    def to_utc(self, minute: int) -> datetime:
+        """Convert a local minute of the day to an aware UTC datetime"""
+        naive = self._midnight + timedelta(minutes=minute - self.offset_for(minute))
+        return naive.replace(tzinfo=dt_timezone.utc)
+
+
+class DeliveryPlanner:
+    """
+    Plans reminder delivery honoring timezone, advance minutes and quiet hours
+    """
+
+    def __init__(self):
+        self._tables: Dict[Tuple[str, date], OffsetTable] = {}
+
+    def offset_table(self, tz_name: str, local_date: date) -> OffsetTable:
+        """Return the cached offset table for a timezone and local date"""
+        cache_key = (tz_name, local_date)
+        table = self._tables.get(cache_key)
+        if table is None:
+            table = self._tables[cache_key] = OffsetTable(tz_name, local_date)
+        return table
+
+    @staticmethod
+    def in_quiet_hours(minute: int, quiet_start: Optional[time], quiet_end: Optional[time]) -> bool:
+        """Check whether a local minute falls inside the quiet window"""
+        if quiet_start is None or quiet_end is None or quiet_start == quiet_end:
+            return False
+        start, end = _minute_of_day(quiet_start), _minute_of_day(quiet_end)
+        if start < end:
+            return start <= minute < end
+        return minute >= start or minute < end
+
+    def send_at(
+        self,
+        tz_name: str,
+        local_date: date,
+        scheduled_time: time,
+        advance_minutes: int = 0,
+        quiet_start: Optional[time] = None,
+        quiet_end: Optional[time] = None,
+    ) -> datetime:
+        """
+        Compute the UTC send instant of a single reminder.
+
+        A reminder that lands in quiet hours is held until the window ends,
+        unless that would be after the dose itself, in which case it is sent
+        at the dose time.
+        """
+        dose_minute = _minute_of_day(scheduled_time)
+        send_day_shift, send_minute = divmod(dose_minute - (advance_minutes or 0), MINUTES_PER_DAY)
+        send_date = local_date + timedelta(days=send_day_shift)
+
+        if self.in_quiet_hours(send_minute, quiet_start, quiet_end):
+            release_minute = _minute_of_day(quiet_end)
+            release_date = send_date
+            if release_minute <= send_minute:
+                release_date += timedelta(days=1)
+            if (release_date, release_minute) <= (local_date, dose_minute):
+                send_date, send_minute = release_date, release_minute
+            else:
+                send_date, send_minute = local_date, dose_minute
+
+        return self.offset_table(tz_name, send_date).to_utc(send_minute)
+
+    def digest_send_at(
+        self,
+        tz_name: str,
+        local_date: date,
+        preferred_time: Optional[time] = None,
+    ) -> datetime:
+        """Compute the UTC instant of a user's daily digest"""
+        preferred_time = preferred_time or DEFAULT_DIGEST_TIME
+        return self.offset_table(tz_name, local_date).to_utc(_minute_of_day(preferred_time))
+
+    def plan(self, schedules: Optional[QuerySet] = None, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Compute and store send_at for pending schedules in batch.
+
+        Rows are read as tuples ordered by timezone so every timezone group
+        shares its offset tables, then written back with bulk_update. Each
+        user shard is planned in turn.
+        """
+        if schedules is None:
+            schedules = DailySchedule.objects.filter(
+                notification_sent=False, taken=False, skipped=False
+            )
+
+        report = {'planned': 0, 'unchanged': 0, 'timezones': 0}
+        timezones = set()
+        for shard_schedules in across_shards(schedules):
+            pending: List[DailySchedule] = []
+            rows = self._schedule_rows(shard_schedules, batch_size)
+            for tz_name, group in groupby(rows, key=lambda row: row[4]):
+                timezones.add(tz_name)
+                for pk, local_date, scheduled_time, current, _tz, advance, quiet_start, quiet_end in group:
+                    planned = self.send_at(
+                        tz_name, local_date, scheduled_time, advance or 0, quiet_start, quiet_end
+                    )
+                    if planned == current:
+                        report['unchanged'] += 1
+                        continue
+                    pending.append(DailySchedule(id=pk, send_at=planned))
+                    if len(pending) >= batch_size:
+                        report['planned'] += self._flush(pending, batch_size, shard_schedules.db)
+
+            report['planned'] += self._flush(pending, batch_size, shard_schedules.db)
+        # Shard rows come back grouped per chunk: the same zone shows up in several groups
+        report['timezones'] = len(timezones)
+        return report
+
+    @staticmethod
+    def _schedule_rows(schedules: QuerySet, batch_size: int) -> Iterable[Tuple]:
+        """
+        (id, date, time, send_at, timezone, advance, quiet start, quiet end)
+        rows, grouped by timezone.
+
+        Next to the users table this is one joined query. On a shard the
+        user columns are read from the default database per chunk, and rows
+        are grouped by timezone within each chunk.
+        """
+        user_columns = (
+            'timezone', 'profile__reminder_advance_minutes',
+            'profile__quiet_hours_start', 'profile__quiet_hours_end',
+        )
+        if joins_users(schedules.db):
+            yield from schedules.order_by('user__timezone').values_list(
+                'id', 'date', 'scheduled_time', 'send_at', *(f'user__{column}' for column in user_columns),
+            ).iterator(chunk_size=batch_size)
+            return
+
+        from apps.users.models import User
+
+        rows = schedules.order_by('user_id').values_list('id', 'date', 'scheduled_time', 'send_at', 'user_id')
+        iterator = rows.iterator(chunk_size=batch_size)
+        while True:
+            chunk = list(islice(iterator, batch_size))
+            if not chunk:
+                break
+            users = {
+                user_id: values for user_id, *values in
+                User.objects.filter(id__in={row[4] for row in chunk}).values_list('id', *user_columns)
+            }
+            joined = [row[:4] + tuple(users.get(row[4], (None, None, None, None))) for row in chunk]
+            joined.sort(key=lambda row: row[4] or '')
+            yield from joined
+
+    @staticmethod
+    def _flush(pending: List[DailySchedule], batch_size: int, using: str) -> int:
+        if not pending:
+            return 0
+        count = len(pending)
+        DailySchedule.objects.using(using).bulk_update(pending, ['send_at'], batch_size=batch_size)
+        pending.clear()
+        return count
+
+
+def plan_reminders(dates: Iterable[date], batch_size: int = 1000) -> Dict[str, Any]:
+    """Plan every pending reminder scheduled on the given dates"""
+    schedules = DailySchedule.objects.filter(
+        date__in=list(dates), notification_sent=False, taken=False, skipped=False
+    )
+    return DeliveryPlanner().plan(schedules, batch_size=batch_size)
+
+
+def due_reminders(now: Optional[datetime] = None, lookback: timedelta = REMINDER_LOOKBACK) -> QuerySet:
+    """
+    Reminders whose send instant has passed and that were not sent yet.
+
+    Served by the (notification_sent, send_at) index as a single range scan.
+    """
+    now = now or timezone.now()
+    return DailySchedule.objects.filter(
+        notification_sent=False,
+        send_at__gt=now - lookback,
+        send_at__lte=now,
+    ).order_by('send_at')
+
+
+def expired_reminders(now: Optional[datetime] = None, lookback: timedelta = REMINDER_LOOKBACK) -> QuerySet:
+    """Unsent reminders whose send instant is further back than lookback - too late to send"""
+    now = now or timezone.now()
+    return DailySchedule.objects.filter(
+        notification_sent=False,
+        send_at__lte=now - lookback,
+    ).order_by('send_at')
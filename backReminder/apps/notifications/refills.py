@@ -0,0 +1,97 @@
+"""
+Refill alerts - Bulk low stock scan creating 'refill' notifications
+
+Each shard is scanned through the partial index medication_low_stock_idx
+(active medications with tracked stock). A medication is notified once
+per threshold crossing: the notification and the low_stock_notified_at
+mark are written in the same transaction, and the mark is only cleared
+once stock is back above the threshold, which re-arms the alert.
+
+A batch is claimed with a conditional UPDATE that only sets the mark on
+rows that are still unmarked and low, and only the rows stamped by this
+run are notified. Overlapping runs therefore never notify the same
+crossing twice, even where SKIP LOCKED is not available. Medication.save()
+writes every column, so a full save of a copy loaded before the scan
+marked it still clears the mark; that medication is notified once more
+if its stock is still low.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.sharding import across_shards
+from apps.medications.models import Medication
+from apps.users.models import User
+
+from .message_templates import registry
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def _languages(user_ids) -> Dict[int, str]:
+    return dict(User.objects.filter(pk__in=user_ids).values_list('pk', 'language'))
+
+
+def _notify_batch(medications, alias: str, batch_size: int, now: datetime) -> Optional[int]:
+    """Claim, notify and mark one batch of pending low stock medications; None once none are left"""
+    pending = medications.low_stock().filter(low_stock_notified_at__isnull=True)
+    with transaction.atomic(using=alias):
+        ids = list(
+            pending.select_for_update(skip_locked=True).order_by()
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return None
+        # Conditional claim: rows another run marked, or refilled, since the read are left alone
+        pending.filter(pk__in=ids).update(low_stock_notified_at=now)
+        rows = list(
+            Medication.objects.using(alias).filter(pk__in=ids, low_stock_notified_at=now)
+            .values('id', 'user_id', 'name', 'remaining_pills')
+        )
+        if not rows:
+            return 0
+
+        by_language = defaultdict(list)
+        languages = _languages({row['user_id'] for row in rows})
+        for row in rows:
+            by_language[languages.get(row['user_id'])].append(row)
+        notifications = []
+        for language, group in by_language.items():
+            contexts = [{'medication': row['name'], 'remaining': row['remaining_pills']} for row in group]
+            for row, (title, message) in zip(group, registry.render_many('refill', language, contexts)):
+                notifications.append(Notification(
+                    user_id=row['user_id'], title=title, message=message, notification_type='refill'
+                ))
+        Notification.objects.using(alias).bulk_create(notifications)
+    return len(rows)
+
+
+def notify_low_stock(batch_size: int = 1000, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Create a refill notification for every medication that reached its low stock threshold.
+
+    Returns how many medications were notified and how many alerts were
+    re-armed by a refill.
+    """
+    now = now or timezone.now()
+    report = {'notified': 0, 'rearmed': 0}
+    for medications in across_shards(Medication.objects.all()):
+        alias = medications.db
+        # Stock back above the threshold: the next crossing notifies again
+        report['rearmed'] += (
+            medications.tracked_stock()
+            .filter(stock_margin__gt=0, low_stock_notified_at__isnull=False)
+            .update(low_stock_notified_at=None)
+        )
+        while True:
+            notified = _notify_batch(medications, alias, batch_size, now)
+            if notified is None:
+                break
+            report['notified'] += notified
+    logger.info(f"Low stock scan: {report['notified']} refill notifications, {report['rearmed']} alerts re-armed")
+    return report
@@ -0,0 +1,326 @@
+"""
+Delivery router - Fans reminders out to every enabled channel
+
+Each channel runs on its own bounded thread pool with its own timeout and
+circuit breaker, so a slow or failing provider only exhausts its own
+workers and never stalls delivery on the other channels.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from apps.schedules.models import DailySchedule
+from .channels import CHANNEL_CLASSES, WORKER_ID, Channel
+
+logger = logging.getLogger(__name__)
+
+METRICS_CACHE_PREFIX = 'notifications:router_metrics'
+METRICS_CACHE_TIMEOUT = 10 * 60
+
+DEFAULT_CHANNEL_OPTIONS = {
+    'MAX_WORKERS': 4,
+    'MAX_PENDING': 16,
+    'TIMEOUT': 30,
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 60,
+}
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are short-circuited for reset_timeout seconds; then a single trial call
+    is let through and its outcome closes or re-opens the circuit.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go through right now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class ChannelMetrics:
+    """Rolling latency and outcome counters of one channel"""
+
+    def __init__(self, window: int = 500):
+        self.latencies_ms = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.counters = {
+            'batches': 0, 'messages_sent': 0, 'messages_failed': 0,
+            'errors': 0, 'timeouts': 0, 'rejected': 0, 'short_circuited': 0, 'expired': 0,
+        }
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, latency_ms: Optional[float] = None, sent: int = 0, failed: int = 0):
+        with self._lock:
+            if outcome in ('rejected', 'short_circuited', 'expired'):
+                self.counters[outcome] += 1
+                return
+            self.counters['batches'] += 1
+            self.counters['messages_sent'] += sent
+            self.counters['messages_failed'] += failed
+            if outcome in ('errors', 'timeouts'):
+                self.counters[outcome] += 1
+            self.outcomes.append(outcome == 'ok' and not failed)
+            if latency_ms is not None:
+                self.latencies_ms.append(latency_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies_ms)
+            outcomes = list(self.outcomes)
+            counters = dict(self.counters)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 2)
+
+        return {
+            **counters,
+            'latency_ms': {
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(latencies[-1], 2) if latencies else None,
+            },
+            'error_rate': round(1 - sum(outcomes) / len(outcomes), 4) if outcomes else 0.0,
+        }
+
+
+class ChannelLane:
+    """
+    One channel's isolated lane: bounded pool, timeout, breaker and metrics.
+
+    In-flight work is capped at MAX_WORKERS running plus MAX_PENDING queued
+    batches; anything beyond that is rejected immediately instead of
+    queueing behind a slow provider. TIMEOUT counts from when a worker picks
+    a batch up; a batch still queued TIMEOUT seconds after its submission is
+    cancelled unsent.
+    """
+
+    def __init__(self, channel: Channel, options: Dict[str, Any]):
+        self.channel = channel
+        self.name = channel.name
+        self.timeout = options['TIMEOUT']
+        self.max_workers = options['MAX_WORKERS']
+        self.executor = ThreadPoolExecutor(
+            max_workers=options['MAX_WORKERS'],
+            thread_name_prefix=f'delivery-{self.name}',
+        )
+        self.slots = threading.BoundedSemaphore(options['MAX_WORKERS'] + options['MAX_PENDING'])
+        self.breaker = CircuitBreaker(options['FAILURE_THRESHOLD'], options['RESET_TIMEOUT'])
+        self.metrics = ChannelMetrics()
+
+    def _run(self, method: str, items: List[Any], started: Dict[str, Any]) -> Dict[str, Any]:
+        started['at'] = time.monotonic()
+        started['event'].set()
+        try:
+            return getattr(self.channel, method)(items)
+        finally:
+            # Worker threads own their DB connection; don't leak it
+            connection.close()
+
+    def submit(self, items: List[Any], method: str = 'send_reminders') -> Optional[Future]:
+        """
+        Queue a batch on this lane, or return None if it was refused.
+
+        method names the channel method that sends the batch: send_reminders
+        for schedules, send_payloads for stored outbox payloads.
+        """
+        if not self.breaker.allow():
+            self.metrics.record('short_circuited')
+            return None
+        if not self.slots.acquire(blocking=False):
+            self.metrics.record('rejected')
+            return None
+
+        # Set by the worker when it picks the batch up
+        started = {'event': threading.Event(), 'at': None}
+        future = self.executor.submit(self._run, method, items, started)
+        future.add_done_callback(lambda _future: self.slots.release())
+        future.started = started
+        future.queue_deadline = time.monotonic() + self.timeout
+        return future
+
+    def collect(self, future: Future) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a batch and record its outcome.
+
+        Returns the channel summary, or None if the batch was cancelled
+        (future.cancelled(): it never ran, so the breaker is not charged),
+        timed out (future.done() is False: it keeps running) or raised.
+        """
+        started = future.started
+        if not started['event'].wait(max(0.0, future.queue_deadline - time.monotonic())) and future.cancel():
+            self.metrics.record('expired')
+            logger.warning(f"{self.name} batch cancelled after waiting {self.timeout}s for a worker")
+            return None
+        started['event'].wait()
+
+        try:
+            summary = future.result(timeout=max(0.0, started['at'] + self.timeout - time.monotonic()))
+        except FutureTimeout:
+            self.breaker.record_failure()
+            self.metrics.record('timeouts', (time.monotonic() - started['at']) * 1000)
+            logger.warning(f"{self.name} delivery timed out after {self.timeout}s")
+            return None
+        except Exception as e:
+            self.breaker.record_failure()
+            self.metrics.record('errors', (time.monotonic() - started['at']) * 1000)
+            logger.error(f"{self.name} delivery failed: {e}")
+            return None
+
+        latency_ms = (time.monotonic() - started['at']) * 1000
+        if summary['sent'] or not summary['failed']:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        self.metrics.record('ok', latency_ms, sent=len(summary['sent']), failed=summary['failed'])
+        return summary
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'circuit': self.breaker.state,
+            'max_workers': self.max_workers,
+            'timeout': self.timeout,
+            **self.metrics.snapshot(),
+        }
+
+
+class DeliveryRouter:
+    """
+    Routes each reminder to the channels its user enabled
+    """
+
+    def __init__(self, channels: Optional[Dict[str, Channel]] = None):
+        configured = getattr(settings, 'NOTIFICATION_CHANNELS', {})
+        if channels is None:
+            channels = {name: channel_class() for name, channel_class in CHANNEL_CLASSES.items()}
+        self.lanes = {
+            name: ChannelLane(channel, {**DEFAULT_CHANNEL_OPTIONS, **configured.get(name, {})})
+            for name, channel in channels.items()
+        }
+
+    def route(self, schedules: Sequence[DailySchedule]) -> Dict[str, List[DailySchedule]]:
+        """Split reminders per channel according to the users' preferences"""
+        routed = {name: [] for name in self.lanes}
+        for schedule in schedules:
+            for name, lane in self.lanes.items():
+                if lane.channel.accepts(schedule.user):
+                    routed[name].append(schedule)
+        return routed
+
+    def dispatch(self, schedules: Sequence[DailySchedule]) -> Dict[str, Any]:
+        """
+        Deliver reminders on every enabled channel concurrently.
+
+        Returns the schedule ids delivered per channel. Batches that time out
+        keep running on their lane but no longer hold up this call; batches
+        that never got a worker are cancelled and left out.
+        """
+        submitted = []
+        for name, channel_schedules in self.route(schedules).items():
+            lane = self.lanes[name]
+            for start in range(0, len(channel_schedules), lane.channel.batch_size):
+                future = lane.submit(channel_schedules[start:start + lane.channel.batch_size])
+                if future is not None:
+                    submitted.append((lane, future))
+
+        delivered = {name: [] for name in self.lanes}
+        for lane, future in submitted:
+            summary = lane.collect(future)
+            if summary:
+                delivered[lane.name].extend(summary['sent'])
+
+        self.publish_metrics()
+        return delivered
+
+    def metrics(self) -> Dict[str, Any]:
+        return {name: lane.snapshot() for name, lane in self.lanes.items()}
+
+    def publish_metrics(self):
+        """Share this worker's channel metrics through the cache"""
+        try:
+            workers = cache.get(f'{METRICS_CACHE_PREFIX}:workers') or []
+            if WORKER_ID not in workers:
+                cache.set(f'{METRICS_CACHE_PREFIX}:workers', (workers + [WORKER_ID])[-50:], None)
+            cache.set(
+                f'{METRICS_CACHE_PREFIX}:{WORKER_ID}',
+                {'updated_at': timezone.now().isoformat(), 'channels': self.metrics()},
+                METRICS_CACHE_TIMEOUT,
+            )
+        except Exception as e:
+            logger.warning(f"Could not publish delivery metrics: {e}")
+
+    def shutdown(self):
+        for lane in self.lanes.values():
+            lane.executor.shutdown(wait=False)
+
+
+def get_published_metrics() -> Dict[str, Any]:
+    """Channel metrics published by every delivery worker"""
+    workers = cache.get(f'{METRICS_CACHE_PREFIX}:workers') or []
+    entries = cache.get_many([f'{METRICS_CACHE_PREFIX}:{worker}' for worker in workers])
+    return {
+        worker: entries[f'{METRICS_CACHE_PREFIX}:{worker}']
+        for worker in workers
+        if f'{METRICS_CACHE_PREFIX}:{worker}' in entries
+    }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> DeliveryRouter:
+    """Process-wide router so lanes, breakers and metrics outlive a single run"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = DeliveryRouter()
+        return _router
+
@@ -0,0 +1,142 @@
+"""
+Celery tasks for reminder delivery
+"""
+from celery import shared_task
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from .planner import plan_reminders
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True)
+def plan_reminders_task(self, days=2):
+    """
+    Compute send_at for pending reminders of the next days
+    """
+    try:
+        today = timezone.localdate()
+        # Include yesterday so late-night doses of far-west timezones are covered
+        dates = [today + timedelta(days=offset) for offset in range(-1, days)]
+        report = plan_reminders(dates)
+        logger.info(f"Reminder planning completed: {report['planned']} planned, {report['timezones']} timezones")
+        return {
+            'status': 'success',
+            **report
+        }
+
+    except Exception as exc:
+        logger.error(f"Reminder planning task failed: {exc}")
+        raise self.retry(exc=exc, countdown=60, max_retries=3)
+
+
+@shared_task(bind=True)
+def dispatch_reminders_task(self):
+    """
+    Move due reminders into the delivery outbox
+    """
+    try:
+        from .outbox import enqueue_due_reminders
+        report = enqueue_due_reminders()
+        logger.info(
+            f"Reminder dispatch: {report['enqueued']} messages enqueued for {report['due']} reminders, "
+            f"{report['expired']} expired unsent"
+        )
+        return {
+            'status': 'success',
+            **report
+        }
+
+    except Exception as exc:
+        logger.error(f"Reminder dispatch task failed: {exc}")
+        raise self.retry(exc=exc, countdown=60, max_retries=3)
+
+
+@shared_task
+def relay_outbox_task(max_batches=20):
+    """
+    Deliver due outbox messages, retrying failures with backoff
+    """
+    try:
+        from .outbox import relay_outbox
+        report = relay_outbox(max_batches=max_batches)
+        if report['claimed']:
+            logger.info(
+                f"Outbox relay: {report['sent']}/{report['claimed']} sent, "
+                f"{report['retried']} retried, {report['dead']} dead"
+            )
+        return {
+            'status': 'success',
+            **report
+        }
+
+    except Exception as exc:
+        logger.error(f"Outbox relay task failed: {exc}")
+        return {
+            'status': 'error',
+            'error': str(exc)
+        }
+
+
+@shared_task
+def prune_outbox_task(chunk_size=1000):
+    """
+    Delete sent outbox messages and delivery batch reports past their retention
+    """
+    try:
+        from .outbox import prune_outbox
+        report = prune_outbox(chunk_size=chunk_size)
+        logger.info(f"Outbox pruning: {report['messages']} sent messages and {report['batches']} batch reports deleted")
+        return {
+            'status': 'success',
+            **report
+        }
+
+    except Exception as exc:
+        logger.error(f"Outbox pruning task failed: {exc}")
+        return {
+            'status': 'error',
+            'error': str(exc)
+        }
+
+
+@shared_task
+def send_email_digests_task():
+    """
+    Email daily digests whose preferred time passed since the last run
+    """
+    try:
+        from .channels import send_due_email_digests
+        report = send_due_email_digests()
+        logger.info(f"Email digests: {report['sent']}/{report['due']} sent")
+        return {
+            'status': 'success',
+            **report
+        }
+
+    except Exception as exc:
+        logger.error(f"Email digest task failed: {exc}")
+        return {
+            'status': 'error',
+            'error': str(exc)
+        }
+
+
+@shared_task(bind=True)
+def notify_low_stock_task(self):
+    """
+    Create refill notifications for medications that reached their low stock threshold
+    """
+    try:
+        from .refills import notify_low_stock
+        report = notify_low_stock()
+        return {
+            'status': 'success',
+            **report
+        }
+
+    except Exception as exc:
+        logger.error(f"Low stock scan task failed: {exc}")
+        raise self.retry(exc=exc, countdown=60, max_retries=3)
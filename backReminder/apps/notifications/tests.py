@@ -0,0 +1,107 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.medications.models import Medication
+from apps.schedules.models import DailySchedule
+from apps.users.models import User
+
+from .channels import DIGEST_WATERMARK_KEY, send_due_email_digests
+from .models import Notification
+from .outbox import enqueue_due_reminders
+from .refills import notify_low_stock
+
+
+class EmailDigestTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='digest', email='digest@example.com', password='x', timezone='UTC', email_notifications=True
+        )
+        medication = Medication.objects.create(user=self.user, name='Aspirin', dosage='1 tablet', times=[time(9, 0)])
+        self.day = date(2026, 3, 2)
+        DailySchedule.objects.create(user=self.user, medication=medication, date=self.day, scheduled_time=time(9, 0))
+
+    def at(self, hour: int, minute: int = 0) -> datetime:
+        return datetime(2026, 3, 2, hour, minute, tzinfo=dt_timezone.utc)
+
+    def test_digest_is_sent_once(self):
+        """Repeated and overlapping runs (manual, second beat) don't email twice"""
+        first = send_due_email_digests(now=self.at(8, 5))
+        second = send_due_email_digests(now=self.at(8, 10), window=timedelta(hours=1))
+
+        self.assertEqual((first['sent'], second['sent']), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.last_digest_date, self.day)
+
+    def test_late_run_catches_up(self):
+        """A run after an outage covers the time since the previous run, not just the last hour"""
+        cache.set(DIGEST_WATERMARK_KEY, self.at(7, 0), None)
+
+        report = send_due_email_digests(now=self.at(10, 30))
+
+        self.assertEqual(report['sent'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class ExpiredReminderTests(TestCase):
+
+    def test_reminders_past_the_lookback_are_expired_and_counted(self):
+        """A reminder left unsent for hours (worker outage) is reported, not silently skipped forever"""
+        user = User.objects.create_user(username='late', email='late@example.com', password='x')
+        medication = Medication.objects.create(user=user, name='Aspirin', dosage='1 tablet', times=[time(9, 0)])
+        now = datetime(2026, 3, 2, 18, 0, tzinfo=dt_timezone.utc)
+        stale = DailySchedule.objects.create(
+            user=user, medication=medication, date=date(2026, 3, 2), scheduled_time=time(9, 0),
+            send_at=now - timedelta(hours=9),
+        )
+
+        report = enqueue_due_reminders(now=now)
+
+        self.assertEqual((report['expired'], report['due']), (1, 0))
+        stale.refresh_from_db()
+        self.assertTrue(stale.notification_sent)
+        self.assertIsNone(stale.notification_sent_at)
+        self.assertEqual(enqueue_due_reminders(now=now)['expired'], 0)
+
+
+class RefillAlertTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='refill', email='refill@example.com', password='x')
+        self.medication = Medication.objects.create(
+            user=self.user, name='Aspirin', dosage='1 tablet', times=[time(9, 0)],
+            total_pills=30, remaining_pills=3, low_stock_alert=5,
+        )
+
+    def refill_notifications(self) -> int:
+        return Notification.objects.filter(user=self.user, notification_type='refill').count()
+
+    def test_one_notification_per_crossing(self):
+        """Later scans, and stock dropping further, don't notify again"""
+        first = notify_low_stock()
+        Medication.objects.filter(pk=self.medication.pk).update(remaining_pills=1)
+        second = notify_low_stock()
+
+        self.assertEqual((first['notified'], second['notified']), (1, 0))
+        self.assertEqual(self.refill_notifications(), 1)
+        self.medication.refresh_from_db()
+        self.assertIsNotNone(self.medication.low_stock_notified_at)
+
+    def test_refill_rearms_the_alert(self):
+        notify_low_stock()
+        Medication.objects.filter(pk=self.medication.pk).update(remaining_pills=30)
+
+        rearmed = notify_low_stock()
+
+        self.assertEqual((rearmed['notified'], rearmed['rearmed']), (0, 1))
+        self.medication.refresh_from_db()
+        self.assertIsNone(self.medication.low_stock_notified_at)
+
+        Medication.objects.filter(pk=self.medication.pk).update(remaining_pills=2)
+        self.assertEqual(notify_low_stock()['notified'], 1)
+        self.assertEqual(self.refill_notifications(), 2)
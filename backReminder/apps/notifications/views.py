@@ -9,17 +9,20 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
 
+from apps.core.mixins import ConditionalGetMixin, ReplicaReadMixin
+
 from .models import Notification
 from .serializers import NotificationSerializer
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for managing notifications"""
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    replica_actions = ('list', 'retrieve', 'unread', 'unread_count')
     
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user)
+        return Notification.objects.for_user(self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -34,8 +37,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def unread(self, request):
         """Get all unread notifications"""
         unread_notifications = self.get_queryset().filter(is_read=False)
-        serializer = self.get_serializer(unread_notifications, many=True)
-        return Response(serializer.data)
+        return self.conditional_response(
+            unread_notifications, lambda: Response(self.get_serializer(unread_notifications, many=True).data)
+        )
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
@@ -53,9 +57,11 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read"""
+        now = timezone.now()
         updated = self.get_queryset().filter(is_read=False).update(
             is_read=True,
-            read_at=timezone.now()
+            read_at=now,
+            updated_at=now
         )
         return Response({
             'updated_count': updated,
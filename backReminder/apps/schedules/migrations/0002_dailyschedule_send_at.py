@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyschedule',
+            name='send_at',
+            field=models.DateTimeField(blank=True, help_text='UTC instant the reminder is due, computed by the delivery planner', null=True, verbose_name='Send at'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyschedule',
+            index=models.Index(fields=['notification_sent', 'send_at'], name='daily_sched_notific_535dbd_idx'),
+        ),
+    ]
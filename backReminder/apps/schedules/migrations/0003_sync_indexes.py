@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0002_dailyschedule_send_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyschedule',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='daily_sched_user_id_4afd54_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicationdose',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='medication__user_id_a4ac76_idx'),
+        ),
+    ]
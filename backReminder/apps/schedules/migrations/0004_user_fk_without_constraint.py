@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('schedules', '0003_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyschedule',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_schedules', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='medicationdose',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='medication_doses', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='weeklyprogress',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='weekly_progress', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
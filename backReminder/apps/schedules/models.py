@@ -5,6 +5,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from apps.core.models import BaseModel
+from apps.core.sharding import UserShardedManager
 
 
 class DailySchedule(BaseModel):
@@ -14,7 +15,8 @@ class DailySchedule(BaseModel):
     user = models.ForeignKey(
         'users.User',
         on_delete=models.CASCADE,
-        related_name='daily_schedules'
+        related_name='daily_schedules',
+        db_constraint=False
     )
     medication = models.ForeignKey(
         'medications.Medication',
@@ -48,6 +50,14 @@ class DailySchedule(BaseModel):
     # Notification tracking
     notification_sent = models.BooleanField(_('Notification sent'), default=False)
     notification_sent_at = models.DateTimeField(_('Notification sent at'), null=True, blank=True)
+    send_at = models.DateTimeField(
+        _('Send at'),
+        null=True,
+        blank=True,
+        help_text=_('UTC instant the reminder is due, computed by the delivery planner')
+    )
+    
+    objects = UserShardedManager()
     
     class Meta:
         db_table = 'daily_schedules'
@@ -58,6 +68,8 @@ class DailySchedule(BaseModel):
             models.Index(fields=['user', 'date']),
             models.Index(fields=['user', 'date', 'taken']),
             models.Index(fields=['medication', 'date']),
+            models.Index(fields=['notification_sent', 'send_at']),
+            models.Index(fields=['user', 'updated_at', 'id']),
         ]
         unique_together = ['user', 'medication', 'date', 'scheduled_time']
     
@@ -118,7 +130,8 @@ class WeeklyProgress(BaseModel):
     user = models.ForeignKey(
         'users.User',
         on_delete=models.CASCADE,
-        related_name='weekly_progress'
+        related_name='weekly_progress',
+        db_constraint=False
     )
     
     # Week information
@@ -139,6 +152,8 @@ class WeeklyProgress(BaseModel):
         default=0.00
     )
     
+    objects = UserShardedManager()
+    
     class Meta:
         db_table = 'weekly_progress'
         verbose_name = _('Weekly Progress')
@@ -165,7 +180,8 @@ class MedicationDose(BaseModel):
     user = models.ForeignKey(
         'users.User',
         on_delete=models.CASCADE,
-        related_name='medication_doses'
+        related_name='medication_doses',
+        db_constraint=False
     )
     medication = models.ForeignKey(
         'medications.Medication',
@@ -206,6 +222,8 @@ class MedicationDose(BaseModel):
     )
     notes = models.TextField(_('Notes'), blank=True)
     
+    objects = UserShardedManager()
+    
     class Meta:
         db_table = 'medication_doses'
         verbose_name = _('Medication Dose')
@@ -214,6 +232,7 @@ class MedicationDose(BaseModel):
         indexes = [
             models.Index(fields=['user', 'medication']),
             models.Index(fields=['user', 'actual_time']),
+            models.Index(fields=['user', 'updated_at', 'id']),
         ]
     
     def __str__(self):
@@ -11,30 +11,32 @@ from rest_framework.views import APIView
 from django.utils import timezone
 from datetime import date
 
+from apps.core.mixins import ConditionalGetMixin, ReplicaReadMixin
+
 from .models import DailySchedule, WeeklyProgress, MedicationDose
 from .serializers import DailyScheduleSerializer, WeeklyProgressSerializer, MedicationDoseSerializer
 
 
-class DailyScheduleViewSet(viewsets.ModelViewSet):
+class DailyScheduleViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for managing daily schedules"""
     serializer_class = DailyScheduleSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return DailySchedule.objects.filter(user=self.request.user)
+        return DailySchedule.objects.for_user(self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class TodayScheduleView(APIView):
+class TodayScheduleView(ReplicaReadMixin, APIView):
     """Get today's medication schedule"""
     permission_classes = [IsAuthenticated]
+    replica_actions = None
     
     def get(self, request):
         today = date.today()
-        schedules = DailySchedule.objects.filter(
-            user=request.user,
+        schedules = DailySchedule.objects.for_user(request.user).filter(
             date=today
         )
         serializer = DailyScheduleSerializer(schedules, many=True)
@@ -45,15 +47,16 @@ class TodayScheduleView(APIView):
         })
 
 
-class ProgressView(APIView):
+class ProgressView(ReplicaReadMixin, APIView):
     """Get user's medication adherence progress"""
     permission_classes = [IsAuthenticated]
+    replica_actions = None
     
     def get(self, request):
         try:
             # Get current week's progress
-            progress = WeeklyProgress.objects.filter(
-                user=request.user
+            progress = WeeklyProgress.objects.for_user(
+                request.user
             ).order_by('-week_start_date').first()
             
             if progress:
@@ -0,0 +1,69 @@
+"""
+User activity tracking - Buffered last_active updates
+
+Request users come from the authentication cache, so their last_active
+can be minutes old. The last recorded value is therefore kept in the
+shared cache for LAST_ACTIVE_GRANULARITY seconds: the first request after
+it expires records a new one, every other request reads it back.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.buffers import WriteBuffer
+
+logger = logging.getLogger(__name__)
+
+LAST_ACTIVE_CACHE_PREFIX = 'activity:last_active'
+
+
+class LastActiveBuffer(WriteBuffer):
+    """
+    Coalesces last_active timestamps per user and writes them with one
+    bulk update per flush instead of one UPDATE per request
+    """
+
+    def merge(self, current: datetime, value: datetime) -> datetime:
+        return max(current, value)
+
+    def write(self, entries: Dict[int, datetime]):
+        from .models import User
+
+        User.objects.bulk_update(
+            [User(id=user_id, last_active=last_active) for user_id, last_active in entries.items()],
+            ['last_active'],
+            batch_size=500,
+        )
+
+
+def last_active_granularity() -> timedelta:
+    """Minimum age of the stored last_active before it is refreshed"""
+    return timedelta(seconds=getattr(settings, 'LAST_ACTIVE_GRANULARITY', 300))
+
+
+activity_buffer = LastActiveBuffer(
+    flush_interval=getattr(settings, 'LAST_ACTIVE_FLUSH_INTERVAL', 15),
+    max_size=getattr(settings, 'LAST_ACTIVE_BUFFER_SIZE', 1000),
+)
+
+
+def record_activity(user_id, now: datetime) -> datetime:
+    """
+    Buffer now as the user's last_active unless a value was recorded within
+    the granularity; returns the recorded value in effect.
+    """
+    key = f'{LAST_ACTIVE_CACHE_PREFIX}:{user_id}'
+    try:
+        # add() is atomic: one request per granularity window wins it
+        if not cache.add(key, now, timeout=last_active_granularity().total_seconds()):
+            recorded = cache.get(key)
+            if recorded is not None:
+                return recorded
+            cache.set(key, now, timeout=last_active_granularity().total_seconds())
+    except Exception as e:
+        logger.warning(f"Activity cache unavailable: {e}")
+    activity_buffer.add(user_id, now)
+    return now
@@ -6,6 +6,7 @@ Copyright (C) 2025 Francisco [Tu Apellido/Empresa]. All Rights Reserved.
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
+from apps.core.pagination import EstimatedCountPaginator
 from .models import User, UserProfile
 
 
@@ -15,9 +16,12 @@ class UserAdmin(BaseUserAdmin):
     
     list_display = ('email', 'first_name', 'last_name', 'phone_number', 'is_staff', 'is_active', 'date_joined')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'date_joined', 'date_of_birth')
-    search_fields = ('email', 'first_name', 'last_name', 'phone_number')
+    # Prefix/exact lookups served by the upper() indexes of users 0004
+    search_fields = ('^email', '^first_name', '^last_name', '=phone_number')
     ordering = ('email',)
     filter_horizontal = ('groups', 'user_permissions',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -46,7 +50,11 @@ class UserProfileAdmin(admin.ModelAdmin):
     
     list_display = ('user', 'weight', 'height', 'blood_type', 'emergency_contact_name')
     list_filter = ('blood_type',)
-    search_fields = ('user__email', 'user__first_name', 'user__last_name', 'emergency_contact_name')
+    search_fields = ('^user__email',)
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         (_('User Information'), {
@@ -62,6 +70,9 @@ class UserProfileAdmin(admin.ModelAdmin):
             'fields': ('medical_conditions', 'allergies')
         }),
         (_('Preferences'), {
-            'fields': ('preferred_notification_time', 'reminder_advance_minutes')
+            'fields': (
+                'preferred_notification_time', 'reminder_advance_minutes',
+                'quiet_hours_start', 'quiet_hours_end'
+            )
         }),
     )
@@ -0,0 +1,20 @@
+"""
+Password hashing workers for bulk imports
+
+Kept free of model imports so spawned pool processes can load it before
+Django is set up.
+"""
+import os
+from typing import List, Optional
+
+
+def init_worker(settings_module: str):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords: List[Optional[str]]) -> List[str]:
+    """Hash a batch of raw passwords; None gives an unusable password"""
+    from django.contrib.auth.hashers import make_password
+    return [make_password(password) for password in passwords]
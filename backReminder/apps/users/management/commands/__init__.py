@@ -0,0 +1 @@
+# empty file
@@ -0,0 +1,59 @@
+"""
+Management command to bulk import users and profiles from CSV or JSONL
+"""
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from apps.users.bulk import FORMATS, detect_format, import_users
+
+
+class Command(BaseCommand):
+    help = 'Import users from a CSV or JSONL file, hashing passwords in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            type=str,
+            help="File to import, or '-' for stdin"
+        )
+        parser.add_argument(
+            '--format',
+            type=str,
+            choices=FORMATS,
+            help='Input format (guessed from the file extension by default)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows validated, hashed and inserted per chunk'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Password hashing processes (defaults to the CPU count)'
+        )
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        self.stdout.write(f'📥 Importing users from {options["path"]} ({fmt})...')
+
+        try:
+            if options['path'] == '-':
+                report = import_users(sys.stdin, fmt, options['chunk_size'], options['workers'])
+            else:
+                with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                    report = import_users(stream, fmt, options['chunk_size'], options['workers'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Import failed: {e}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Created {report["created"]}/{report["rows"]} users in {report["seconds"]}s '
+                f'({report["users_per_minute"]:,} users/min)'
+            )
+        )
+        self.stdout.write(f'   Skipped (already exist or duplicated): {report["skipped"]}')
+        if report['failed']:
+            self.stdout.write(self.style.WARNING(f'⚠️  {report["failed"]} rows failed:'))
+            for error in report['errors']:
+                self.stdout.write(f'   line {error["line"]}: {error["error"]}')
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='quiet_hours_end',
+            field=models.TimeField(blank=True, help_text='Local time at which held reminders are released', null=True, verbose_name='Quiet hours end'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='quiet_hours_start',
+            field=models.TimeField(blank=True, help_text='Local time from which reminders are held back', null=True, verbose_name='Quiet hours start'),
+        ),
+    ]
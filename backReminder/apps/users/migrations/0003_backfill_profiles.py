@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """Profiles are now provisioned with the user; backfill older accounts"""
+    User = apps.get_model('users', 'User')
+    UserProfile = apps.get_model('users', 'UserProfile')
+    missing = list(User.objects.filter(profile__isnull=True).values_list('id', flat=True))
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id) for user_id in missing], batch_size=2000
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_quiet_hours'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Indexes behind the admin user search on large tables
+#
+# Admin '^' and '=' searches run UPPER(column::text) LIKE 'TERM%' and
+# UPPER(column::text) = 'TERM' on PostgreSQL; text_pattern_ops expression
+# indexes serve both. They are built CONCURRENTLY so the users table stays
+# writable, which is why this migration is not atomic.
+
+from django.db import migrations
+
+SEARCH_INDEXES = {
+    'users_email_upper_idx': ('users', 'email'),
+    'users_first_name_upper_idx': ('users', 'first_name'),
+    'users_last_name_upper_idx': ('users', 'last_name'),
+    'users_phone_number_upper_idx': ('users', 'phone_number'),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, (table, column) in SEARCH_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} (UPPER({column}::text) text_pattern_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('users', '0003_backfill_profiles'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
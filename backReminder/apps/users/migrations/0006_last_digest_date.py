@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='last_digest_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Last digest date'),
+        ),
+    ]
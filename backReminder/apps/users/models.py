@@ -80,10 +80,23 @@ class User(AbstractUser):
         return self.email
     
     def update_last_active(self):
-        """Update last active timestamp"""
+        """
+        Update last active timestamp.
+
+        Skipped when the value last recorded is within
+        LAST_ACTIVE_GRANULARITY, which may be newer than this instance's
+        (see activity.py); otherwise the write is buffered and persisted in
+        bulk. last_active is set to the recorded value either way. Returns
+        whether an update was recorded.
+        """
         from django.utils import timezone
-        self.last_active = timezone.now()
-        self.save(update_fields=['last_active'])
+        from .activity import last_active_granularity, record_activity
+        
+        now = timezone.now()
+        if self.last_active and now - self.last_active < last_active_granularity():
+            return False
+        self.last_active = record_activity(self.pk, now)
+        return self.last_active == now
 
 
 class UserProfile(BaseModel):
@@ -164,6 +177,20 @@ class UserProfile(BaseModel):
         default=0,
         help_text=_('Minutes before medication time to send reminder')
     )
+    quiet_hours_start = models.TimeField(
+        _('Quiet hours start'),
+        null=True,
+        blank=True,
+        help_text=_('Local time from which reminders are held back')
+    )
+    quiet_hours_end = models.TimeField(
+        _('Quiet hours end'),
+        null=True,
+        blank=True,
+        help_text=_('Local time at which held reminders are released')
+    )
+    # Local date of the last daily digest emailed, claimed before sending so it goes out once
+    last_digest_date = models.DateField(_('Last digest date'), null=True, blank=True, editable=False)
     
     class Meta:
         db_table = 'user_profiles'
@@ -172,3 +199,28 @@ class UserProfile(BaseModel):
     
     def __str__(self):
         return f"{self.user.email} - Profile"
+
+
+class UserShard(models.Model):
+    """
+    Directory entry pinning a user's data to a database.
+
+    Users without an entry are placed by hash (see apps.core.sharding);
+    entries exist while shards are rebalanced or for users moved by hand.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shard'
+    )
+    database = models.CharField(_('Database'), max_length=50)
+    updated_at = models.DateTimeField(_('Updated at'), auto_now=True)
+    
+    class Meta:
+        db_table = 'user_shards'
+        verbose_name = _('User Shard')
+        verbose_name_plural = _('User Shards')
+    
+    def __str__(self):
+        return f"{self.user_id} -> {self.database}"
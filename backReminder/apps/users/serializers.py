@@ -17,7 +17,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'emergency_contact_name', 'emergency_contact_phone', 
             'emergency_contact_relationship',
             'medical_conditions', 'allergies',
-            'preferred_notification_time', 'reminder_advance_minutes'
+            'preferred_notification_time', 'reminder_advance_minutes',
+            'quiet_hours_start', 'quiet_hours_end'
         ]
 
 
@@ -54,11 +55,12 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         
         user = User.objects.create_user(**validated_data)
         
-        # Create profile if data provided
+        # The profile is provisioned on user creation; fill in provided data
         if profile_data:
-            UserProfile.objects.create(user=user, **profile_data)
-        else:
-            UserProfile.objects.create(user=user)
+            profile = user.profile
+            for attr, value in profile_data.items():
+                setattr(profile, attr, value)
+            profile.save()
             
         return user
 
@@ -108,7 +110,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         
         # Update or create profile
         if profile_data:
-            profile, created = UserProfile.objects.get_or_create(user=instance)
+            profile = instance.profile
             for attr, value in profile_data.items():
                 setattr(profile, attr, value)
             profile.save()
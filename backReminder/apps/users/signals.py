@@ -0,0 +1,31 @@
+"""
+User signals - Provision profiles and keep cached user state consistent
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.authentication.backends import invalidate_cached_user
+from apps.core.sharding import delete_user_rows, shard_for_user
+from .models import User, UserProfile
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Saving, deactivating or changing the password of a user drops its cached copy"""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_user_data(sender, instance, using, **kwargs):
+    """Rows on another database are out of reach of the delete cascade"""
+    alias = shard_for_user(instance.pk)
+    if alias != using:
+        delete_user_rows(instance.pk, alias)
+
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    """Every user gets a profile when created, so reads never have to provision one"""
+    if created and not raw:
+        UserProfile.objects.create(user=instance)
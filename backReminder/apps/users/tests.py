@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .activity import activity_buffer
+from .models import User
+
+
+class LastActiveTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        activity_buffer.flush()
+        self.user = User.objects.create_user(username='active', email='active@example.com', password='x')
+
+    def test_stale_copies_record_once_per_granularity(self):
+        """Cached users keep an old last_active; only the first of them records a new one"""
+        stale = timezone.now() - timedelta(hours=1)
+        copies = [User.objects.get(pk=self.user.pk) for _copy in range(3)]
+        for copy in copies:
+            copy.last_active = stale
+
+        recorded = [copy.update_last_active() for copy in copies]
+
+        self.assertEqual(recorded, [True, False, False])
+        self.assertEqual(len(activity_buffer), 1)
+        self.assertEqual(len({copy.last_active for copy in copies}), 1)
+
+
+class MeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        activity_buffer.flush()
+        self.user = User.objects.create_user(username='me', email='me@example.com', password='x')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_repeated_requests_revalidate(self):
+        """The request user is served from the auth cache; /me must still answer 304"""
+        first = self.client.get('/api/users/me/')
+        self.assertEqual(first.status_code, 200)
+        for _request in range(3):
+            response = self.client.get('/api/users/me/', HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], first['ETag'])
@@ -4,9 +4,15 @@ User views - ViewSets for user management
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from django.contrib.auth import authenticate
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from apps.core.mixins import ConditionalGetMixin
+from apps.core.utils import compute_etag, etag_matches
+from .bulk import FORMATS, detect_format, import_users, iter_export, text_stream
 from .models import User, UserProfile
 from .serializers import (
     UserRegistrationSerializer, UserSerializer, UserUpdateSerializer,
@@ -14,11 +20,12 @@ from .serializers import (
 )
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet for user management
     """
     queryset = User.objects.all()
+    etag_fields = ('updated_at', 'last_active', 'profile__updated_at')
     permission_classes = [IsAuthenticated]
 
     def get_serializer_class(self):
@@ -45,10 +52,28 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
-        """Get current user information"""
+        """
+        Get current user information with the profile, in one query.
+
+        Responds 304 when If-None-Match matches the user's ETag, skipping
+        serialization.
+        """
         request.user.update_last_active()
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        user = get_object_or_404(User.objects.select_related('profile'), pk=request.user.pk)
+        # last_active writes are buffered and the request's user is cached: update_last_active()
+        # leaves the value recorded for the current granularity window on it, so the ETag only
+        # changes when a new value is recorded
+        user.last_active = request.user.last_active
+        profile = getattr(user, 'profile', None)
+        etag = compute_etag(
+            'me', user.pk, user.updated_at, user.last_active,
+            profile.updated_at if profile else None,
+        )
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        serializer = self.get_serializer(user)
+        return Response(serializer.data, headers=headers)
 
     @action(detail=False, methods=['put', 'patch'], permission_classes=[IsAuthenticated])
     def update_me(self, request):
@@ -97,14 +122,14 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def profile(self, request):
         """Get user profile"""
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
+        profile = get_object_or_404(UserProfile, user=request.user)
         serializer = UserProfileSerializer(profile)
         return Response(serializer.data)
 
     @action(detail=False, methods=['put', 'patch'], permission_classes=[IsAuthenticated])
     def update_profile(self, request):
         """Update user profile"""
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
+        profile = get_object_or_404(UserProfile, user=request.user)
         serializer = UserProfileSerializer(
             profile, 
             data=request.data, 
@@ -125,3 +150,45 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response({
             'message': 'Account deactivated successfully'
         }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser],
+            parser_classes=[MultiPartParser], url_path='import')
+    def import_users(self, request):
+        """Import users from an uploaded CSV or JSONL file (staff only)"""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({
+                'error': 'file is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        fmt = request.data.get('file_format') or detect_format(upload.name)
+        if fmt not in FORMATS:
+            return Response({
+                'error': f'format must be one of {FORMATS}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            report = import_users(text_stream(upload.file), fmt=fmt)
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({
+                'error': f'Could not parse file: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser], url_path='export')
+    def export_users(self, request):
+        """Stream every user and profile as CSV or JSONL (staff only)"""
+        # 'format' is reserved by DRF for renderer selection
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in FORMATS:
+            return Response({
+                'error': f'format must be one of {FORMATS}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        response = StreamingHttpResponse(
+            iter_export(User.objects.all(), fmt=fmt),
+            content_type='text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        )
+        response['Content-Disposition'] = f'attachment; filename="users.{fmt}"'
+        return response
@@ -35,6 +35,7 @@ DJANGO_APPS = [
 THIRD_PARTY_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'drf_spectacular',
     # 'django_celery_beat',      # Commented - requires Redis
@@ -63,6 +64,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.replicas.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -106,6 +108,34 @@ DATABASES = {
     }
 }
 
+# Per-user data sharding (apps.core.sharding): one database URL per shard,
+# e.g. USER_SHARD_URLS=sqlite:///shard0.sqlite3,sqlite:///shard1.sqlite3
+# Users and shared tables stay on 'default'. Unset keeps everything there.
+USER_SHARD_URLS = env.list('USER_SHARD_URLS', default=[])
+for _index, _url in enumerate(USER_SHARD_URLS):
+    DATABASES[f'shard_{_index}'] = {**env.db_url_config(_url), 'ATOMIC_REQUESTS': True}
+USER_SHARDS = [f'shard_{_index}' for _index in range(len(USER_SHARD_URLS))]
+USER_SHARD_DIRECTORY_TIMEOUT = env.int('USER_SHARD_DIRECTORY_TIMEOUT', default=300)
+
+# Read replicas of 'default', e.g. REPLICA_URLS=postgres://...@replica1/db
+# Safe list/retrieve, schedule, notification polling and analytics reads use
+# them; users who wrote stick to the primary for REPLICA_STICKY_SECONDS.
+REPLICA_URLS = env.list('REPLICA_URLS', default=[])
+for _index, _url in enumerate(REPLICA_URLS):
+    DATABASES[f'replica_{_index}'] = {**env.db_url_config(_url), 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [f'replica_{_index}' for _index in range(len(REPLICA_URLS))]
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=15)
+REPLICA_MAX_LAG = env.float('REPLICA_MAX_LAG', default=10.0)
+
+DATABASE_ROUTERS = ['apps.core.replicas.ReplicaRouter', 'apps.core.sharding.UserShardRouter']
+
+# Offline sync (see apps.core.sync)
+SYNC_PAGE_SIZE = env.int('SYNC_PAGE_SIZE', default=200)
+SYNC_MAX_PAGE_SIZE = 1000
+SYNC_SETTLE_SECONDS = env.int('SYNC_SETTLE_SECONDS', default=5)
+SYNC_TOMBSTONE_RETENTION_DAYS = env.int('SYNC_TOMBSTONE_RETENTION_DAYS', default=90)
+SYNC_MAX_UPLOAD_MUTATIONS = 1000
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
@@ -146,7 +176,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.backends.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -178,8 +208,25 @@ SIMPLE_JWT = {
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    # Tokens carry a hash of the password so a password change revokes them
+    'CHECK_REVOKE_TOKEN': True,
+    'TOKEN_REFRESH_SERIALIZER': 'apps.authentication.serializers.FilteredTokenRefreshSerializer',
 }
 
+# Bloom filter in front of the token blacklist (see apps.authentication.blacklist)
+TOKEN_BLACKLIST_FILTER = {
+    'CAPACITY': env.int('TOKEN_BLACKLIST_FILTER_CAPACITY', default=100000),
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 30,
+    'REBUILD_INTERVAL': 60 * 60,
+}
+
+# Authenticated users are served from the cache for this many seconds. Needs a
+# cache shared by every worker (Redis in production) so saves invalidate all
+# copies; with a per-process cache (LocMemCache) users are read from the
+# database on every request. 0 turns the cache off.
+AUTH_USER_CACHE_TIMEOUT = env.int('AUTH_USER_CACHE_TIMEOUT', default=60)
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = env.list(
     'CORS_ALLOWED_ORIGINS',
@@ -206,6 +253,96 @@ SPECTACULAR_SETTINGS = {
 # CELERY_TIMEZONE = TIME_ZONE
 # CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Periodic jobs (picked up by celery beat once the broker is enabled)
+CELERY_BEAT_SCHEDULE = {
+    'plan-reminders': {
+        'task': 'apps.notifications.tasks.plan_reminders_task',
+        'schedule': 15 * 60,
+    },
+    'dispatch-reminders': {
+        'task': 'apps.notifications.tasks.dispatch_reminders_task',
+        'schedule': 60,
+    },
+    'relay-outbox': {
+        'task': 'apps.notifications.tasks.relay_outbox_task',
+        'schedule': 10,
+    },
+    'prune-expired-tokens': {
+        'task': 'apps.authentication.tasks.prune_expired_tokens_task',
+        'schedule': 60 * 60,
+    },
+    'prune-outbox': {
+        'task': 'apps.notifications.tasks.prune_outbox_task',
+        'schedule': 60 * 60,
+    },
+    'send-email-digests': {
+        'task': 'apps.notifications.tasks.send_email_digests_task',
+        'schedule': 60 * 60,
+    },
+    'notify-low-stock': {
+        'task': 'apps.notifications.tasks.notify_low_stock_task',
+        'schedule': 15 * 60,
+    },
+    # Daily; run `manage.py expire_medications` from cron to pin it to the night
+    'expire-medications': {
+        'task': 'apps.medications.tasks.expire_medications_task',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# Email reminders
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='noreply@medicationreminder.com')
+EMAIL_REMINDER_BATCH_SIZE = env.int('EMAIL_REMINDER_BATCH_SIZE', default=100)
+
+# Delivery channels - each one gets its own worker pool, timeout and circuit breaker
+NOTIFICATION_CHANNELS = {
+    'email': {
+        'MAX_WORKERS': 4,
+        'MAX_PENDING': 16,
+        'TIMEOUT': 30,
+        'FAILURE_THRESHOLD': 5,
+        'RESET_TIMEOUT': 60,
+    },
+    'push': {
+        'BACKEND': env('PUSH_BACKEND', default='apps.notifications.channels.LoggingBackend'),
+        'MAX_WORKERS': 8,
+        'MAX_PENDING': 32,
+        'TIMEOUT': 10,
+        'FAILURE_THRESHOLD': 5,
+        'RESET_TIMEOUT': 30,
+    },
+    'sms': {
+        'BACKEND': env('SMS_BACKEND', default='apps.notifications.channels.LoggingBackend'),
+        'MAX_WORKERS': 2,
+        'MAX_PENDING': 8,
+        'TIMEOUT': 15,
+        'FAILURE_THRESHOLD': 3,
+        'RESET_TIMEOUT': 120,
+    },
+}
+
+# User activity - last_active is refreshed at most once per granularity window
+# and written in bulk every flush interval (seconds)
+LAST_ACTIVE_GRANULARITY = env.int('LAST_ACTIVE_GRANULARITY', default=300)
+LAST_ACTIVE_FLUSH_INTERVAL = env.int('LAST_ACTIVE_FLUSH_INTERVAL', default=15)
+LAST_ACTIVE_BUFFER_SIZE = 1000
+
+# Medication history - change rows are buffered and inserted in bulk every
+# flush interval (seconds)
+MEDICATION_HISTORY_FLUSH_INTERVAL = env.int('MEDICATION_HISTORY_FLUSH_INTERVAL', default=5)
+MEDICATION_HISTORY_BUFFER_SIZE = 1000
+
+# Delivery outbox - relay batch size, retry limit and backoff (seconds); sent
+# messages and delivery batch reports are kept RETENTION_DAYS
+NOTIFICATION_OUTBOX = {
+    'BATCH_SIZE': env.int('OUTBOX_BATCH_SIZE', default=500),
+    'MAX_ATTEMPTS': 8,
+    'BASE_DELAY': 30,
+    'MAX_DELAY': 60 * 60,
+    'LEASE': 5 * 60,
+    'RETENTION_DAYS': env.int('OUTBOX_RETENTION_DAYS', default=14),
+}
+
 # Logging
 LOGGING = {
     'version': 1,
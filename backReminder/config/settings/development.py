@@ -33,8 +33,9 @@ INTERNAL_IPS = [
 if env('DATABASE_URL', default=None):
     DATABASES['default'] = env.db()
 
-# Email backend for development
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Email backend for development (set EMAIL_BACKEND to the filebased backend to keep messages on disk)
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH = BASE_DIR / 'logs' / 'emails'
 
 # CORS - More permissive in development
 CORS_ALLOW_ALL_ORIGINS = True
@@ -93,3 +94,4 @@ if not os.path.exists(logs_dir):
 # Google OAuth settings
 GOOGLE_OAUTH_CLIENT_ID = env('GOOGLE_OAUTH_CLIENT_ID', default='')
 GOOGLE_OAUTH_CLIENT_SECRET = env('GOOGLE_OAUTH_CLIENT_SECRET', default='')
+GOOGLE_OAUTH_CERTS_URL = env('GOOGLE_OAUTH_CERTS_URL', default='https://www.googleapis.com/oauth2/v1/certs')
@@ -29,6 +29,7 @@ urlpatterns = [
     path('api/analytics/', include('apps.analytics.urls')),         # **HABILITADO - básico creado**
     path('api/users/', include('apps.users.urls')),
     path('api/monitoring/', include('apps.monitoring.urls')),        # **RE-HABILITADO**
+    path('api/sync/', include('apps.core.sync_urls')),
     
     # Health Check
     path('health/', include('apps.core.urls')),